@@ -9,6 +9,12 @@ from typing import List, Dict, Set, Tuple, Optional, Any
 from dataclasses import dataclass
 from datetime import datetime, timezone
 import json
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Try to import ArcGIS API, fallback to lightweight service if not available
 try:
@@ -28,6 +34,16 @@ except ImportError as e:
 
 logger = logging.getLogger(__name__)
 
+# Connection pool for ArcGIS REST queries, shared by every classification call
+ARCGIS_POOL_CONNECTIONS = 16
+ARCGIS_POOL_MAXSIZE = 64
+ARCGIS_MAX_RETRIES = Retry(total=2, backoff_factor=0.2, status_forcelist=(502, 503, 504),
+                           allowed_methods=frozenset({'GET'}))
+
+# Real-time queries issued concurrently by classify_points when the state
+# geometries could not be loaded for a local spatial join
+ARCGIS_QUERY_WORKERS = 32
+
 
 @dataclass
 class StateZone:
@@ -51,6 +67,21 @@ class ArcGISGeofenceService:
         self.gis = None
         self.states_layer = None
         
+        # Deduplicated zone list served by get_all_zones; rebuilt whenever
+        # zones are added to state_zones
+        self._all_zones_key = None
+        self._all_zones: List[StateZone] = []
+        
+        # Keep-alive session so real-time queries reuse TCP/TLS connections
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=ARCGIS_POOL_CONNECTIONS,
+                              pool_maxsize=ARCGIS_POOL_MAXSIZE,
+                              max_retries=ARCGIS_MAX_RETRIES)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._query_pool = ThreadPoolExecutor(max_workers=ARCGIS_QUERY_WORKERS,
+                                              thread_name_prefix='arcgis-query')
+        
         if ARCGIS_AVAILABLE:
             try:
                 # Use the ArcGIS Sample Server which supports spatial queries
@@ -60,6 +91,7 @@ class ArcGISGeofenceService:
                 
                 # Initialize state zones from the layer
                 self._initialize_state_zones()
+                self._load_state_geometries()
                 
                 logger.info("ArcGIS Geofence Service initialized successfully")
                 return
@@ -84,6 +116,23 @@ class ArcGISGeofenceService:
             logger.error(f"Failed to initialize state zones: {e}")
             self._initialize_fallback_zones()
     
+    def _load_state_geometries(self):
+        """
+        Load the state boundaries once so classify_points can spatially join
+        points locally; without them it queries the layer per point.
+        """
+        try:
+            self.states_sdf = self.states_layer.query(
+                where='1=1',
+                out_fields='state_name,state_abbr',
+                out_sr=4326,
+                as_df=True
+            )
+            logger.info(f"Loaded {len(self.states_sdf)} state geometries")
+        except Exception as e:
+            self.states_sdf = None
+            logger.warning(f"Failed to load state geometries, using per-point queries: {e}")
+    
     def _initialize_fallback_zones(self):
         """Initialize fallback state zones with all 50 US states coordinates."""
         fallback_states = {
@@ -166,8 +215,6 @@ class ArcGISGeofenceService:
             return self._classify_point_fallback(longitude, latitude)
 
         try:
-            import requests
-            
             # Use direct REST API call for more reliable spatial queries
             url = f"{self.states_layer_url}/query"
             params = {
@@ -179,7 +226,7 @@ class ArcGISGeofenceService:
                 'inSR': '4326'
             }
             
-            response = requests.get(url, params=params, timeout=5)
+            response = self.session.get(url, params=params, timeout=5)
             data = response.json()
             
             if 'features' in data and len(data['features']) > 0:
@@ -214,13 +261,74 @@ class ArcGISGeofenceService:
         # Only return if reasonably close (within ~2 degrees)
         return closest_state if min_distance < 2.0 else None
     
+    def classify_points(self, longitudes, latitudes) -> List[Optional[str]]:
+        """
+        Classify many points at once.
+        Spatially joins the points against the loaded state geometries; if
+        those could not be loaded, queries the ArcGIS REST API concurrently
+        once per distinct point. The centroid lookup is used only when
+        ArcGIS is unavailable.
+        """
+        if not self.states_layer:
+            return self._classify_points_fallback(longitudes, latitudes)
+        
+        points = np.column_stack((
+            np.asarray(longitudes, dtype=np.float64),
+            np.asarray(latitudes, dtype=np.float64)
+        ))
+        if not len(points):
+            return []
+        unique_points, inverse = np.unique(points, axis=0, return_inverse=True)
+        
+        if self.states_sdf is not None:
+            states = self._join_states(unique_points)
+        else:
+            states = list(self._query_pool.map(
+                self.classify_point_realtime,
+                unique_points[:, 0].tolist(),
+                unique_points[:, 1].tolist()
+            ))
+        
+        return [states[index] for index in inverse.ravel().tolist()]
+    
+    def _join_states(self, points: np.ndarray) -> List[Optional[str]]:
+        """State name for each (longitude, latitude) row via batch_classify_points."""
+        joined = self.batch_classify_points(
+            pd.DataFrame({'longitude': points[:, 0], 'latitude': points[:, 1]})
+        )
+        column = 'state_name' if 'state_name' in joined else 'state'
+        # A point on a shared border matches both states; keep the first
+        names = joined[~joined.index.duplicated(keep='first')][column].reindex(range(len(points)))
+        return [name if isinstance(name, str) else None for name in names.tolist()]
+    
+    def _classify_points_fallback(self, longitudes, latitudes) -> List[Optional[str]]:
+        """Vectorized version of _classify_point_fallback for arrays of points."""
+        zones = self.get_all_zones()
+        if not zones:
+            return [None] * len(longitudes)
+        
+        center_lats = np.array([zone.center_lat for zone in zones])
+        center_lngs = np.array([zone.center_lng for zone in zones])
+        lats = np.asarray(latitudes, dtype=np.float64)[:, np.newaxis]
+        lngs = np.asarray(longitudes, dtype=np.float64)[:, np.newaxis]
+        
+        # Points x zones distance matrix (same planar metric as the scalar fallback)
+        distances = np.hypot(lats - center_lats, lngs - center_lngs)
+        nearest = distances.argmin(axis=1)
+        within = distances[np.arange(len(nearest)), nearest] < 2.0
+        
+        return [
+            zones[index].name if close else None
+            for index, close in zip(nearest.tolist(), within.tolist())
+        ]
+    
     def batch_classify_points(self, points_df: pd.DataFrame) -> pd.DataFrame:
         """
         Batch classify multiple points using spatial join.
         points_df should have 'longitude' and 'latitude' columns.
         """
         try:
-            if not self.states_sdf is not None:
+            if self.states_sdf is None:
                 return self._batch_classify_fallback(points_df)
             
             # Convert points DataFrame to Spatially Enabled DataFrame
@@ -258,16 +366,40 @@ class ArcGISGeofenceService:
         """Get a zone by its ID."""
         return self.state_zones.get(zone_id.lower())
     
+    def get_zones_by_ids(self, zone_ids: List[str]) -> Dict[str, StateZone]:
+        """
+        Get several zones by ID in one call.
+        
+        Args:
+            zone_ids: Zone IDs to look up
+            
+        Returns:
+            Dictionary mapping each known zone ID to its zone; unknown IDs are omitted
+        """
+        state_zones = self.state_zones
+        zones = {}
+        for zone_id in zone_ids:
+            zone = state_zones.get(zone_id.lower())
+            if zone:
+                zones[zone_id] = zone
+        return zones
+    
     def get_all_zones(self) -> List[StateZone]:
         """Get all available zones."""
-        # Return unique zones (avoid duplicates from different keys)
-        seen_ids = set()
-        unique_zones = []
-        for zone in self.state_zones.values():
-            if zone.id not in seen_ids:
-                unique_zones.append(zone)
-                seen_ids.add(zone.id)
-        return unique_zones
+        key = len(self.state_zones)
+        
+        if key != self._all_zones_key:
+            # Unique zones (avoid duplicates from different keys)
+            seen_ids = set()
+            unique_zones = []
+            for zone in self.state_zones.values():
+                if zone.id not in seen_ids:
+                    unique_zones.append(zone)
+                    seen_ids.add(zone.id)
+            self._all_zones_key = key
+            self._all_zones = unique_zones
+        
+        return list(self._all_zones)
     
     def create_buffer_zone(self, center_lat: float, center_lng: float, radius_km: float) -> Dict:
         """Create a circular buffer zone around a point."""
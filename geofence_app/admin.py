@@ -38,9 +38,11 @@ class GeofenceSystemAdmin:
             recent_events = cosmos_service.get_recent_events(limit=1000)
             
             # Calculate stats
+            # Stored timestamps are UTC ISO 8601 strings, which sort
+            # chronologically, so compare them as strings instead of parsing
             now = datetime.now(timezone.utc)
-            one_hour_ago = now - timedelta(hours=1)
-            twenty_four_hours_ago = now - timedelta(hours=24)
+            one_hour_ago = (now - timedelta(hours=1)).isoformat()
+            twenty_four_hours_ago = (now - timedelta(hours=24)).isoformat()
             
             events_1h = 0
             events_24h = 0
@@ -51,7 +53,7 @@ class GeofenceSystemAdmin:
             
             for event in recent_events:
                 try:
-                    event_time = datetime.fromisoformat(event['timestamp'].replace('Z', '+00:00'))
+                    event_time = event['timestamp']
                     vehicle_id = event['vehicle_id']
                     event_type = event['event_type']
                     
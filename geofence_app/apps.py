@@ -5,3 +5,11 @@ class GeofenceAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'geofence_app'
     verbose_name = 'Geofence Application'
+
+    def ready(self):
+        from django.conf import settings
+        
+        # Optional in-process metrics collection
+        if settings.METRICS_SAMPLE_INTERVAL > 0:
+            from monitoring import start_metrics_sampler
+            start_metrics_sampler(settings.METRICS_SAMPLE_INTERVAL)
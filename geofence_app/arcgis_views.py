@@ -20,8 +20,9 @@ from rest_framework import status
 from rest_framework.throttling import AnonRateThrottle
 
 from .cosmos_service import cosmos_service
+from .time_utils import parse_iso_timestamp
 from arcgis_geofence_service import arcgis_geofence_service
-from us_taxi_simulation import us_taxi_simulation
+from us_taxi_simulation import ZONE_MATCH_MODES, us_taxi_simulation
 
 logger = logging.getLogger(__name__)
 
@@ -108,17 +109,15 @@ def process_arcgis_location_event(request):
                 transitions['exited'].append(previous_state.lower().replace(' ', '_'))
                 
                 # Store exit event in Cosmos DB
-                cosmos_service.store_zone_event({
-                    'id': exit_event['event_id'],
-                    'vehicle_id': vehicle_id,
-                    'zone_id': exit_event['zone_id'],
-                    'zone_name': previous_state,
-                    'event_type': 'zone_exit',
-                    'latitude': latitude,
-                    'longitude': longitude,
-                    'timestamp': timestamp,
-                    'metadata': metadata
-                })
+                cosmos_service.store_zone_event(
+                    vehicle_id=vehicle_id,
+                    zone_id=exit_event['zone_id'],
+                    event_type='zone_exit',
+                    latitude=latitude,
+                    longitude=longitude,
+                    timestamp=parse_iso_timestamp(timestamp),
+                    metadata={**metadata, 'zone_name': previous_state}
+                )
             
             if current_state:
                 # Zone entry event
@@ -133,17 +132,15 @@ def process_arcgis_location_event(request):
                 transitions['entered'].append(current_state.lower().replace(' ', '_'))
                 
                 # Store entry event in Cosmos DB
-                cosmos_service.store_zone_event({
-                    'id': entry_event['event_id'],
-                    'vehicle_id': vehicle_id,
-                    'zone_id': entry_event['zone_id'],
-                    'zone_name': current_state,
-                    'event_type': 'zone_entry',
-                    'latitude': latitude,
-                    'longitude': longitude,
-                    'timestamp': timestamp,
-                    'metadata': metadata
-                })
+                cosmos_service.store_zone_event(
+                    vehicle_id=vehicle_id,
+                    zone_id=entry_event['zone_id'],
+                    event_type='zone_entry',
+                    latitude=latitude,
+                    longitude=longitude,
+                    timestamp=parse_iso_timestamp(timestamp),
+                    metadata={**metadata, 'zone_name': current_state}
+                )
         
         # Update metadata with current state
         metadata['current_state'] = current_state
@@ -151,17 +148,14 @@ def process_arcgis_location_event(request):
         
         # Store location event in Cosmos DB
         event_id = f"{vehicle_id}_{int(datetime.now().timestamp() * 1000)}"
-        location_event = {
-            'id': event_id,
-            'vehicle_id': vehicle_id,
-            'latitude': latitude,
-            'longitude': longitude,
-            'timestamp': timestamp,
-            'metadata': metadata,
-            'event_type': 'location_update'
-        }
-        
-        cosmos_service.store_location_event(location_event)
+        cosmos_service.store_location_event(
+            vehicle_id=vehicle_id,
+            latitude=latitude,
+            longitude=longitude,
+            timestamp=parse_iso_timestamp(timestamp),
+            metadata=metadata,
+            event_id=event_id
+        )
         
         # Prepare current zones response
         current_zones = []
@@ -407,14 +401,20 @@ def search_taxis_by_zone(request):
     """Search for taxis currently in a specific zone using the simulation."""
     try:
         zone_name = request.GET.get('zone', '').strip()
+        match = request.GET.get('match', 'substring')
         
         if not zone_name:
             return Response({
                 'error': 'Zone parameter is required'
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        if match not in ZONE_MATCH_MODES:
+            return Response({
+                'error': f"match must be one of {', '.join(ZONE_MATCH_MODES)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
         # Use simulation's search functionality
-        taxis_in_zone = us_taxi_simulation.search_taxis_by_zone(zone_name)
+        taxis_in_zone = us_taxi_simulation.search_taxis_by_zone(zone_name, match)
         
         return Response({
             'zone': zone_name,
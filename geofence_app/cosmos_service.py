@@ -5,24 +5,98 @@ Provides high-level interface for storing and retrieving geofence data.
 
 import logging
 import json
-from typing import Dict, List, Optional, Any
-from datetime import datetime, timezone
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Any, Tuple
+from datetime import datetime, timedelta, timezone
+import numpy as np
 from azure.cosmos import CosmosClient, PartitionKey
-from azure.cosmos.exceptions import CosmosResourceNotFoundError, CosmosHttpResponseError
+from azure.cosmos.exceptions import (
+    CosmosResourceExistsError, CosmosResourceNotFoundError, CosmosHttpResponseError
+)
 from django.conf import settings
 from django.core.cache import cache
 
+from .time_utils import parse_iso_timestamp
+
 logger = logging.getLogger(__name__)
 
+# Stored procedure that upserts a batch of documents (location updates or
+# trace events) for one vehicle.
+# Returns how many documents were written so the caller can resume a batch
+# the server cut short.
+BULK_STORE_LOCATIONS_SPROC_ID = 'bulkStoreLocations'
+BULK_STORE_LOCATIONS_SPROC_BODY = """
+function bulkStoreLocations(documents) {
+    var collection = getContext().getCollection();
+    var stored = 0;
+
+    function storeNext() {
+        if (stored >= documents.length) {
+            getContext().getResponse().setBody(stored);
+            return;
+        }
+        var accepted = collection.upsertDocument(
+            collection.getSelfLink(), documents[stored],
+            function (err) {
+                if (err) throw err;
+                stored++;
+                storeNext();
+            });
+        if (!accepted) getContext().getResponse().setBody(stored);
+    }
+
+    storeNext();
+}
+"""
+BULK_STORE_BATCH_SIZE = 100
+
+# Limit buckets for get_zone_events; a request is served from the smallest
+# bucket that covers its limit.
+ZONE_EVENTS_LIMIT_BUCKETS = (100, 500, 2000)
+
+# Indexing policy for the events container. The composite indexes serve
+# per-vehicle and per-zone queries that filter on a time range and order by
+# timestamp. Only applied when the container is created.
+EVENTS_INDEXING_POLICY = {
+    'indexingMode': 'consistent',
+    'includedPaths': [{'path': '/*'}],
+    'excludedPaths': [{'path': '/"_etag"/?'}],
+    'compositeIndexes': [
+        [
+            {'path': '/vehicle_id', 'order': 'ascending'},
+            {'path': '/timestamp', 'order': 'descending'},
+        ],
+        [
+            {'path': '/zone_id', 'order': 'ascending'},
+            {'path': '/timestamp', 'order': 'descending'},
+        ],
+    ],
+}
+
+# Server-side expressions for the keys aggregate_events can group by. ISO 8601
+# timestamps carry the hour of day at characters 11-12.
+# Missing fields are mapped to null so every projected row has the same shape.
+EVENT_GROUP_EXPRESSIONS = {
+    'vehicle_id': 'c.vehicle_id',
+    'zone_id': 'IIF(IS_DEFINED(c.zone_id), c.zone_id, null)',
+    'hour': 'SUBSTRING(c.timestamp, 11, 2)',
+}
+
 
 class CosmosDBService:
     """Service class for Azure Cosmos DB operations."""
     
-    def __init__(self):
-        """Initialize Cosmos DB client and containers."""
-        self.client = CosmosClient(settings.COSMOS_ENDPOINT, settings.COSMOS_KEY)
+    def __init__(self, client: Optional[CosmosClient] = None):
+        """
+        Initialize Cosmos DB client and containers.
+        
+        Args:
+            client: Existing CosmosClient to reuse; a new one is created if omitted
+        """
+        self.client = client or CosmosClient(settings.COSMOS_ENDPOINT, settings.COSMOS_KEY)
         self.database_name = settings.COSMOS_DATABASE_NAME
         self.container_name = settings.COSMOS_CONTAINER_NAME
+        self.zone_state_container_name = settings.COSMOS_ZONE_STATE_CONTAINER_NAME
         
         # Initialize database and container
         self._initialize_database()
@@ -39,22 +113,43 @@ class CosmosDBService:
             # Note: No offer_throughput for serverless Cosmos DB accounts
             self.container = self.database.create_container_if_not_exists(
                 id=self.container_name,
-                partition_key=PartitionKey(path="/vehicle_id")
+                partition_key=PartitionKey(path="/vehicle_id"),
+                indexing_policy=EVENTS_INDEXING_POLICY
             )
             
+            # Materialized view of which vehicles are currently inside each zone,
+            # one document per (zone, vehicle) pair
+            self.zone_state_container = self.database.create_container_if_not_exists(
+                id=self.zone_state_container_name,
+                partition_key=PartitionKey(path="/zone_id")
+            )
+            
+            self._register_stored_procedures()
+            
             logger.info(f"Initialized Cosmos DB: {self.database_name}/{self.container_name}")
             
         except CosmosHttpResponseError as e:
             logger.error(f"Failed to initialize Cosmos DB: {e}")
             raise
     
+    def _register_stored_procedures(self):
+        """Create or refresh the stored procedures used by this service."""
+        stored_procedures = {
+            BULK_STORE_LOCATIONS_SPROC_ID: BULK_STORE_LOCATIONS_SPROC_BODY,
+        }
+        for sproc_id, body in stored_procedures.items():
+            sproc = {'id': sproc_id, 'body': body}
+            try:
+                self.container.scripts.create_stored_procedure(body=sproc)
+            except CosmosResourceExistsError:
+                self.container.scripts.replace_stored_procedure(sproc=sproc_id, body=sproc)
+    
     def get_all_recent_vehicles(self, hours: int = 1) -> List[Dict]:
         """Get all vehicles that have been active in the last N hours."""
         try:
-            # Calculate cutoff time
-            cutoff_time = datetime.now(timezone.utc).replace(microsecond=0)
-            cutoff_time = cutoff_time.replace(hour=cutoff_time.hour - hours)
-            cutoff_iso = cutoff_time.isoformat() + 'Z'
+            # Stored timestamps are UTC isoformat() strings, so the cutoff must
+            # use the same format to compare correctly as a string
+            cutoff_iso = (datetime.now(timezone.utc) - timedelta(hours=hours)).isoformat()
             
             # Query for recent vehicle locations
             query = """
@@ -71,16 +166,11 @@ class CosmosDBService:
                 enable_cross_partition_query=True
             ))
             
-            # Group by vehicle_id and get the most recent location for each
+            # Group by vehicle_id and get the most recent location for each;
+            # items are ordered by timestamp DESC, so the first one seen wins
             vehicle_locations = {}
             for item in items:
-                vehicle_id = item['vehicle_id']
-                if vehicle_id not in vehicle_locations:
-                    vehicle_locations[vehicle_id] = item
-                else:
-                    # Keep the most recent timestamp
-                    if item['timestamp'] > vehicle_locations[vehicle_id]['timestamp']:
-                        vehicle_locations[vehicle_id] = item
+                vehicle_locations.setdefault(item['vehicle_id'], item)
             
             return list(vehicle_locations.values())
             
@@ -165,63 +255,94 @@ class CosmosDBService:
             Document ID of the stored event
         """
         try:
-            if timestamp is None:
-                timestamp = datetime.now(timezone.utc).isoformat()
-            
-            event_id = f"trace_{vehicle_id}_{event_type}_{int(datetime.now().timestamp() * 1000)}"
-            
-            document = {
-                'id': event_id,
-                'vehicle_id': vehicle_id,
-                'zone_name': zone_name,
-                'event_type': f'zone_{event_type}',
-                'trace_type': event_type,  # 'entry' or 'exit'
-                'latitude': latitude,
-                'longitude': longitude,
-                'timestamp': timestamp,
-                'created_at': datetime.now(timezone.utc).isoformat()
-            }
+            document = self._build_trace_document(vehicle_id, zone_name, event_type,
+                                                  latitude, longitude, timestamp)
             
             self.container.create_item(body=document)
             logger.debug(f"Stored trace event: {vehicle_id} {event_type} {zone_name}")
             
-            return event_id
+            return document['id']
             
         except Exception as e:
             logger.error(f"Error storing trace event: {e}")
             return None
     
+    def store_trace_events_bulk(self, events: List[Dict]) -> int:
+        """
+        Store many trace events with one stored procedure call per vehicle batch.
+        
+        Args:
+            events: Trace events with the keyword arguments of store_trace_event
+                ('vehicle_id', 'zone_name', 'event_type', 'latitude', 'longitude'
+                and optional 'timestamp')
+            
+        Returns:
+            Number of documents stored
+        """
+        documents_by_vehicle: Dict[str, List[Dict]] = {}
+        for event in events:
+            document = self._build_trace_document(
+                event['vehicle_id'], event['zone_name'], event['event_type'],
+                event['latitude'], event['longitude'], event.get('timestamp')
+            )
+            documents_by_vehicle.setdefault(event['vehicle_id'], []).append(document)
+        
+        try:
+            return sum(
+                self._bulk_store_documents(vehicle_id, documents)
+                for vehicle_id, documents in documents_by_vehicle.items()
+            )
+            
+        except CosmosHttpResponseError as e:
+            logger.error(f"Failed to bulk store trace events: {e}")
+            raise
+    
+    def _build_trace_document(self, vehicle_id: str, zone_name: str, event_type: str,
+                              latitude: float, longitude: float,
+                              timestamp: Optional[str] = None) -> Dict:
+        """Build the Cosmos DB document for a zone entry/exit trace event."""
+        if timestamp is None:
+            timestamp = datetime.now(timezone.utc).isoformat()
+        
+        # Id from the event time, so events written late in a batch keep distinct ids
+        event_ms = int(parse_iso_timestamp(timestamp).timestamp() * 1000)
+        
+        return {
+            'id': f"trace_{vehicle_id}_{event_type}_{event_ms}",
+            'vehicle_id': vehicle_id,
+            'zone_name': zone_name,
+            'event_type': f'zone_{event_type}',
+            'trace_type': event_type,  # 'entry' or 'exit'
+            'latitude': latitude,
+            'longitude': longitude,
+            'timestamp': timestamp,
+            'created_at': datetime.now(timezone.utc).isoformat()
+        }
+    
     def store_location_event(self, vehicle_id: str, latitude: float, longitude: float, 
-                           timestamp: Optional[datetime] = None, metadata: Optional[Dict] = None) -> str:
+                           timestamp: Optional[datetime] = None, metadata: Optional[Dict] = None,
+                           event_id: Optional[str] = None) -> str:
         """
         Store a location event in Cosmos DB.
         
+        The write is an upsert, so retrying an event with the same event_id
+        after a lost response does not conflict with the first write.
+        
         Args:
             vehicle_id: Unique identifier for the vehicle
             latitude: GPS latitude coordinate
             longitude: GPS longitude coordinate
             timestamp: Event timestamp (defaults to current time)
             metadata: Additional metadata for the event
+            event_id: Document ID to use (defaults to one derived from the timestamp)
             
         Returns:
             Document ID of the stored event
         """
-        if timestamp is None:
-            timestamp = datetime.now(timezone.utc)
-            
-        document = {
-            'id': f"{vehicle_id}_{int(timestamp.timestamp() * 1000)}",
-            'vehicle_id': vehicle_id,
-            'latitude': latitude,
-            'longitude': longitude,
-            'timestamp': timestamp.isoformat(),
-            'event_type': 'location_update',
-            'metadata': metadata or {},
-            'created_at': datetime.now(timezone.utc).isoformat()
-        }
+        document = self._build_location_document(vehicle_id, latitude, longitude, timestamp, metadata, event_id)
         
         try:
-            result = self.container.create_item(body=document)
+            result = self.container.upsert_item(body=document)
             # logger.info(f"Stored location event for vehicle {vehicle_id}")  # Reduced logging
             
             # Invalidate cache for this vehicle
@@ -233,11 +354,82 @@ class CosmosDBService:
             logger.error(f"Failed to store location event: {e}")
             raise
     
+    def store_location_events_bulk(self, events: List[Dict]) -> int:
+        """
+        Store many location events with one stored procedure call per vehicle batch.
+        
+        Args:
+            events: Location events with 'vehicle_id', 'latitude', 'longitude' and
+                optional 'timestamp' (datetime), 'metadata' and 'event_id' keys
+            
+        Returns:
+            Number of documents stored
+        """
+        documents_by_vehicle: Dict[str, List[Dict]] = {}
+        for event in events:
+            document = self._build_location_document(
+                event['vehicle_id'], event['latitude'], event['longitude'],
+                event.get('timestamp'), event.get('metadata'), event.get('event_id')
+            )
+            documents_by_vehicle.setdefault(event['vehicle_id'], []).append(document)
+        
+        stored = 0
+        try:
+            for vehicle_id, documents in documents_by_vehicle.items():
+                stored += self._bulk_store_documents(vehicle_id, documents)
+                
+                # Invalidate cache for this vehicle
+                cache.delete(f"vehicle_status_{vehicle_id}")
+            
+            return stored
+            
+        except CosmosHttpResponseError as e:
+            logger.error(f"Failed to bulk store location events: {e}")
+            raise
+    
+    def _bulk_store_documents(self, vehicle_id: str, documents: List[Dict]) -> int:
+        """Upsert one vehicle's documents in stored procedure batches."""
+        stored = 0
+        # Stored procedures are scoped to one partition, so batch per vehicle
+        while documents:
+            written = self.container.scripts.execute_stored_procedure(
+                sproc=BULK_STORE_LOCATIONS_SPROC_ID,
+                partition_key=vehicle_id,
+                params=[documents[:BULK_STORE_BATCH_SIZE]]
+            )
+            if not written:
+                raise RuntimeError(f"Bulk store made no progress for vehicle {vehicle_id}")
+            stored += written
+            documents = documents[written:]
+        return stored
+    
+    def _build_location_document(self, vehicle_id: str, latitude: float, longitude: float,
+                                 timestamp: Optional[datetime] = None,
+                                 metadata: Optional[Dict] = None,
+                                 event_id: Optional[str] = None) -> Dict:
+        """Build the Cosmos DB document for a location update."""
+        if timestamp is None:
+            timestamp = datetime.now(timezone.utc)
+            
+        return {
+            'id': event_id or f"{vehicle_id}_{int(timestamp.timestamp() * 1000)}",
+            'vehicle_id': vehicle_id,
+            'latitude': latitude,
+            'longitude': longitude,
+            'timestamp': timestamp.isoformat(),
+            'event_type': 'location_update',
+            'metadata': metadata or {},
+            'created_at': datetime.now(timezone.utc).isoformat()
+        }
+    
     def store_zone_event(self, vehicle_id: str, zone_id: str, event_type: str,
-                        latitude: float, longitude: float, h3_index: str,
+                        latitude: float, longitude: float, h3_index: Optional[str] = None,
                         timestamp: Optional[datetime] = None, metadata: Optional[Dict] = None) -> str:
         """
-        Store a zone entry/exit event in Cosmos DB.
+        Store a zone entry/exit event in Cosmos DB and apply it to the zone_state container.
+        
+        The write is an upsert keyed by vehicle, zone, type and time, so a
+        retried event does not conflict with the first write.
         
         Args:
             vehicle_id: Unique identifier for the vehicle
@@ -245,7 +437,7 @@ class CosmosDBService:
             event_type: 'zone_entry' or 'zone_exit'
             latitude: GPS latitude coordinate
             longitude: GPS longitude coordinate
-            h3_index: H3 hexagon index
+            h3_index: H3 hexagon index (optional)
             timestamp: Event timestamp (defaults to current time)
             metadata: Additional metadata for the event
             
@@ -269,12 +461,15 @@ class CosmosDBService:
         }
         
         try:
-            result = self.container.create_item(body=document)
+            result = self.container.upsert_item(body=document)
             # logger.info(f"Stored {event_type} event for vehicle {vehicle_id} in zone {zone_id}")  # Reduced logging
             
+            self._update_zone_state(vehicle_id, zone_id, event_type, document['timestamp'])
+            
             # Invalidate related caches
             cache.delete(f"vehicle_status_{vehicle_id}")
-            cache.delete(f"zone_events_{zone_id}")
+            self._bump_zone_events_version(zone_id)
+            cache.delete_many([f"zone_latest_ts_{zone_id}", "zone_latest_ts_all"])
             
             return result['id']
             
@@ -282,8 +477,198 @@ class CosmosDBService:
             logger.error(f"Failed to store zone event: {e}")
             raise
     
+    def _update_zone_state(self, vehicle_id: str, zone_id: str, event_type: str, timestamp: str):
+        """Apply a zone entry/exit to the zone_state container."""
+        if event_type == 'zone_entry':
+            self.zone_state_container.upsert_item(body={
+                'id': vehicle_id,
+                'zone_id': zone_id,
+                'vehicle_id': vehicle_id,
+                'entered_at': timestamp
+            })
+        elif event_type == 'zone_exit':
+            try:
+                self.zone_state_container.delete_item(item=vehicle_id, partition_key=zone_id)
+            except CosmosResourceNotFoundError:
+                pass
+    
+    def rebuild_zone_state(self) -> int:
+        """
+        Rebuild the zone_state container from the stored zone entry/exit events.
+        
+        A vehicle is inside a zone when its latest event for that zone is an
+        entry. Used to backfill zone_state for events stored before it existed.
+        
+        Returns:
+            Number of (zone, vehicle) pairs written to zone_state
+        """
+        try:
+            events = self.container.query_items(
+                query="""
+                SELECT c.vehicle_id, c.zone_id, c.event_type, c.timestamp FROM c 
+                WHERE c.event_type IN ('zone_entry', 'zone_exit')
+                ORDER BY c.timestamp DESC
+                """,
+                max_item_count=-1,
+                enable_cross_partition_query=True
+            )
+            
+            # Events are newest first, so the first one seen per pair is the latest
+            latest = {}
+            for event in events:
+                latest.setdefault((event['zone_id'], event['vehicle_id']), event)
+            
+            written = 0
+            for event in latest.values():
+                self._update_zone_state(event['vehicle_id'], event['zone_id'],
+                                        event['event_type'], event['timestamp'])
+                if event['event_type'] == 'zone_entry':
+                    written += 1
+            
+            return written
+            
+        except CosmosHttpResponseError as e:
+            logger.error(f"Failed to rebuild zone state: {e}")
+            raise
+    
+    def current_vehicles_in_zone(self, zone_id: str) -> List[str]:
+        """
+        Get the vehicles currently inside a zone.
+        
+        Args:
+            zone_id: Identifier for the geofence zone
+            
+        Returns:
+            List of vehicle IDs
+        """
+        try:
+            return list(self.zone_state_container.query_items(
+                query="SELECT VALUE c.vehicle_id FROM c",
+                partition_key=zone_id
+            ))
+            
+        except CosmosHttpResponseError as e:
+            logger.error(f"Failed to retrieve vehicles in zone: {e}")
+            raise
+    
+    def zone_vehicle_counts(self) -> Dict[str, int]:
+        """
+        Get the number of vehicles currently inside each zone.
+        
+        Returns:
+            Dictionary mapping zone ID to vehicle count; zones without
+            vehicles are omitted
+        """
+        try:
+            # One row per vehicle currently inside a zone; the Python SDK does
+            # not support cross-partition GROUP BY, so count client-side
+            zone_ids = self.zone_state_container.query_items(
+                query="SELECT VALUE c.zone_id FROM c",
+                enable_cross_partition_query=True
+            )
+            return dict(Counter(zone_ids))
+            
+        except CosmosHttpResponseError as e:
+            logger.error(f"Failed to retrieve zone vehicle counts: {e}")
+            raise
+    
+    def get_event_counts_since(self, cutoff: datetime) -> Dict[str, int]:
+        """
+        Count events and distinct vehicles since a point in time, aggregated server-side.
+        
+        Args:
+            cutoff: Only events with a timestamp at or after this time are counted
+            
+        Returns:
+            Dictionary with 'events' and 'vehicles' counts
+        """
+        # Event timestamps are stored as UTC ISO 8601 strings, which sort chronologically
+        parameters = [{"name": "@cutoff", "value": cutoff.astimezone(timezone.utc).isoformat()}]
+        
+        try:
+            event_count = next(iter(self.container.query_items(
+                query="SELECT VALUE COUNT(1) FROM c WHERE c.timestamp >= @cutoff",
+                parameters=parameters,
+                enable_cross_partition_query=True
+            )), 0)
+            
+            # Cosmos DB has no COUNT(DISTINCT ...); count a DISTINCT subquery instead
+            vehicle_count = next(iter(self.container.query_items(
+                query="SELECT VALUE COUNT(1) FROM "
+                      "(SELECT DISTINCT VALUE c.vehicle_id FROM c WHERE c.timestamp >= @cutoff)",
+                parameters=parameters,
+                enable_cross_partition_query=True
+            )), 0)
+            
+            return {'events': event_count, 'vehicles': vehicle_count}
+            
+        except CosmosHttpResponseError as e:
+            logger.error(f"Failed to count events: {e}")
+            raise
+
+    def aggregate_events(self, group_by: Tuple[str, ...],
+                         since: datetime) -> Dict[str, Dict[Any, Dict[str, int]]]:
+        """
+        Count events per group and event type since a point in time.
+        
+        All groupings are computed from a single query that projects only the
+        event type and the group keys, so full event documents never cross
+        the network and the container is scanned once.
+        
+        Args:
+            group_by: Keys to group by, each one of 'vehicle_id', 'zone_id' or
+                      'hour' (UTC hour of day)
+            since: Only events with a timestamp at or after this time are counted
+            
+        Returns:
+            Dictionary mapping each group_by key to a {group: {event_type: count}}
+            dictionary; events without a value for a key are omitted from its groups
+        """
+        unsupported = set(group_by) - EVENT_GROUP_EXPRESSIONS.keys()
+        if unsupported:
+            raise ValueError(f"Unsupported group_by: {', '.join(sorted(unsupported))}")
+        
+        # The Python SDK does not support cross-partition GROUP BY, so project
+        # [event_type, key...] rows and count them client-side
+        expressions = ", ".join(EVENT_GROUP_EXPRESSIONS[key] for key in group_by)
+        query = f"SELECT VALUE [c.event_type, {expressions}] FROM c WHERE c.timestamp >= @cutoff"
+        parameters = [{"name": "@cutoff", "value": since.astimezone(timezone.utc).isoformat()}]
+        
+        try:
+            # max_item_count=-1 lets the service size pages; the iterator
+            # follows continuation tokens until the query is drained.
+            # Identical rows are counted in one pass, so the loop below runs
+            # once per distinct row rather than once per event.
+            rows = Counter(map(tuple, self.container.query_items(
+                query=query,
+                parameters=parameters,
+                max_item_count=-1,
+                enable_cross_partition_query=True
+            )))
+            
+        except CosmosHttpResponseError as e:
+            logger.error(f"Failed to aggregate events: {e}")
+            raise
+        
+        groups = {key: defaultdict(Counter) for key in group_by}
+        group_columns = [groups[key] for key in group_by]
+        hour_column = group_by.index('hour') if 'hour' in group_by else -1
+        
+        for (event_type, *values), count in rows.items():
+            for column, (counts, value) in enumerate(zip(group_columns, values)):
+                if value is not None:
+                    if column == hour_column:
+                        value = int(value)
+                    counts[value][event_type] += count
+        
+        return {
+            key: {value: dict(counts) for value, counts in groups[key].items()}
+            for key in group_by
+        }
+    
     def get_vehicle_events(self, vehicle_id: str, limit: int = 100, 
-                          event_type: Optional[str] = None) -> List[Dict]:
+                          event_type: Optional[str] = None,
+                          since: Optional[datetime] = None) -> List[Dict]:
         """
         Retrieve events for a specific vehicle.
         
@@ -291,11 +676,13 @@ class CosmosDBService:
             vehicle_id: Unique identifier for the vehicle
             limit: Maximum number of events to return
             event_type: Filter by event type (optional)
+            since: Only return events with a timestamp at or after this time (optional)
             
         Returns:
             List of event documents
         """
-        cache_key = f"vehicle_events_{vehicle_id}_{event_type}_{limit}"
+        since_iso = since.astimezone(timezone.utc).isoformat() if since else None
+        cache_key = f"vehicle_events_{vehicle_id}_{event_type}_{limit}_{since_iso}"
         cached_result = cache.get(cache_key)
         
         if cached_result is not None:
@@ -309,6 +696,10 @@ class CosmosDBService:
                 query += " AND c.event_type = @event_type"
                 parameters.append({"name": "@event_type", "value": event_type})
             
+            if since_iso:
+                query += " AND c.timestamp >= @since"
+                parameters.append({"name": "@since", "value": since_iso})
+            
             query += " ORDER BY c.timestamp DESC"
             
             items = list(self.container.query_items(
@@ -327,47 +718,124 @@ class CosmosDBService:
             logger.error(f"Failed to retrieve vehicle events: {e}")
             raise
     
-    def get_zone_events(self, zone_id: str, limit: int = 100) -> List[Dict]:
+    @staticmethod
+    def _bump_zone_events_version(zone_id: str) -> None:
+        """
+        Invalidate every cached get_zone_events result for a zone.
+        
+        Results are cached per limit bucket and cutoff, so rather than
+        deleting each key the zone's version, which is part of every key,
+        is incremented; superseded entries expire on their own.
+        """
+        version_key = f"zone_events_version_{zone_id}"
+        try:
+            cache.incr(version_key)
+        except ValueError:
+            cache.set(version_key, 1, None)
+    
+    def get_zone_events(self, zone_id: str, limit: int = 100,
+                        since: Optional[datetime] = None) -> List[Dict]:
         """
         Retrieve events for a specific zone.
         
+        Results are cached per limit bucket, so callers asking for different
+        limits up to the same bucket size share one query and cache entry.
+        Storing a zone event invalidates the zone's cached results.
+        
         Args:
             zone_id: Identifier for the geofence zone
             limit: Maximum number of events to return
+            since: Only return events with a timestamp at or after this time (optional)
             
         Returns:
-            List of event documents
+            List of event documents, most recent first
         """
-        cache_key = f"zone_events_{zone_id}_{limit}"
+        bucket = next((size for size in ZONE_EVENTS_LIMIT_BUCKETS if size >= limit), limit)
+        since_iso = since.astimezone(timezone.utc).isoformat() if since else None
+        version = cache.get(f"zone_events_version_{zone_id}", 0)
+        cache_key = f"zone_events_{zone_id}_v{version}_{bucket}_{since_iso}"
         cached_result = cache.get(cache_key)
         
         if cached_result is not None:
-            return cached_result
+            return cached_result[:limit]
         
         try:
             query = """
-            SELECT * FROM c 
+            SELECT TOP @limit * FROM c 
             WHERE c.zone_id = @zone_id 
             AND c.event_type IN ('zone_entry', 'zone_exit')
-            ORDER BY c.timestamp DESC
             """
+            parameters = [
+                {"name": "@limit", "value": bucket},
+                {"name": "@zone_id", "value": zone_id}
+            ]
+            
+            if since_iso:
+                query += "AND c.timestamp >= @since\n"
+                parameters.append({"name": "@since", "value": since_iso})
+            
+            query += "ORDER BY c.timestamp DESC"
             
             items = list(self.container.query_items(
                 query=query,
-                parameters=[{"name": "@zone_id", "value": zone_id}],
-                max_item_count=limit,
+                parameters=parameters,
+                max_item_count=-1,
                 enable_cross_partition_query=True
             ))
             
-            # Cache for 10 minutes
-            cache.set(cache_key, items, 600)
+            cache.set(cache_key, items, settings.ZONE_EVENTS_CACHE_TIMEOUT)
             
-            return items
+            return items[:limit]
             
         except CosmosHttpResponseError as e:
             logger.error(f"Failed to retrieve zone events: {e}")
             raise
     
+    def get_latest_zone_event_ts(self, zone_id: Optional[str] = None) -> Optional[int]:
+        """
+        Get the server-side write time of the newest zone entry/exit event.
+        
+        Cached briefly, since it is read on every conditional zone request.
+        
+        Args:
+            zone_id: Only consider events for this zone (optional)
+            
+        Returns:
+            Cosmos DB _ts (epoch seconds) of the newest event, or None if there are none
+        """
+        cache_key = f"zone_latest_ts_{zone_id or 'all'}"
+        cached_result = cache.get(cache_key)
+        
+        if cached_result is not None:
+            return cached_result
+        
+        try:
+            query = """
+            SELECT VALUE MAX(c._ts) FROM c 
+            WHERE c.event_type IN ('zone_entry', 'zone_exit')
+            """
+            parameters = []
+            
+            if zone_id:
+                query += "AND c.zone_id = @zone_id\n"
+                parameters.append({"name": "@zone_id", "value": zone_id})
+            
+            results = list(self.container.query_items(
+                query=query,
+                parameters=parameters,
+                enable_cross_partition_query=True
+            ))
+            
+            latest_ts = results[0] if results else None
+            if latest_ts is not None:
+                cache.set(cache_key, latest_ts, settings.ZONE_LATEST_TS_CACHE_TIMEOUT)
+            
+            return latest_ts
+            
+        except CosmosHttpResponseError as e:
+            logger.error(f"Failed to retrieve latest zone event time: {e}")
+            raise
+    
     def get_vehicle_current_status(self, vehicle_id: str) -> Optional[Dict]:
         """
         Get the current status of a vehicle including its latest location and zones.
@@ -494,6 +962,145 @@ class CosmosDBService:
         except CosmosHttpResponseError as e:
             logger.error(f"Failed to retrieve recent events: {e}")
             raise
+    
+    def get_vehicle_zones(self, vehicle_id: str) -> Tuple[str, ...]:
+        """
+        Get the zone IDs a vehicle is currently in.
+        
+        Served from the cache populated by set_vehicle_zones; falls back to
+        get_vehicle_current_status on a cache miss.
+        
+        Args:
+            vehicle_id: Unique identifier for the vehicle
+            
+        Returns:
+            Sorted tuple of zone IDs
+        """
+        cache_key = f"vehicle_zones_{vehicle_id}"
+        zones = cache.get(cache_key)
+        
+        if zones is None:
+            status = self.get_vehicle_current_status(vehicle_id) or {}
+            zones = tuple(sorted(status.get('current_zones', ())))
+            cache.set(cache_key, zones, settings.VEHICLE_ZONES_CACHE_TIMEOUT)
+        
+        return zones
+    
+    def set_vehicle_zones(self, vehicle_id: str, zones: Iterable[str]) -> None:
+        """
+        Record the zone IDs a vehicle is currently in.
+        
+        Args:
+            vehicle_id: Unique identifier for the vehicle
+            zones: Zone IDs the vehicle is in after its latest location update
+        """
+        cache.set(f"vehicle_zones_{vehicle_id}", tuple(sorted(zones)), settings.VEHICLE_ZONES_CACHE_TIMEOUT)
+    
+    def iter_recent_events(self, limit: int = 100, event_type: Optional[str] = None,
+                           page_size: int = 50) -> Iterator[Dict]:
+        """
+        Yield recent events from Cosmos DB one page at a time.
+        
+        Unlike get_recent_events, results are not cached or collected into a
+        list; pages are fetched lazily via the query's continuation token.
+        
+        Args:
+            limit: Maximum number of events to yield
+            event_type: Optional filter by event type
+            page_size: Number of items requested per page
+            
+        Yields:
+            Event documents, most recent first
+        """
+        for page in self.iter_recent_event_pages(limit, event_type, page_size):
+            yield from page
+    
+    def iter_recent_event_pages(self, limit: int = 100, event_type: Optional[str] = None,
+                                page_size: int = 100) -> Iterator[List[Dict]]:
+        """
+        Yield recent events from Cosmos DB as lists, one per result page.
+        
+        Lets callers aggregate page by page so only one page of documents is
+        held in memory at a time.
+        
+        Args:
+            limit: Maximum number of events to yield across all pages
+            event_type: Optional filter by event type
+            page_size: Number of items requested per page
+            
+        Yields:
+            Lists of event documents, most recent first
+        """
+        if event_type:
+            query = "SELECT TOP @limit * FROM c WHERE c.event_type = @event_type ORDER BY c._ts DESC"
+            parameters = [
+                {"name": "@limit", "value": limit},
+                {"name": "@event_type", "value": event_type}
+            ]
+        else:
+            query = "SELECT TOP @limit * FROM c ORDER BY c._ts DESC"
+            parameters = [{"name": "@limit", "value": limit}]
+        
+        items = self.container.query_items(
+            query=query,
+            parameters=parameters,
+            max_item_count=page_size,
+            enable_cross_partition_query=True
+        )
+        
+        for page in items.by_page():
+            yield list(page)
+    
+    def get_recent_events_columnar(self, fields: Tuple[str, ...], limit: int = 100,
+                                  event_type: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """
+        Get recent events as one NumPy array per field.
+        
+        Only the requested fields are projected server-side, and rows are
+        transposed into columns so callers can filter and group with array
+        operations instead of per-event dict lookups.
+        
+        Args:
+            fields: Event document fields to return
+            limit: Maximum number of events to return
+            event_type: Optional filter by event type
+            
+        Returns:
+            Dictionary mapping each field to an array of its values, most
+            recent event first; missing values are None
+        """
+        projection = ", ".join(f"c.{field}" for field in fields)
+        parameters = [{"name": "@limit", "value": limit}]
+        
+        if event_type:
+            query = (f"SELECT TOP @limit {projection} FROM c "
+                     "WHERE c.event_type = @event_type ORDER BY c._ts DESC")
+            parameters.append({"name": "@event_type", "value": event_type})
+        else:
+            query = f"SELECT TOP @limit {projection} FROM c ORDER BY c._ts DESC"
+        
+        try:
+            rows = list(self.container.query_items(
+                query=query,
+                parameters=parameters,
+                max_item_count=-1,
+                enable_cross_partition_query=True
+            ))
+            
+        except CosmosHttpResponseError as e:
+            logger.error(f"Failed to retrieve recent event columns: {e}")
+            raise
+        
+        return {field: np.array([row.get(field) for row in rows]) for field in fields}
+    
+    def ping(self) -> None:
+        """
+        Check Cosmos DB connectivity with a single container metadata read.
+        
+        Raises:
+            CosmosHttpResponseError: If the container cannot be reached
+        """
+        self.container.read()
 
 
 # Global instance
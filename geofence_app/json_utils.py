@@ -0,0 +1,34 @@
+"""
+Fast JSON encoding and decoding helpers for API views.
+Uses orjson instead of the stdlib json module and DjangoJSONEncoder.
+"""
+
+from typing import Any
+
+import orjson
+from django.http import HttpResponse
+
+JSONDecodeError = orjson.JSONDecodeError
+
+loads = orjson.loads
+
+_DUMPS_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NAIVE_UTC
+
+
+def dumps(data: Any) -> bytes:
+    """Serialize data to JSON bytes using the same options as json_response."""
+    return orjson.dumps(data, option=_DUMPS_OPTIONS)
+
+
+def json_response(data: Any, status: int = 200) -> HttpResponse:
+    """
+    Serialize data with orjson and wrap it in an HttpResponse.
+    
+    Datetimes are encoded as ISO 8601 strings in UTC with a 'Z' suffix,
+    so views can pass datetime objects through without calling isoformat().
+    """
+    return HttpResponse(
+        dumps(data),
+        status=status,
+        content_type='application/json'
+    )
@@ -0,0 +1,19 @@
+"""
+Django management command to backfill taxi latest-location documents.
+"""
+
+from django.core.management.base import BaseCommand
+from taxi_cosmos_service import taxi_cosmos_service
+
+
+class Command(BaseCommand):
+    help = 'Create or advance each taxi\'s latest-location document from its stored location events'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Backfilling latest taxi locations...')
+        
+        written = taxi_cosmos_service.backfill_latest_locations()
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'Latest locations written for {written} taxis')
+        )
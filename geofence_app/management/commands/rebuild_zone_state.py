@@ -0,0 +1,19 @@
+"""
+Django management command to rebuild the zone_state container.
+"""
+
+from django.core.management.base import BaseCommand
+from geofence_app.cosmos_service import cosmos_service
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the zone_state container from stored zone entry/exit events'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding zone state from zone events...')
+        
+        written = cosmos_service.rebuild_zone_state()
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'Zone state rebuilt: {written} vehicles currently inside zones')
+        )
@@ -0,0 +1,64 @@
+"""
+DRF serializers for geofence API request payloads.
+"""
+
+from typing import Dict
+
+from rest_framework import serializers
+
+from .time_utils import parse_iso_timestamp
+
+
+def _required(field: str) -> Dict[str, str]:
+    """Error messages for a required field, matching the API's error format."""
+    return {
+        'required': f'Missing required field: {field}',
+        'null': f'Missing required field: {field}',
+    }
+
+
+class ISOTimestampField(serializers.DateTimeField):
+    """DateTimeField that parses timestamps with parse_iso_timestamp."""
+    
+    def to_internal_value(self, value):
+        if isinstance(value, str):
+            try:
+                return self.enforce_timezone(parse_iso_timestamp(value))
+            except ValueError:
+                self.fail('invalid', format='ISO 8601')
+        return super().to_internal_value(value)
+
+
+class LocationEventSerializer(serializers.Serializer):
+    """Validates a single GPS location event."""
+    
+    vehicle_id = serializers.CharField(max_length=64, error_messages=_required('vehicle_id'))
+    latitude = serializers.FloatField(
+        min_value=-90,
+        max_value=90,
+        error_messages={
+            **_required('latitude'),
+            'min_value': 'Invalid latitude. Must be between -90 and 90',
+            'max_value': 'Invalid latitude. Must be between -90 and 90',
+        }
+    )
+    longitude = serializers.FloatField(
+        min_value=-180,
+        max_value=180,
+        error_messages={
+            **_required('longitude'),
+            'min_value': 'Invalid longitude. Must be between -180 and 180',
+            'max_value': 'Invalid longitude. Must be between -180 and 180',
+        }
+    )
+    timestamp = ISOTimestampField(
+        required=False,
+        error_messages={'invalid': 'Invalid timestamp format. Use ISO 8601 format'}
+    )
+    metadata = serializers.DictField(required=False, default=dict)
+
+
+def first_error(errors: Dict) -> str:
+    """Return the first validation message from serializer.errors."""
+    messages = next(iter(errors.values()))
+    return str(messages[0])
@@ -0,0 +1,124 @@
+"""
+Celery tasks for geofence event processing.
+Persists location events to Cosmos DB off the HTTP request path.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from azure.cosmos.exceptions import CosmosHttpResponseError
+from celery import shared_task
+
+from .cosmos_service import cosmos_service
+from .time_utils import parse_iso_timestamp
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Parse the ISO 8601 timestamp carried in a task payload."""
+    return parse_iso_timestamp(value) if value else None
+
+
+@shared_task(autoretry_for=(CosmosHttpResponseError,), retry_backoff=True, max_retries=3)
+def persist_location_event(event: Dict) -> None:
+    """Store a location event in the main events container."""
+    cosmos_service.store_location_event(
+        vehicle_id=event['vehicle_id'],
+        latitude=event['latitude'],
+        longitude=event['longitude'],
+        timestamp=_parse_timestamp(event.get('timestamp')),
+        metadata=event.get('metadata'),
+        event_id=event['event_id']
+    )
+    
+    logger.info("Processed location event for vehicle %s", event['vehicle_id'])
+
+
+@shared_task(autoretry_for=(CosmosHttpResponseError,), retry_backoff=True, max_retries=3)
+def persist_zone_events(events: List[Dict]) -> None:
+    """Store zone entry/exit events and apply them to the zone_state container."""
+    for event in events:
+        cosmos_service.store_zone_event(
+            vehicle_id=event['vehicle_id'],
+            zone_id=event['zone_id'],
+            event_type=event['event_type'],
+            latitude=event['latitude'],
+            longitude=event['longitude'],
+            timestamp=_parse_timestamp(event.get('timestamp')),
+            metadata=event.get('metadata')
+        )
+
+
+@shared_task(autoretry_for=(CosmosHttpResponseError,), retry_backoff=True, max_retries=3)
+def persist_taxi_location(event: Dict) -> None:
+    """Store a taxi location update in the taxi-specific container."""
+    from taxi_cosmos_service import taxi_cosmos_service
+    
+    taxi_cosmos_service.store_taxi_location(
+        taxi_id=event['vehicle_id'],
+        latitude=event['latitude'],
+        longitude=event['longitude'],
+        timestamp=_parse_timestamp(event.get('timestamp')),
+        metadata=event.get('metadata'),
+        event_id=event['event_id']
+    )
+
+
+def _store_taxi_batch(events: List[Dict]) -> None:
+    """Store a batch of taxi location updates in the taxi-specific container."""
+    from taxi_cosmos_service import taxi_cosmos_service
+    
+    taxi_cosmos_service.store_batch([
+        taxi_cosmos_service.build_location_document(
+            taxi_id=event['vehicle_id'],
+            latitude=event['latitude'],
+            longitude=event['longitude'],
+            timestamp=event['timestamp'],
+            metadata=event.get('metadata'),
+            event_id=event['event_id']
+        )
+        for event in events
+    ])
+
+
+class VehicleSideEffect(NamedTuple):
+    """Extra persistence for one vehicle type."""
+    task: Any  # Celery task queued for a single event
+    store_batch: Callable[[List[Dict]], None]  # Stores a batch with parsed timestamps
+
+
+# Extra persistence per vehicle ID prefix (the part before the first '_'),
+# shared by the single-event and bulk paths
+VEHICLE_SIDE_EFFECTS = {
+    'taxi': VehicleSideEffect(task=persist_taxi_location, store_batch=_store_taxi_batch),
+}
+
+
+def vehicle_prefix(vehicle_id: str) -> Optional[str]:
+    """Return the prefix VEHICLE_SIDE_EFFECTS is keyed by, or None if the ID has none."""
+    prefix, separator, _ = vehicle_id.partition('_')
+    return prefix if separator else None
+
+
+@shared_task(autoretry_for=(CosmosHttpResponseError,), retry_backoff=True, max_retries=3)
+def persist_location_events_bulk(events: List[Dict]) -> None:
+    """Store a batch of location events, including vehicle-type specific copies."""
+    # Parse into copies: a retry is called with the same, still serialized, arguments
+    events = [{**event, 'timestamp': _parse_timestamp(event.get('timestamp'))} for event in events]
+    
+    # Bulk writes are upserts, so a retried batch does not conflict with itself
+    stored = cosmos_service.store_location_events_bulk(events)
+    
+    events_by_prefix = defaultdict(list)
+    for event in events:
+        prefix = vehicle_prefix(event['vehicle_id'])
+        if prefix in VEHICLE_SIDE_EFFECTS:
+            events_by_prefix[prefix].append(event)
+    
+    for prefix, prefixed_events in events_by_prefix.items():
+        VEHICLE_SIDE_EFFECTS[prefix].store_batch(prefixed_events)
+    
+    logger.info("Processed %s bulk location events", stored)
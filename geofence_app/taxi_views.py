@@ -23,13 +23,24 @@ def get_all_taxis_status(request):
     """
     Get the current status of all active taxis.
     
-    Returns current location and state for each taxi.
+    Returns current location and state for each taxi. Pass page_size (and
+    then the returned continuation_token as continuation) to page through
+    large fleets.
     """
     try:
         hours = int(request.GET.get('hours', 1))
+        page_size = request.GET.get('page_size')
+        continuation_token = None
         
-        # Get all active taxis
-        active_taxis = taxi_cosmos_service.get_all_active_taxis(hours=hours)
+        # Get all active taxis, or one page of them
+        if page_size is not None:
+            active_taxis, continuation_token = taxi_cosmos_service.get_active_taxis_page(
+                hours=hours,
+                page_size=int(page_size),
+                continuation_token=request.GET.get('continuation')
+            )
+        else:
+            active_taxis = taxi_cosmos_service.get_all_active_taxis(hours=hours)
         
         # Enhance with current state information
         taxis_with_states = []
@@ -49,15 +60,19 @@ def get_all_taxis_status(request):
             }
             taxis_with_states.append(taxi_info)
         
-        return JsonResponse({
+        response_data = {
             'taxis': taxis_with_states,
             'count': len(taxis_with_states),
             'time_range_hours': hours
-        })
+        }
+        if page_size is not None:
+            response_data['continuation_token'] = continuation_token
+        
+        return JsonResponse(response_data)
         
     except ValueError:
         return JsonResponse({
-            'error': 'Invalid hours parameter'
+            'error': 'Invalid hours or page_size parameter'
         }, status=400)
     except Exception as e:
         logger.error(f"Error getting all taxis status: {e}")
@@ -214,10 +229,11 @@ def get_state_taxi_activity(request, state_name):
         # Filter by time if specified
         if hours > 0:
             from datetime import timedelta
-            cutoff_time = datetime.now(timezone.utc) - timedelta(hours=hours)
+            # UTC ISO 8601 timestamps sort chronologically; compare without parsing
+            cutoff_iso = (datetime.now(timezone.utc) - timedelta(hours=hours)).isoformat()
             state_events = [
                 event for event in state_events
-                if datetime.fromisoformat(event['timestamp'].replace('Z', '+00:00')) >= cutoff_time
+                if event['timestamp'] >= cutoff_iso
             ]
         
         # Analyze events
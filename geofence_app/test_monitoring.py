@@ -0,0 +1,57 @@
+"""
+Tests for the monitoring health checks.
+"""
+
+from django.test import TestCase
+from unittest.mock import patch, MagicMock
+
+
+class HealthCheckerTestCase(TestCase):
+    """Test cases for the monitoring health checks."""
+    
+    @patch('monitoring.h3_geofence_service', new=MagicMock())
+    def test_run_all_checks_calls_each_check(self):
+        """Every registered check runs and contributes its result."""
+        from monitoring import HealthChecker
+        
+        healthy = {'healthy': True, 'message': 'ok', 'details': {}}
+        check_names = ['_check_database', '_check_cache', '_check_h3_service',
+                       '_check_disk_space', '_check_memory']
+        patchers = [patch.object(HealthChecker, name, return_value=healthy) for name in check_names]
+        mocks = [patcher.start() for patcher in patchers]
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+        
+        results = HealthChecker().run_all_checks()
+        
+        for mock_check in mocks:
+            mock_check.assert_called_once_with()
+        self.assertEqual(results['overall_status'], 'healthy')
+        self.assertEqual(
+            set(results['checks']),
+            {'database', 'cache', 'h3_service', 'disk_space', 'memory'}
+        )
+    
+    @patch('monitoring.h3_geofence_service', new=None)
+    def test_h3_check_skipped_without_service(self):
+        """Without the optional H3 service its check is left out, not failed."""
+        from monitoring import HealthChecker
+        
+        healthy = {'healthy': True, 'message': 'ok', 'details': {}}
+        check_names = ['_check_database', '_check_cache', '_check_disk_space', '_check_memory']
+        for name in check_names:
+            patcher = patch.object(HealthChecker, name, return_value=healthy)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        
+        results = HealthChecker().run_all_checks()
+        
+        self.assertNotIn('h3_service', results['checks'])
+        self.assertEqual(results['overall_status'], 'healthy')
+    
+    def test_cached_check_does_not_shadow_cache_check(self):
+        """The per-process result store leaves the cache check callable."""
+        from monitoring import HealthChecker
+        
+        checker = HealthChecker()
+        self.assertTrue(callable(checker.checks['cache']))
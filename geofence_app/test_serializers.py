@@ -0,0 +1,53 @@
+"""
+Tests for the geofence API request serializers.
+"""
+
+from datetime import datetime, timezone
+
+from django.test import TestCase
+
+from .serializers import LocationEventSerializer
+
+
+class LocationEventSerializerTestCase(TestCase):
+    """Test cases for location event validation."""
+    
+    def setUp(self):
+        """Valid location event payload."""
+        self.data = {
+            'vehicle_id': 'test_taxi_001',
+            'latitude': 40.7589,
+            'longitude': -73.7804,
+            'timestamp': '2024-01-01T12:00:00+02:00'
+        }
+    
+    def test_valid_event(self):
+        """Timestamps are converted to UTC and metadata defaults to empty."""
+        serializer = LocationEventSerializer(data=self.data)
+        
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.validated_data['timestamp'],
+                         datetime(2024, 1, 1, 10, 0, tzinfo=timezone.utc))
+        self.assertEqual(serializer.validated_data['metadata'], {})
+    
+    def test_missing_field(self):
+        """Missing fields are reported by name."""
+        serializer = LocationEventSerializer(data={'vehicle_id': 'test_taxi_001'})
+        
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors['latitude'][0], 'Missing required field: latitude')
+    
+    def test_invalid_coordinates(self):
+        """Out of range coordinates are rejected."""
+        serializer = LocationEventSerializer(data={**self.data, 'latitude': 91, 'longitude': 181})
+        
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors['latitude'][0], 'Invalid latitude. Must be between -90 and 90')
+        self.assertEqual(serializer.errors['longitude'][0], 'Invalid longitude. Must be between -180 and 180')
+    
+    def test_invalid_timestamp(self):
+        """Malformed timestamps are rejected."""
+        serializer = LocationEventSerializer(data={**self.data, 'timestamp': 'yesterday'})
+        
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors['timestamp'][0], 'Invalid timestamp format. Use ISO 8601 format')
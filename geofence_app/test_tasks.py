@@ -0,0 +1,34 @@
+"""
+Tests for the Celery persistence tasks.
+"""
+
+from datetime import datetime, timezone
+
+from django.test import TestCase
+from unittest.mock import patch
+
+from .tasks import persist_location_events_bulk
+
+
+class PersistLocationEventsBulkTestCase(TestCase):
+    """Test cases for persist_location_events_bulk."""
+    
+    @patch('geofence_app.tasks.VEHICLE_SIDE_EFFECTS', {})
+    @patch('geofence_app.tasks.cosmos_service')
+    def test_retry_sees_original_arguments(self, mock_cosmos):
+        """Parsing timestamps leaves the task arguments intact for a retry."""
+        events = [{
+            'event_id': 'event_1',
+            'vehicle_id': 'bus_1',
+            'latitude': 40.75,
+            'longitude': -73.98,
+            'timestamp': '2024-01-01T12:00:00+00:00',
+            'metadata': {}
+        }]
+        
+        persist_location_events_bulk(events)
+        persist_location_events_bulk(events)
+        
+        self.assertEqual(events[0]['timestamp'], '2024-01-01T12:00:00+00:00')
+        stored = mock_cosmos.store_location_events_bulk.call_args.args[0]
+        self.assertEqual(stored[0]['timestamp'], datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc))
@@ -0,0 +1,70 @@
+"""
+Tests for the timestamp parsing helpers.
+"""
+
+from datetime import datetime, timezone
+from django.test import TestCase
+
+import numpy as np
+
+from .time_utils import parse_iso_timestamp, to_datetime64
+
+
+class ParseIsoTimestampTestCase(TestCase):
+    """Test cases for parse_iso_timestamp."""
+    
+    def test_utc_designators(self):
+        """'Z' and '+00:00' timestamps parse to the same UTC datetime."""
+        expected = datetime(2024, 1, 1, 12, 30, 15, tzinfo=timezone.utc)
+        
+        self.assertEqual(parse_iso_timestamp('2024-01-01T12:30:15Z'), expected)
+        self.assertEqual(parse_iso_timestamp('2024-01-01T12:30:15+00:00'), expected)
+        self.assertEqual(parse_iso_timestamp('2024-01-01T12:30:15Z').tzinfo, timezone.utc)
+    
+    def test_other_offsets_are_converted_to_utc(self):
+        """Timestamps with another offset come back in UTC."""
+        parsed = parse_iso_timestamp('2024-01-01T12:30:15.250+05:00')
+        
+        self.assertEqual(parsed, datetime(2024, 1, 1, 7, 30, 15, 250000, tzinfo=timezone.utc))
+        self.assertEqual(parsed.tzinfo, timezone.utc)
+        self.assertEqual(parsed.isoformat(), '2024-01-01T07:30:15.250000+00:00')
+    
+    def test_naive_timestamps_are_utc(self):
+        """Timestamps without an offset are taken to be in UTC."""
+        self.assertEqual(parse_iso_timestamp('2024-01-01T12:30:15'),
+                         datetime(2024, 1, 1, 12, 30, 15, tzinfo=timezone.utc))
+    
+    def test_invalid_timestamps(self):
+        """Malformed timestamps raise ValueError."""
+        for value in ('not-a-timestamp', '2024-13-01T00:00:00Z', '2024-01-01T25:00:00Z'):
+            with self.assertRaises(ValueError):
+                parse_iso_timestamp(value)
+
+
+class ToDatetime64TestCase(TestCase):
+    """Test cases for to_datetime64."""
+    
+    def test_utc_timestamps(self):
+        """UTC designators are dropped and values are parsed to millisecond precision."""
+        values = to_datetime64([
+            '2024-01-01T12:30:15Z',
+            '2024-01-01T12:30:15+00:00',
+            '2024-01-01T12:30:15.123456'
+        ])
+        
+        self.assertEqual(values.dtype, np.dtype('datetime64[ms]'))
+        self.assertEqual(values[0], np.datetime64('2024-01-01T12:30:15.000'))
+        self.assertEqual(values[0], values[1])
+        self.assertEqual(values[2], np.datetime64('2024-01-01T12:30:15.123'))
+    
+    def test_other_offsets_are_converted_to_utc(self):
+        """Timestamps with another offset are converted rather than rejected."""
+        values = to_datetime64(['2024-01-01T12:30:15+05:00', '2024-01-01T12:30:15.5-04:00'])
+        
+        self.assertEqual(values[0], np.datetime64('2024-01-01T07:30:15.000'))
+        self.assertEqual(values[1], np.datetime64('2024-01-01T16:30:15.500'))
+    
+    def test_invalid_timestamps(self):
+        """Malformed timestamps raise ValueError."""
+        with self.assertRaises(ValueError):
+            to_datetime64(['not-a-timestamp'])
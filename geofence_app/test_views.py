@@ -0,0 +1,174 @@
+"""
+Tests for the location event API views.
+"""
+
+import json
+from django.test import TestCase
+from unittest.mock import patch
+
+
+@patch('geofence_app.views.persist_zone_events')
+@patch('geofence_app.views.persist_location_event')
+@patch('geofence_app.views.arcgis_geofence_service')
+@patch('geofence_app.views.cosmos_service')
+class LocationEventTestCase(TestCase):
+    """Test cases for the single location event endpoint."""
+    
+    def test_zone_transition(self, mock_cosmos, mock_arcgis, mock_persist_location,
+                             mock_persist_zones):
+        """Crossing a state border queues an exit and an entry and updates the zone cache."""
+        mock_cosmos.get_vehicle_zones.return_value = ('new_jersey',)
+        mock_arcgis.classify_point_realtime.return_value = 'New York'
+        
+        response = self.client.post('/api/v1/events/location/', data=json.dumps({
+            'vehicle_id': 'bus_1', 'latitude': 40.75, 'longitude': -73.98
+        }), content_type='application/json')
+        
+        self.assertEqual(response.status_code, 202)
+        data = response.json()
+        self.assertEqual(data['current_zones'], [{'id': 'new_york', 'name': 'New York'}])
+        self.assertEqual(data['zone_events'], [
+            {'zone_id': 'new_york', 'event_type': 'zone_entry'},
+            {'zone_id': 'new_jersey', 'event_type': 'zone_exit'}
+        ])
+        mock_cosmos.set_vehicle_zones.assert_called_once_with('bus_1', ('new_york',))
+        queued = mock_persist_zones.delay.call_args.args[0]
+        self.assertEqual([e['zone_id'] for e in queued], ['new_york', 'new_jersey'])
+        self.assertEqual(queued[0]['timestamp'], mock_persist_location.delay.call_args.args[0]['timestamp'])
+
+
+@patch('geofence_app.views.persist_zone_events')
+@patch('geofence_app.views.persist_location_events_bulk')
+@patch('geofence_app.views.arcgis_geofence_service')
+@patch('geofence_app.views.cosmos_service')
+class BulkLocationEventsTestCase(TestCase):
+    """Test cases for the bulk location event endpoint."""
+    
+    url = '/api/v1/events/location/bulk/'
+    
+    def _post(self, events):
+        return self.client.post(self.url, data=json.dumps({'events': events}),
+                                content_type='application/json')
+    
+    def test_zone_transitions_per_vehicle(self, mock_cosmos, mock_arcgis, mock_persist_locations,
+                                          mock_persist_zones):
+        """Transitions chain through a vehicle's events in timestamp order."""
+        mock_cosmos.get_vehicle_zones.return_value = ('new_jersey',)
+        mock_arcgis.classify_points.return_value = ['New Jersey', 'New York']
+        
+        response = self._post([
+            {'vehicle_id': 'taxi_1', 'latitude': 40.72, 'longitude': -74.05,
+             'timestamp': '2024-01-01T12:01:00Z'},
+            {'vehicle_id': 'taxi_1', 'latitude': 40.75, 'longitude': -73.98,
+             'timestamp': '2024-01-01T12:00:00Z'}
+        ])
+        
+        self.assertEqual(response.status_code, 202)
+        results = response.json()['events']
+        self.assertEqual(results[1]['zone_events'], [
+            {'zone_id': 'new_york', 'event_type': 'zone_entry'},
+            {'zone_id': 'new_jersey', 'event_type': 'zone_exit'}
+        ])
+        self.assertEqual(results[0]['zone_events'], [
+            {'zone_id': 'new_jersey', 'event_type': 'zone_entry'},
+            {'zone_id': 'new_york', 'event_type': 'zone_exit'}
+        ])
+        self.assertEqual(results[0]['current_zones'], [{'id': 'new_jersey', 'name': 'New Jersey'}])
+        
+        mock_cosmos.get_vehicle_zones.assert_called_once_with('taxi_1')
+        mock_cosmos.set_vehicle_zones.assert_not_called()
+        mock_persist_locations.delay.assert_called_once()
+        queued = mock_persist_zones.delay.call_args.args[0]
+        self.assertEqual([(e['zone_id'], e['event_type'], e['timestamp']) for e in queued], [
+            ('new_york', 'zone_entry', '2024-01-01T12:00:00+00:00'),
+            ('new_jersey', 'zone_exit', '2024-01-01T12:00:00+00:00'),
+            ('new_jersey', 'zone_entry', '2024-01-01T12:01:00+00:00'),
+            ('new_york', 'zone_exit', '2024-01-01T12:01:00+00:00')
+        ])
+    
+    def test_zone_cache_updated(self, mock_cosmos, mock_arcgis, mock_persist_locations,
+                                mock_persist_zones):
+        """A vehicle whose zones changed has its zone cache updated once."""
+        mock_cosmos.get_vehicle_zones.return_value = ()
+        mock_arcgis.classify_points.return_value = ['New York', None]
+        
+        response = self._post([
+            {'vehicle_id': 'taxi_1', 'latitude': 40.75, 'longitude': -73.98},
+            {'vehicle_id': 'taxi_2', 'latitude': 0.0, 'longitude': 0.0}
+        ])
+        
+        self.assertEqual(response.status_code, 202)
+        results = response.json()['events']
+        self.assertEqual(results[0]['zone_events'], [{'zone_id': 'new_york', 'event_type': 'zone_entry'}])
+        self.assertEqual(results[1]['zone_events'], [])
+        self.assertEqual(results[1]['current_zones'], [])
+        mock_cosmos.set_vehicle_zones.assert_called_once_with('taxi_1', ('new_york',))
+        self.assertEqual(len(mock_persist_zones.delay.call_args.args[0]), 1)
+    
+    def test_invalid_vehicle_id(self, mock_cosmos, mock_arcgis, mock_persist_locations,
+                                mock_persist_zones):
+        """Rows are validated like single events and reported by index."""
+        response = self._post([
+            {'vehicle_id': 'taxi_1', 'latitude': 40.75, 'longitude': -73.98},
+            {'vehicle_id': {'id': 1}, 'latitude': 40.75, 'longitude': -73.98},
+            {'vehicle_id': 'taxi_3', 'latitude': 40.75}
+        ])
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['invalid_indices'], [1, 2])
+        mock_persist_locations.delay.assert_not_called()
+    
+    def test_numeric_vehicle_id_normalized(self, mock_cosmos, mock_arcgis, mock_persist_locations,
+                                           mock_persist_zones):
+        """A numeric vehicle ID is queued as a string, as the single-event endpoint does."""
+        mock_cosmos.get_vehicle_zones.return_value = ()
+        mock_arcgis.classify_points.return_value = [None]
+        
+        response = self._post([{'vehicle_id': 42, 'latitude': 40.75, 'longitude': -73.98}])
+        
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(mock_persist_locations.delay.call_args.args[0][0]['vehicle_id'], '42')
+
+
+@patch('geofence_app.views.cosmos_service')
+class RecentEventsTestCase(TestCase):
+    """Test cases for the streamed recent events endpoint."""
+    
+    url = '/api/v1/events/recent/'
+    
+    def test_streams_all_pages(self, mock_cosmos):
+        """Events from every page are streamed inside one JSON document."""
+        mock_cosmos.iter_recent_event_pages.return_value = iter([[{'id': 1}, {'id': 2}], [{'id': 3}]])
+        
+        response = self.client.get(self.url)
+        
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([event['id'] for event in data['events']], [1, 2, 3])
+        self.assertEqual(data['count'], 3)
+        self.assertFalse(data['truncated'])
+    
+    def test_first_page_failure(self, mock_cosmos):
+        """A failure fetching the first page is reported as a server error."""
+        def pages():
+            raise RuntimeError('Cosmos DB unavailable')
+            yield
+        mock_cosmos.iter_recent_event_pages.return_value = pages()
+        
+        response = self.client.get(self.url)
+        
+        self.assertEqual(response.status_code, 500)
+    
+    def test_later_page_failure(self, mock_cosmos):
+        """A failure after streaming starts ends the document marked as truncated."""
+        def pages():
+            yield [{'id': 1}]
+            raise RuntimeError('Cosmos DB unavailable')
+        mock_cosmos.iter_recent_event_pages.return_value = pages()
+        
+        response = self.client.get(self.url)
+        
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(data['count'], 1)
+        self.assertTrue(data['truncated'])
@@ -4,6 +4,7 @@ Comprehensive test suite for the geofence event processing system.
 
 import json
 from datetime import datetime, timezone
+from django.core.cache import cache
 from django.test import TestCase, Client
 from django.urls import reverse
 from unittest.mock import patch, MagicMock
@@ -37,21 +38,18 @@ class GeofenceAPITestCase(TestCase):
         self.assertIn('status', data)
         self.assertIn('services', data)
     
-    @patch('geofence_app.cosmos_service.cosmos_service.store_location_event')
-    @patch('geofence_app.cosmos_service.cosmos_service.get_vehicle_current_status')
-    def test_process_location_event_success(self, mock_get_status, mock_store_event):
+    @patch('geofence_app.tasks.persist_zone_events.delay')
+    @patch('geofence_app.cosmos_service.cosmos_service.get_vehicle_current_status', return_value=None)
+    @patch('geofence_app.tasks.persist_location_event.delay')
+    def test_process_location_event_success(self, mock_persist_event, mock_get_status, mock_persist_zones):
         """Test successful location event processing."""
-        # Mock responses
-        mock_store_event.return_value = 'event_123'
-        mock_get_status.return_value = {'current_zones': []}
-        
         response = self.client.post(
             '/api/v1/events/location/',
             data=json.dumps(self.sample_location_data),
             content_type='application/json'
         )
         
-        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.status_code, 202)
         data = response.json()
         self.assertTrue(data['success'])
         self.assertEqual(data['vehicle_id'], 'test_taxi_001')
@@ -86,6 +84,60 @@ class GeofenceAPITestCase(TestCase):
         data = response.json()
         self.assertIn('Invalid latitude', data['error'])
     
+    @patch('geofence_app.tasks.persist_zone_events.delay')
+    @patch('geofence_app.cosmos_service.cosmos_service.get_vehicle_current_status')
+    @patch('geofence_app.tasks.persist_location_event.delay')
+    def test_process_location_event_uses_cached_zones(self, mock_persist_event, mock_get_status,
+                                                      mock_persist_zones):
+        """Test that previous zones come from the cache after the first update."""
+        mock_get_status.return_value = {'current_zones': []}
+        cache.delete('vehicle_zones_test_taxi_001')
+        
+        for _ in range(2):
+            response = self.client.post(
+                '/api/v1/events/location/',
+                data=json.dumps(self.sample_location_data),
+                content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 202)
+        
+        mock_get_status.assert_called_once_with('test_taxi_001')
+    
+    @patch('geofence_app.tasks.persist_location_events_bulk.delay')
+    def test_process_location_events_bulk_success(self, mock_persist_events):
+        """Test bulk location event processing queues every event."""
+        second_event = dict(self.sample_location_data, vehicle_id='test_taxi_002')
+        
+        response = self.client.post(
+            '/api/v1/events/location/bulk/',
+            data=json.dumps({'events': [self.sample_location_data, second_event]}),
+            content_type='application/json'
+        )
+        
+        self.assertEqual(response.status_code, 202)
+        data = response.json()
+        self.assertEqual(data['accepted'], 2)
+        self.assertEqual(
+            [event['vehicle_id'] for event in data['events']],
+            ['test_taxi_001', 'test_taxi_002']
+        )
+        mock_persist_events.assert_called_once()
+        self.assertEqual(len(mock_persist_events.call_args.args[0]), 2)
+    
+    def test_process_location_events_bulk_invalid_coordinates(self):
+        """Test bulk location event processing reports invalid rows by index."""
+        invalid_event = dict(self.sample_location_data, longitude=-181.0)
+        
+        response = self.client.post(
+            '/api/v1/events/location/bulk/',
+            data=json.dumps({'events': [self.sample_location_data, invalid_event]}),
+            content_type='application/json'
+        )
+        
+        self.assertEqual(response.status_code, 400)
+        data = response.json()
+        self.assertEqual(data['invalid_indices'], [1])
+    
     @patch('geofence_app.cosmos_service.cosmos_service.get_vehicle_current_status')
     def test_get_vehicle_status_success(self, mock_get_status):
         """Test successful vehicle status retrieval."""
@@ -107,6 +159,21 @@ class GeofenceAPITestCase(TestCase):
         self.assertEqual(data['vehicle_id'], 'test_taxi_001')
         self.assertIn('latest_location', data)
     
+    @patch('geofence_app.cosmos_service.cosmos_service.get_vehicle_events')
+    @patch('geofence_app.cosmos_service.cosmos_service.get_vehicle_current_status')
+    def test_get_vehicle_status_include_events(self, mock_get_status, mock_get_events):
+        """Test that recent events are only fetched when requested."""
+        mock_get_status.return_value = {'vehicle_id': 'test_taxi_001', 'current_zones': []}
+        mock_get_events.return_value = [{'id': 'event_1'}]
+        
+        response = self.client.get('/api/v1/vehicles/test_taxi_001/status/')
+        self.assertNotIn('recent_events', response.json())
+        mock_get_events.assert_not_called()
+        
+        response = self.client.get('/api/v1/vehicles/test_taxi_001/status/?include=events')
+        self.assertEqual(response.json()['recent_events'], [{'id': 'event_1'}])
+        mock_get_events.assert_called_once_with('test_taxi_001', limit=10)
+    
     @patch('geofence_app.cosmos_service.cosmos_service.get_vehicle_current_status')
     def test_get_vehicle_status_not_found(self, mock_get_status):
         """Test vehicle status retrieval for non-existent vehicle."""
@@ -244,21 +311,22 @@ class CosmosServiceTestCase(TestCase):
         # Verify initialization calls
         mock_cosmos_client.assert_called_once()
         mock_client.create_database_if_not_exists.assert_called_once()
-        mock_database.create_container_if_not_exists.assert_called_once()
+        # Events container plus the zone_state materialized view
+        self.assertEqual(mock_database.create_container_if_not_exists.call_count, 2)
 
 
 class IntegrationTestCase(TestCase):
     """Integration tests for the complete system."""
     
-    @patch('geofence_app.cosmos_service.cosmos_service.store_location_event')
+    @patch('geofence_app.tasks.persist_zone_events.delay')
+    @patch('geofence_app.cosmos_service.cosmos_service.get_vehicle_current_status', return_value=None)
+    @patch('geofence_app.tasks.persist_location_event.delay')
     @patch('geofence_app.cosmos_service.cosmos_service.store_zone_event')
-    @patch('geofence_app.cosmos_service.cosmos_service.get_vehicle_current_status')
-    def test_complete_location_processing_flow(self, mock_get_status, mock_store_zone, mock_store_location):
+    def test_complete_location_processing_flow(self, mock_store_zone, mock_persist_location, mock_get_status,
+                                               mock_persist_zones):
         """Test the complete flow from location event to zone detection."""
         # Setup mocks
-        mock_store_location.return_value = 'location_event_123'
         mock_store_zone.return_value = 'zone_event_123'
-        mock_get_status.return_value = {'current_zones': []}
         
         # Send location event
         location_data = {
@@ -274,16 +342,27 @@ class IntegrationTestCase(TestCase):
         )
         
         # Verify response
-        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.status_code, 202)
         data = response.json()
         self.assertTrue(data['success'])
         self.assertEqual(data['vehicle_id'], 'integration_test_vehicle')
         
-        # Verify that location event was stored
-        mock_store_location.assert_called_once()
+        # Verify that location event was queued for storage with the returned ID
+        mock_persist_location.assert_called_once()
+        queued_event = mock_persist_location.call_args.args[0]
+        self.assertEqual(queued_event['vehicle_id'], 'integration_test_vehicle')
+        self.assertEqual(queued_event['event_id'], data['event_id'])
         
-        # Verify that vehicle status was checked
-        mock_get_status.assert_called_once_with('integration_test_vehicle')
+        # Zone transitions are queued for storage so zone_state stays current
+        if data['zone_events']:
+            mock_persist_zones.assert_called_once()
+            queued_zone_events = mock_persist_zones.call_args.args[0]
+            self.assertEqual(
+                [(e['zone_id'], e['event_type']) for e in queued_zone_events],
+                [(e['zone_id'], e['event_type']) for e in data['zone_events']]
+            )
+        else:
+            mock_persist_zones.assert_not_called()
     
     def test_api_error_handling(self):
         """Test API error handling for various scenarios."""
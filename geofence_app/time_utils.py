@@ -0,0 +1,94 @@
+"""
+Timestamp parsing helpers for incoming location events.
+"""
+
+from datetime import datetime, timezone
+from typing import Iterable
+
+import numpy as np
+
+# ciso8601 is optional: a C-extension ISO 8601 parser, much faster than
+# datetime.fromisoformat
+try:
+    from ciso8601 import parse_datetime as _parse_datetime
+    CISO8601_AVAILABLE = True
+except ImportError:
+    CISO8601_AVAILABLE = False
+
+
+def parse_iso_timestamp(value: str) -> datetime:
+    """
+    Parse an ISO 8601 timestamp.
+    
+    Uses ciso8601 when it is installed. Otherwise the 'YYYY-MM-DDTHH:MM:SSZ'
+    format sent by the taxi clients is parsed from fixed offsets, and
+    anything else goes through datetime.fromisoformat.
+    
+    Timestamps are normalized to UTC, matching how they are stored, and
+    ones without an offset are taken to be in UTC.
+    
+    Args:
+        value: ISO 8601 timestamp string
+        
+    Returns:
+        Timezone-aware UTC datetime
+        
+    Raises:
+        ValueError: If the string is not a valid ISO 8601 timestamp
+    """
+    if CISO8601_AVAILABLE:
+        return _to_utc(_parse_datetime(value))
+    
+    if (len(value) == 20 and value[19] == 'Z' and value[10] == 'T'
+            and value[4] == value[7] == '-' and value[13] == value[16] == ':'):
+        try:
+            return datetime(
+                int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                int(value[11:13]), int(value[14:16]), int(value[17:19]),
+                tzinfo=timezone.utc
+            )
+        except ValueError:
+            pass
+    
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    return _to_utc(datetime.fromisoformat(value))
+
+
+def _to_utc(value: datetime) -> datetime:
+    """Convert a datetime to UTC, taking naive datetimes to be in UTC already."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _naive_utc(value: str) -> str:
+    """Rewrite an ISO 8601 timestamp as naive UTC for NumPy to parse."""
+    if value.endswith('Z'):
+        return value[:-1]
+    if value.endswith('+00:00'):
+        return value[:-6]
+    if len(value) > 19 and value[-6] in '+-' and value[-3] == ':':
+        # NumPy's own offset handling is deprecated and only warns, so convert explicitly
+        return parse_iso_timestamp(value).replace(tzinfo=None).isoformat()
+    return value
+
+
+def to_datetime64(values: Iterable[str]) -> np.ndarray:
+    """
+    Parse ISO 8601 timestamps into a datetime64[ms] array in one call.
+    
+    The 'Z' or '+00:00' designator is stripped so NumPy parses the strings
+    as naive UTC times. The rare timestamp with another offset is converted
+    to UTC first.
+    
+    Args:
+        values: ISO 8601 timestamp strings, normally in UTC
+        
+    Returns:
+        Array of naive UTC datetime64[ms] values
+        
+    Raises:
+        ValueError: If a string is not a valid ISO 8601 timestamp
+    """
+    return np.array([_naive_utc(value) for value in values], dtype='datetime64[ms]')
@@ -11,6 +11,7 @@ app_name = 'geofence_app'
 urlpatterns = [
     # Location and event endpoints
     path('events/location/', views.process_location_event, name='process_location_event'),
+    path('events/location/bulk/', views.process_location_events_bulk, name='process_location_events_bulk'),
     path('events/recent/', views.get_recent_events, name='get_recent_events'),
     
     # Vehicle endpoints
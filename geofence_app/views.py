@@ -3,15 +3,26 @@ API views for geofence event processing.
 Handles location events, zone detection, and vehicle status queries.
 """
 
+import hashlib
 import logging
-import json
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Dict, List, Optional, Any
+from functools import lru_cache
+from itertools import chain
+from typing import Dict, List, Optional, Any, Tuple
 
-from django.http import JsonResponse
+import numpy as np
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
-from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.cache import cache_page
 from django.views.decorators.http import require_http_methods
+from django.views.decorators.vary import vary_on_headers
 from django.utils.decorators import method_decorator
 
 from rest_framework.decorators import api_view, throttle_classes
@@ -19,8 +30,15 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.throttling import AnonRateThrottle
 
+from arcgis_geofence_service import arcgis_geofence_service
+
 from .cosmos_service import cosmos_service
-# H3 geofence service REMOVED - we now use ArcGIS API for US state-level geofencing
+from .json_utils import JSONDecodeError, dumps, json_response, loads
+from .serializers import LocationEventSerializer, first_error
+from .tasks import (
+    VEHICLE_SIDE_EFFECTS, persist_location_event, persist_location_events_bulk, persist_zone_events,
+    vehicle_prefix
+)
 try:
     from monitoring import get_current_metrics, get_health_status
 except ImportError:
@@ -32,6 +50,165 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Cached (monotonic time, ISO timestamp) pair used by _now_iso
+_now_iso_cache = [float('-inf'), '']
+
+
+def _now_iso() -> str:
+    """
+    Get the current UTC time as an ISO 8601 string, refreshed at most once a second.
+    
+    Used for informational response timestamps; event and processing times
+    still use datetime.now() directly.
+    """
+    now = time.monotonic()
+    if now - _now_iso_cache[0] > 1.0:
+        _now_iso_cache[0] = now
+        _now_iso_cache[1] = datetime.now(timezone.utc).isoformat()
+    return _now_iso_cache[1]
+
+
+# Thread pool for running independent Cosmos DB reads within one request
+_io_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='geofence-io')
+
+# Maximum number of events accepted by process_location_events_bulk
+MAX_BULK_EVENTS = 1000
+
+
+@lru_cache(maxsize=1)
+def _all_zones():
+    """Return all US state zones; they are static for the process lifetime."""
+    return tuple(arcgis_geofence_service.get_all_zones())
+
+
+@lru_cache(maxsize=256)
+def _zone(zone_id):
+    """Return the US state zone for zone_id, or None if unknown."""
+    return arcgis_geofence_service.get_zone_by_id(zone_id)
+
+
+@lru_cache(maxsize=1)
+def _zones_dto():
+    """Return the serialized zone list served by list_zones."""
+    return [
+        {
+            'id': zone.id,
+            'name': zone.name,
+            'description': zone.description,
+            'center': {
+                'latitude': zone.center_lat,
+                'longitude': zone.center_lng
+            },
+            'radius_km': getattr(zone, 'radius_km', 100.0),  # Default radius for state zones
+            'statistics': {}  # ArcGIS service doesn't have zone statistics
+        }
+        for zone in _all_zones()
+    ]
+
+
+@lru_cache(maxsize=1)
+def _zones_summary_base():
+    """Return the static part of each get_zones_summary entry."""
+    return tuple(
+        {
+            'id': zone.id,
+            'name': zone.name,
+            'description': zone.description,
+            'center': [zone.center_lat, zone.center_lng],
+            'radius_km': getattr(zone, 'radius_km', 100.0),  # Default radius for state zones
+            'h3_indices_count': len(getattr(zone, 'h3_indices', ()))  # State zones have no H3 cells
+        }
+        for zone in _all_zones()
+    )
+
+
+@lru_cache(maxsize=1)
+def _zones_json() -> bytes:
+    """Return the encoded list_zones response body."""
+    zones_data = _zones_dto()
+    return dumps({
+        'zones': zones_data,
+        'total_count': len(zones_data)
+    })
+
+
+@lru_cache(maxsize=1)
+def _zones_etag() -> str:
+    """Return the ETag for the list_zones response body."""
+    return f'"zones-{hashlib.sha256(_zones_json()).hexdigest()[:16]}"'
+
+
+def clear_zone_caches() -> None:
+    """Drop memoized zone data so it is rebuilt from the ArcGIS service."""
+    for cached in (_all_zones, _zone, _zones_dto, _zones_summary_base, _zones_json, _zones_etag):
+        cached.cache_clear()
+
+
+@lru_cache(maxsize=256)
+def _state_zones(state_name):
+    """Return the current_zones payload for a classified state; shared between events."""
+    if not state_name:
+        return []
+    return [{'id': state_name.lower().replace(' ', '_'), 'name': state_name}]
+
+
+def _detect_zone_transitions(vehicle_id: str,
+                             located_events: List[Tuple[Dict, Optional[str]]]
+                             ) -> Tuple[List[List[Dict]], List[Dict]]:
+    """
+    Detect a vehicle's zone entries and exits across its location events.
+    
+    The zones before the first event come from the per-vehicle zone cache,
+    which is updated once with the zones after the last event.
+    
+    Args:
+        vehicle_id: Vehicle the events belong to
+        located_events: (queued location event, classified state or None)
+            pairs in chronological order
+        
+    Returns:
+        Tuple of the zone entry/exit events for each location event and the
+        zone event documents to queue with persist_zone_events
+    """
+    initial_zones = previous_zones = cosmos_service.get_vehicle_zones(vehicle_id)
+    zone_events_per_event = []
+    documents = []
+    
+    for event, current_state in located_events:
+        current_zones = tuple(zone['id'] for zone in _state_zones(current_state))
+        zone_events = []
+        
+        # Zone tuples are sorted and almost always hold at most one state,
+        # so plain tuple comparison and membership tests beat building sets
+        if current_zones != previous_zones:
+            zone_events.extend(
+                {'zone_id': zone_id, 'event_type': 'zone_entry'}
+                for zone_id in current_zones if zone_id not in previous_zones
+            )
+            zone_events.extend(
+                {'zone_id': zone_id, 'event_type': 'zone_exit'}
+                for zone_id in previous_zones if zone_id not in current_zones
+            )
+            documents.extend(
+                {
+                    'vehicle_id': vehicle_id,
+                    'latitude': event['latitude'],
+                    'longitude': event['longitude'],
+                    'timestamp': event['timestamp'],
+                    'metadata': event['metadata'],
+                    **zone_event
+                }
+                for zone_event in zone_events
+            )
+        
+        zone_events_per_event.append(zone_events)
+        previous_zones = current_zones
+    
+    if previous_zones != initial_zones:
+        cosmos_service.set_vehicle_zones(vehicle_id, previous_zones)
+    
+    return zone_events_per_event, documents
+
 
 class LocationEventThrottle(AnonRateThrottle):
     """Custom throttle for location events."""
@@ -40,7 +217,6 @@ class LocationEventThrottle(AnonRateThrottle):
 
 @api_view(['POST'])
 @throttle_classes([LocationEventThrottle])
-@csrf_exempt
 def process_location_event(request):
     """
     Process incoming GPS location events from vehicles.
@@ -61,121 +237,201 @@ def process_location_event(request):
     try:
         # Parse request data
         if request.content_type == 'application/json':
-            data = json.loads(request.body)
+            data = loads(request.body)
         else:
             data = request.POST.dict()
         
-        # Validate required fields
-        required_fields = ['vehicle_id', 'latitude', 'longitude']
-        for field in required_fields:
-            if field not in data:
-                return JsonResponse({
-                    'error': f'Missing required field: {field}'
-                }, status=400)
-        
-        vehicle_id = data['vehicle_id']
-        latitude = float(data['latitude'])
-        longitude = float(data['longitude'])
-        
-        # Validate coordinates
-        if not (-90 <= latitude <= 90):
-            return JsonResponse({
-                'error': 'Invalid latitude. Must be between -90 and 90'
-            }, status=400)
-        
-        if not (-180 <= longitude <= 180):
-            return JsonResponse({
-                'error': 'Invalid longitude. Must be between -180 and 180'
+        serializer = LocationEventSerializer(data=data)
+        if not serializer.is_valid():
+            return json_response({
+                'error': first_error(serializer.errors),
+                'details': serializer.errors
             }, status=400)
         
-        # Parse optional timestamp
-        timestamp = None
-        if 'timestamp' in data:
-            try:
-                timestamp = datetime.fromisoformat(data['timestamp'].replace('Z', '+00:00'))
-            except ValueError:
-                return JsonResponse({
-                    'error': 'Invalid timestamp format. Use ISO 8601 format'
-                }, status=400)
-        
-        metadata = data.get('metadata', {})
-        
-        # Get previous zones for this vehicle
-        previous_status = cosmos_service.get_vehicle_current_status(vehicle_id)
-        previous_zones = set()
-        if previous_status and 'current_zones' in previous_status:
-            previous_zones = set(previous_status['current_zones'])
-        
-        # Store location event
-        event_id = cosmos_service.store_location_event(
-            vehicle_id=vehicle_id,
-            latitude=latitude,
-            longitude=longitude,
-            timestamp=timestamp,
-            metadata=metadata
-        )
-        
-        # Use ArcGIS service for state-level geofencing
-        from arcgis_geofence_service import arcgis_geofence_service
+        validated = serializer.validated_data
+        vehicle_id = validated['vehicle_id']
+        latitude = validated['latitude']
+        longitude = validated['longitude']
+        timestamp = validated.get('timestamp')
+        metadata = validated['metadata']
+        
+        # Persist asynchronously; the event ID is assigned here so the client
+        # gets it back without waiting for the Cosmos DB write
+        event_id = str(uuid.uuid4())
+        event = {
+            'event_id': event_id,
+            'vehicle_id': vehicle_id,
+            'latitude': latitude,
+            'longitude': longitude,
+            'timestamp': (timestamp or datetime.now(timezone.utc)).isoformat(),
+            'metadata': metadata
+        }
+        persist_location_event.delay(event)
         
-        # Also store in taxi-specific container if this is a taxi
-        if vehicle_id.startswith('taxi_'):
+        # Also store in a vehicle-type specific container (e.g. taxis)
+        prefix = vehicle_prefix(vehicle_id)
+        side_effect = VEHICLE_SIDE_EFFECTS.get(prefix)
+        if side_effect is not None:
             try:
-                from taxi_cosmos_service import taxi_cosmos_service
-                taxi_cosmos_service.store_taxi_location(
-                    taxi_id=vehicle_id,
-                    latitude=latitude,
-                    longitude=longitude,
-                    timestamp=timestamp,
-                    metadata=metadata
-                )
+                side_effect.task.delay(event)
             except Exception as e:
-                logger.warning(f"Failed to store taxi data: {e}")
+                logger.warning("Failed to queue %s data: %s", prefix, e)
         
-        # Get current state/zone
+        # Get current state/zone using ArcGIS service for state-level geofencing
         current_state = arcgis_geofence_service.classify_point_realtime(longitude, latitude)
         
-        # Store zone events (simplified for state-level)
-        zone_events = []
-        current_zone_info = []
-        
-        if current_state:
-            # Create zone info for current state
-            current_zone_info = [{
-                'id': current_state.lower().replace(' ', '_'), 
-                'name': current_state
-            }]
-            
-            # For now, we'll skip complex zone transition detection
-            # and just record the current state location
-            # This can be enhanced later with state transition tracking
+        # Detect state transitions against the zones cached from the
+        # vehicle's previous update
+        (zone_events,), zone_documents = _detect_zone_transitions(vehicle_id, [(event, current_state)])
+        
+        # Persist the transitions, which also keeps the zone_state
+        # container behind zone vehicle counts up to date
+        if zone_documents:
+            persist_zone_events.delay(zone_documents)
         
         response_data = {
             'success': True,
             'event_id': event_id,
             'vehicle_id': vehicle_id,
-            'processed_at': datetime.now(timezone.utc).isoformat(),
-            'current_zones': current_zone_info,
+            'processed_at': datetime.now(timezone.utc),
+            'current_zones': _state_zones(current_state),
             'zone_events': zone_events,
             'current_state': current_state,
             'metadata': metadata
         }
         
-        logger.info(f"Processed location event for vehicle {vehicle_id}")
+        return json_response(response_data, status=202)
         
-        return JsonResponse(response_data, status=201)
-        
-    except json.JSONDecodeError:
-        return JsonResponse({
+    except JSONDecodeError:
+        return json_response({
             'error': 'Invalid JSON payload'
         }, status=400)
     except ValueError as e:
-        return JsonResponse({
+        return json_response({
             'error': f'Invalid data: {str(e)}'
         }, status=400)
     except Exception as e:
-        logger.error(f"Error processing location event: {e}")
-        return JsonResponse({
+        logger.error("Error processing location event: %s", e)
+        return json_response({
+            'error': 'Internal server error'
+        }, status=500)
+
+
+@api_view(['POST'])
+@throttle_classes([LocationEventThrottle])
+def process_location_events_bulk(request):
+    """
+    Process a batch of GPS location events in a single request.
+    
+    Expected payload:
+    {
+        "events": [
+            {
+                "vehicle_id": "taxi_001",
+                "latitude": 40.7589,
+                "longitude": -73.7804,
+                "timestamp": "2024-01-01T12:00:00Z",  // optional
+                "metadata": {}  // optional
+            },
+            ...
+        ]
+    }
+    
+    Invalid rows are reported by index and reject the whole batch. Each
+    accepted event's result carries its current zones and the zone entry/exit
+    events it caused, as process_location_event returns for one event.
+    """
+    try:
+        data = loads(request.body)
+        events = data.get('events') if isinstance(data, dict) else None
+        
+        if not isinstance(events, list) or not events:
+            return json_response({
+                'error': 'Payload must contain a non-empty "events" list'
+            }, status=400)
+        
+        if len(events) > MAX_BULK_EVENTS:
+            return json_response({
+                'error': f'Too many events. Maximum is {MAX_BULK_EVENTS} per request'
+            }, status=400)
+        
+        # Validate every row with the single-event rules so both endpoints
+        # accept and normalize the same payloads
+        serializer = LocationEventSerializer(data=events, many=True)
+        if not serializer.is_valid():
+            invalid = [index for index, errors in enumerate(serializer.errors) if errors]
+            return json_response({
+                'error': first_error(serializer.errors[invalid[0]]),
+                'invalid_indices': invalid
+            }, status=400)
+        validated_events = serializer.validated_data
+        
+        received_at = datetime.now(timezone.utc)
+        latitudes = np.fromiter((event['latitude'] for event in validated_events),
+                                dtype=np.float64, count=len(validated_events))
+        longitudes = np.fromiter((event['longitude'] for event in validated_events),
+                                 dtype=np.float64, count=len(validated_events))
+        
+        # Use ArcGIS service for state-level geofencing
+        states = arcgis_geofence_service.classify_points(longitudes, latitudes)
+        
+        queued_events = []
+        results = []
+        for event, current_state in zip(validated_events, states):
+            event_id = str(uuid.uuid4())
+            queued_events.append({
+                'event_id': event_id,
+                'vehicle_id': event['vehicle_id'],
+                'latitude': event['latitude'],
+                'longitude': event['longitude'],
+                'timestamp': (event.get('timestamp') or received_at).isoformat(),
+                'metadata': event['metadata']
+            })
+            results.append({
+                'event_id': event_id,
+                'vehicle_id': event['vehicle_id'],
+                'current_zones': _state_zones(current_state),
+                'current_state': current_state
+            })
+        
+        # Detect zone transitions per vehicle, taking a vehicle's events in
+        # timestamp order so several updates in one batch chain correctly
+        indices_by_vehicle = defaultdict(list)
+        for index, event in enumerate(queued_events):
+            indices_by_vehicle[event['vehicle_id']].append(index)
+        
+        zone_documents = []
+        for vehicle_id, indices in indices_by_vehicle.items():
+            indices.sort(key=lambda index: queued_events[index]['timestamp'])
+            zone_events_per_event, documents = _detect_zone_transitions(
+                vehicle_id, [(queued_events[index], states[index]) for index in indices]
+            )
+            for index, zone_events in zip(indices, zone_events_per_event):
+                results[index]['zone_events'] = zone_events
+            zone_documents.extend(documents)
+        
+        persist_location_events_bulk.delay(queued_events)
+        if zone_documents:
+            persist_zone_events.delay(zone_documents)
+        
+        return json_response({
+            'success': True,
+            'accepted': len(results),
+            'processed_at': received_at,
+            'events': results
+        }, status=202)
+        
+    except JSONDecodeError:
+        return json_response({
+            'error': 'Invalid JSON payload'
+        }, status=400)
+    except (TypeError, ValueError) as e:
+        return json_response({
+            'error': f'Invalid data: {str(e)}'
+        }, status=400)
+    except Exception as e:
+        logger.error("Error processing bulk location events: %s", e)
+        return json_response({
             'error': 'Internal server error'
         }, status=500)
 
@@ -185,44 +441,50 @@ def get_vehicle_status(request, vehicle_id):
     """
     Get the current status of a specific vehicle.
     
-    Returns current location, zones, and recent activity.
+    Returns current location and zones. Recent activity is included only
+    when requested with ?include=events, since it needs another Cosmos DB query.
     """
     try:
-        # Get vehicle status from Cosmos DB
+        include_events = request.GET.get('include') == 'events'
+        
+        # Fetch recent events concurrently with the vehicle status
+        events_future = None
+        if include_events:
+            events_future = _io_executor.submit(cosmos_service.get_vehicle_events, vehicle_id, limit=10)
         status = cosmos_service.get_vehicle_current_status(vehicle_id)
         
         if not status:
-            return JsonResponse({
+            if events_future is not None:
+                events_future.cancel()
+            return json_response({
                 'error': 'Vehicle not found or no location data available'
             }, status=404)
         
-        # Enhance with zone information using ArcGIS service
-        from arcgis_geofence_service import arcgis_geofence_service
-        if status['current_zones']:
-            zone_details = []
-            for zone_id in status['current_zones']:
-                zone = arcgis_geofence_service.get_zone_by_id(zone_id)
-                if zone:
-                    zone_details.append({
-                        'id': zone.id,
-                        'name': zone.name,
-                        'description': zone.description
-                    })
-            status['zone_details'] = zone_details
-        
-        # Get recent events
-        recent_events = cosmos_service.get_vehicle_events(vehicle_id, limit=10)
-        status['recent_events'] = recent_events
-        
-        return JsonResponse(status)
+        # Enhance with zone information from the memoized ArcGIS zones
+        status['zone_details'] = [
+            {
+                'id': zone.id,
+                'name': zone.name,
+                'description': zone.description
+            }
+            for zone in map(_zone, status.get('current_zones', ()))
+            if zone
+        ]
+        
+        if events_future is not None:
+            status['recent_events'] = events_future.result()
+        
+        return json_response(status)
         
     except Exception as e:
-        logger.error(f"Error getting vehicle status: {e}")
-        return JsonResponse({
+        logger.error("Error getting vehicle status: %s", e)
+        return json_response({
             'error': 'Internal server error'
         }, status=500)
 
 
+@cache_page(settings.ZONE_VIEW_CACHE_TIMEOUT)
+@vary_on_headers('Accept')
 @api_view(['GET'])
 def get_zone_status(request, zone_id):
     """
@@ -232,8 +494,7 @@ def get_zone_status(request, zone_id):
     """
     try:
         # Get zone information using ArcGIS service
-        from arcgis_geofence_service import arcgis_geofence_service
-        zone = arcgis_geofence_service.get_zone_by_id(zone_id)
+        zone = _zone(zone_id)
         
         if not zone:
             return JsonResponse({
@@ -243,17 +504,11 @@ def get_zone_status(request, zone_id):
         # ArcGIS service doesn't have zone statistics, use empty dict
         stats = {}
         
-        # Get recent zone events
-        recent_events = cosmos_service.get_zone_events(zone_id, limit=20)
-        
-        # Count current vehicles in zone
-        current_vehicles = set()
-        for event in recent_events:
-            vehicle_id = event['vehicle_id']
-            if event['event_type'] == 'zone_entry':
-                current_vehicles.add(vehicle_id)
-            elif event['event_type'] == 'zone_exit':
-                current_vehicles.discard(vehicle_id)
+        # Get recent zone events and the current vehicles in the zone (from
+        # the materialized zone state) concurrently
+        events_future = _io_executor.submit(cosmos_service.get_zone_events, zone_id, limit=20)
+        current_vehicles = cosmos_service.current_vehicles_in_zone(zone_id)
+        recent_events = events_future.result()
         
         response_data = {
             'zone_id': zone.id,
@@ -263,54 +518,38 @@ def get_zone_status(request, zone_id):
                 'latitude': zone.center_lat,
                 'longitude': zone.center_lng
             },
-            'radius_km': zone.radius_km,
+            'radius_km': getattr(zone, 'radius_km', 100.0),  # Default radius for state zones
             'statistics': stats,
             'current_vehicles_count': len(current_vehicles),
-            'current_vehicles': list(current_vehicles),
+            'current_vehicles': current_vehicles,
             'recent_events': recent_events
         }
         
         return JsonResponse(response_data)
         
     except Exception as e:
-        logger.error(f"Error getting zone status: {e}")
+        logger.error("Error getting zone status: %s", e)
         return JsonResponse({
             'error': 'Internal server error'
         }, status=500)
 
 
+@cache_page(settings.ZONE_VIEW_CACHE_TIMEOUT)
+@vary_on_headers('Accept')
 @api_view(['GET'])
 def list_zones(request):
     """
     List all available geofence zones.
     """
     try:
-        # Get zones using ArcGIS service
-        from arcgis_geofence_service import arcgis_geofence_service
-        zones = arcgis_geofence_service.get_all_zones()
-        
-        zones_data = []
-        for zone in zones:
-            zones_data.append({
-                'id': zone.id,
-                'name': zone.name,
-                'description': zone.description,
-                'center': {
-                    'latitude': zone.center_lat,
-                    'longitude': zone.center_lng
-                },
-                'radius_km': getattr(zone, 'radius_km', 100.0),  # Default radius for state zones
-                'statistics': {}  # ArcGIS service doesn't have zone statistics
-            })
-        
-        return JsonResponse({
-            'zones': zones_data,
-            'total_count': len(zones_data)
-        })
+        # Zones are static, so the encoded response is built once per process
+        response = HttpResponse(_zones_json(), content_type='application/json')
+        response['ETag'] = _zones_etag()
+        return response
         
     except Exception as e:
-        logger.error(f"Error listing zones: {e}")
-        return JsonResponse({
+        logger.error("Error listing zones: %s", e)
+        return json_response({
             'error': 'Internal server error'
         }, status=500)
 
@@ -328,22 +567,45 @@ def get_recent_events(request):
         if limit > 200:
             limit = 200
         
-        events = cosmos_service.get_recent_events(limit=limit, event_type=event_type)
-        
-        return JsonResponse({
-            'events': events,
-            'count': len(events),
-            'limit': limit,
-            'event_type_filter': event_type
-        })
+        # Fetch the first page before streaming, so a failed query is still
+        # reported as an error instead of a 200 with no events
+        pages = cosmos_service.iter_recent_event_pages(limit=limit, event_type=event_type, page_size=50)
+        first_page = next(pages, [])
+        
+        def stream():
+            # Emit the envelope around the events so that only one Cosmos
+            # page is held in memory at a time
+            count = 0
+            truncated = False
+            yield b'{"events":['
+            try:
+                for page in chain((first_page,), pages):
+                    for event in page:
+                        if count:
+                            yield b','
+                        yield dumps(event)
+                        count += 1
+            except Exception as e:
+                # Headers are already sent; end the document cleanly and
+                # flag that the event list is incomplete
+                logger.error("Error streaming recent events: %s", e)
+                truncated = True
+            yield b'],' + dumps({
+                'count': count,
+                'limit': limit,
+                'event_type_filter': event_type,
+                'truncated': truncated
+            })[1:]
+        
+        return StreamingHttpResponse(stream(), content_type='application/json')
         
     except ValueError:
-        return JsonResponse({
+        return json_response({
             'error': 'Invalid limit parameter'
         }, status=400)
     except Exception as e:
-        logger.error(f"Error getting recent events: {e}")
-        return JsonResponse({
+        logger.error("Error getting recent events: %s", e)
+        return json_response({
             'error': 'Internal server error'
         }, status=500)
 
@@ -355,20 +617,18 @@ def health_check(request):
     """
     try:
         # Test Cosmos DB connection
-        cosmos_service.get_recent_events(limit=1)
+        cosmos_service.ping()
         
         # Test ArcGIS service
-        from arcgis_geofence_service import arcgis_geofence_service
-        zones_count = len(arcgis_geofence_service.get_all_zones())
+        zones_count = len(_all_zones())
         
         # Test cache
-        from django.core.cache import cache
         cache.set('health_check', 'ok', 60)
         cache_status = cache.get('health_check')
         
         return JsonResponse({
             'status': 'healthy',
-            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'timestamp': _now_iso(),
             'services': {
                 'cosmos_db': 'connected',
                 'arcgis_service': f'{zones_count} zones configured',
@@ -377,11 +637,11 @@ def health_check(request):
         })
         
     except Exception as e:
-        logger.error(f"Health check failed: {e}")
+        logger.error("Health check failed: %s", e)
         return JsonResponse({
             'status': 'unhealthy',
             'error': str(e),
-            'timestamp': datetime.now(timezone.utc).isoformat()
+            'timestamp': _now_iso()
         }, status=503)
 
 
@@ -397,11 +657,11 @@ def detailed_health_check(request):
         return JsonResponse(health_status, status=status_code)
         
     except Exception as e:
-        logger.error(f"Detailed health check failed: {e}")
+        logger.error("Detailed health check failed: %s", e)
         return JsonResponse({
             'status': 'error',
             'error': str(e),
-            'timestamp': datetime.now(timezone.utc).isoformat()
+            'timestamp': _now_iso()
         }, status=500)
 
 
@@ -414,15 +674,15 @@ def get_metrics(request):
         metrics = get_current_metrics()
         
         return JsonResponse({
-            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'timestamp': _now_iso(),
             'metrics': metrics
         })
         
     except Exception as e:
-        logger.error(f"Error getting system metrics: {e}")
+        logger.error("Error getting system metrics: %s", e)
         return JsonResponse({
             'error': 'Failed to retrieve metrics',
-            'timestamp': datetime.now(timezone.utc).isoformat()
+            'timestamp': _now_iso()
         }, status=500)
 
 
@@ -444,25 +704,28 @@ def get_vehicle_events(request, vehicle_id):
         })
         
     except Exception as e:
-        logger.error(f"Error getting vehicle events: {e}")
+        logger.error("Error getting vehicle events: %s", e)
         return JsonResponse({
             'error': 'Failed to retrieve vehicle events'
         }, status=500)
 
 
+@cache_page(settings.ZONE_VIEW_CACHE_TIMEOUT)
+@vary_on_headers('Accept')
 @api_view(['GET'])
 def get_zone_details(request, zone_id):
     """
     Get details for a specific zone.
     """
     try:
-        zone = h3_geofence_service.get_zone_by_id(zone_id)
+        zone = _zone(zone_id)
         if not zone:
             return JsonResponse({
                 'error': 'Zone not found'
             }, status=404)
             
-        zone_stats = h3_geofence_service.get_zone_statistics(zone_id)
+        # ArcGIS service doesn't have zone statistics, use empty dict
+        zone_stats = {}
         
         return JsonResponse({
             'zone': {
@@ -470,13 +733,13 @@ def get_zone_details(request, zone_id):
                 'name': zone.name,
                 'description': zone.description,
                 'center': [zone.center_lat, zone.center_lng],
-                'radius_km': zone.radius_km
+                'radius_km': getattr(zone, 'radius_km', 100.0)  # Default radius for state zones
             },
             'statistics': zone_stats
         })
         
     except Exception as e:
-        logger.error(f"Error getting zone details: {e}")
+        logger.error("Error getting zone details: %s", e)
         return JsonResponse({
             'error': 'Failed to retrieve zone details'
         }, status=500)
@@ -499,7 +762,7 @@ def get_zone_events(request, zone_id):
         })
         
     except Exception as e:
-        logger.error(f"Error getting zone events: {e}")
+        logger.error("Error getting zone events: %s", e)
         return JsonResponse({
             'error': 'Failed to retrieve zone events'
         }, status=500)
@@ -511,30 +774,13 @@ def get_zones_summary(request):
     Get summary of all zones with current vehicle counts.
     """
     try:
-        zones = h3_geofence_service.get_all_zones()
-        zones_summary = []
+        # Vehicle counts for every zone in a single query
+        vehicle_counts = cosmos_service.zone_vehicle_counts()
         
-        for zone in zones:
-            # Get recent events for this zone to count vehicles
-            recent_events = cosmos_service.get_zone_events(zone.id, 50)
-            
-            # Count unique vehicles in the zone
-            vehicles_in_zone = set()
-            for event in recent_events:
-                if event.get('event_type') == 'zone_entry':
-                    vehicles_in_zone.add(event.get('vehicle_id'))
-                elif event.get('event_type') == 'zone_exit':
-                    vehicles_in_zone.discard(event.get('vehicle_id'))
-            
-            zones_summary.append({
-                'id': zone.id,
-                'name': zone.name,
-                'description': zone.description,
-                'center': [zone.center_lat, zone.center_lng],
-                'radius_km': zone.radius_km,
-                'vehicle_count': len(vehicles_in_zone),
-                'h3_indices_count': len(zone.h3_indices)
-            })
+        zones_summary = [
+            {**zone, 'vehicle_count': vehicle_counts.get(zone['id'], 0)}
+            for zone in _zones_summary_base()
+        ]
         
         return JsonResponse({
             'zones': zones_summary,
@@ -542,7 +788,7 @@ def get_zones_summary(request):
         })
         
     except Exception as e:
-        logger.error(f"Error getting zones summary: {e}")
+        logger.error("Error getting zones summary: %s", e)
         return JsonResponse({
             'error': 'Failed to retrieve zones summary'
         }, status=500)
@@ -0,0 +1,19 @@
+"""
+Celery config for geofence_event_processing_project project.
+
+Runs Cosmos DB writes for incoming location events outside the
+request/response cycle, and periodic zone aggregate recomputation.
+Start a worker and the beat scheduler with:
+    celery -A geofence_event_processing_project worker -l info
+    celery -A geofence_event_processing_project beat -l info
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'geofence_event_processing_project.settings')
+
+app = Celery('geofence_event_processing_project')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -56,6 +56,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -89,6 +90,7 @@ COSMOS_ENDPOINT = config('COSMOS_ENDPOINT')
 COSMOS_KEY = config('COSMOS_KEY')
 COSMOS_DATABASE_NAME = config('COSMOS_DATABASE_NAME', default='geofence-data')
 COSMOS_CONTAINER_NAME = config('COSMOS_CONTAINER_NAME', default='data')
+COSMOS_ZONE_STATE_CONTAINER_NAME = config('COSMOS_ZONE_STATE_CONTAINER_NAME', default='zone_state')
 
 # Database - Using SQLite for Django admin and user management
 # Cosmos DB will be used directly for geofence data
@@ -177,6 +179,17 @@ CACHES = {
     }
 }
 
+# Celery Configuration (background Cosmos DB writes)
+CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='redis://127.0.0.1:6379/2')
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=False, cast=bool)
+CELERY_BEAT_SCHEDULE = {
+    'recompute-zone-aggregates': {
+        'task': 'zone_management.tasks.recompute_zone_aggregates',
+        'schedule': config('ZONE_AGGREGATES_REFRESH_INTERVAL', default=300, cast=int),  # 5 minutes
+    },
+}
+
 # Session Configuration
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 SESSION_CACHE_ALIAS = 'default'
@@ -258,6 +271,14 @@ H3_BUFFER_RESOLUTION = config('H3_BUFFER_RESOLUTION', default=8, cast=int)  # Fo
 # Geofence Configuration
 GEOFENCE_CACHE_TIMEOUT = config('GEOFENCE_CACHE_TIMEOUT', default=3600, cast=int)  # 1 hour
 VEHICLE_STATUS_CACHE_TIMEOUT = config('VEHICLE_STATUS_CACHE_TIMEOUT', default=300, cast=int)  # 5 minutes
+VEHICLE_ZONES_CACHE_TIMEOUT = config('VEHICLE_ZONES_CACHE_TIMEOUT', default=3600, cast=int)  # 1 hour
+ZONE_VIEW_CACHE_TIMEOUT = config('ZONE_VIEW_CACHE_TIMEOUT', default=60, cast=int)  # 1 minute
+VEHICLE_VIEW_CACHE_TIMEOUT = config('VEHICLE_VIEW_CACHE_TIMEOUT', default=30, cast=int)  # 30 seconds
+ZONE_EVENTS_CACHE_TIMEOUT = config('ZONE_EVENTS_CACHE_TIMEOUT', default=60, cast=int)  # 1 minute
+ZONE_LATEST_TS_CACHE_TIMEOUT = config('ZONE_LATEST_TS_CACHE_TIMEOUT', default=5, cast=int)  # 5 seconds; bounds ETag staleness
+ZONE_AGGREGATES_CACHE_TIMEOUT = config('ZONE_AGGREGATES_CACHE_TIMEOUT', default=600, cast=int)  # 10 minutes
+ZONE_AGGREGATE_HOURS = config('ZONE_AGGREGATE_HOURS', default='1,24,168', cast=lambda v: [int(s) for s in v.split(',')])  # Time ranges precomputed by recompute_zone_aggregates
+METRICS_SAMPLE_INTERVAL = config('METRICS_SAMPLE_INTERVAL', default=0, cast=float)  # Seconds; 0 disables background sampling
 
 # Performance Settings
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
@@ -5,18 +5,113 @@ Provides performance metrics, health monitoring, and alerting capabilities.
 
 import time
 import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import queue
+import threading
 import psutil
-from datetime import datetime, timezone
-from typing import Dict, Any, List
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Tuple
 from django.core.cache import cache
 from django.conf import settings
 from dataclasses import dataclass, asdict
+from functools import wraps
 
 from geofence_app.cosmos_service import cosmos_service
-from geofence_app.h3_geofence_service import h3_geofence_service
 
 logger = logging.getLogger(__name__)
 
+# The H3 zone service is optional; without it zone metrics read 0 and the
+# h3_service health check is left out rather than failing the import
+try:
+    from geofence_app.h3_geofence_service import h3_geofence_service
+except ImportError:
+    h3_geofence_service = None
+    logger.warning("H3 geofence service not available, zone metrics are disabled")
+
+# Minimum seconds between CPU samples; callers in between get the cached value
+CPU_SAMPLE_MIN_INTERVAL = 2.0
+
+# Seconds to reuse slow-changing or expensive system readings
+DISK_USAGE_TTL = 30.0
+NET_CONNECTIONS_TTL = 30.0
+
+# Seconds to reuse the Cosmos DB event aggregates across metric collections
+EVENT_COUNTS_CACHE_TIMEOUT = 60
+
+# Seconds to keep per-minute request/error counters (covers the previous minute)
+REQUEST_COUNTER_TIMEOUT = 120
+
+# Seconds a health check result is reused; resource checks change slowly
+HEALTH_CHECK_TTL = 10
+RESOURCE_CHECK_TTL = 60
+
+# Seconds run_all_checks waits for the checks, which run concurrently
+HEALTH_CHECK_TIMEOUT = 2.0
+
+_health_check_pool = ThreadPoolExecutor(max_workers=5, thread_name_prefix='health-check')
+
+_cpu_sample = {'ts': 0.0, 'value': 0.0}
+_cpu_sample_lock = threading.Lock()
+
+
+def _sample_cpu_percent() -> float:
+    """
+    Get system CPU utilization without blocking.
+    
+    psutil.cpu_percent(interval=None) reports usage since its previous call,
+    so sampling at most every CPU_SAMPLE_MIN_INTERVAL seconds keeps the
+    measurement window meaningful.
+    """
+    with _cpu_sample_lock:
+        now = time.monotonic()
+        if now - _cpu_sample['ts'] >= CPU_SAMPLE_MIN_INTERVAL:
+            _cpu_sample['value'] = psutil.cpu_percent(interval=None)
+            _cpu_sample['ts'] = now
+        return _cpu_sample['value']
+
+
+def _cached_check(seconds: int):
+    """
+    Reuse a HealthChecker check's result within fixed time buckets.
+    
+    Results are keyed by check name and bucket (monotonic time // seconds),
+    so every caller in the same bucket gets the same result.
+    """
+    def decorator(check):
+        @wraps(check)
+        def wrapper(self) -> Dict[str, Any]:
+            bucket = int(time.monotonic() // seconds)
+            cached = self._check_results.get(check.__name__)
+            if cached is not None and cached[0] == bucket:
+                return cached[1]
+            
+            result = check(self)
+            self._check_results[check.__name__] = (bucket, result)
+            return result
+        return wrapper
+    return decorator
+
+
+def _count_tcp_sockets() -> int:
+    """
+    Count in-use TCP sockets.
+    
+    Reads the kernel's summary in /proc/net/sockstat where available, which
+    is far cheaper than psutil.net_connections() walking every process's
+    file descriptors; falls back to psutil elsewhere.
+    """
+    try:
+        with open('/proc/net/sockstat') as sockstat:
+            for line in sockstat:
+                if line.startswith('TCP:'):
+                    fields = line.split()
+                    return int(fields[fields.index('inuse') + 1])
+    except (OSError, ValueError, IndexError):
+        pass
+    
+    return len(psutil.net_connections(kind='tcp'))
+
 
 @dataclass
 class SystemMetrics:
@@ -47,33 +142,70 @@ class MetricsCollector:
     """Collects and stores system and application metrics."""
     
     def __init__(self):
-        self.response_times = []
-        self.error_count = 0
-        self.request_count = 0
+        # Last 1000 response times and their running sum
+        self.response_times = deque(maxlen=1000)
+        self._response_time_sum = 0.0
         self.start_time = time.time()
+        self._reading_cache: Dict[str, Tuple[float, Any]] = {}
+        
+        # Prime psutil's CPU counters; the first non-blocking call always returns 0.0
+        psutil.cpu_percent(interval=None)
+        _cpu_sample['ts'] = time.monotonic()
     
     def record_request(self, response_time_ms: float, is_error: bool = False):
         """Record a request for metrics calculation."""
+        # The deque drops its oldest entry once full; keep the sum in step
+        if len(self.response_times) == self.response_times.maxlen:
+            self._response_time_sum -= self.response_times[0]
         self.response_times.append(response_time_ms)
-        self.request_count += 1
+        self._response_time_sum += response_time_ms
         
+        # Request and error counts are shared by all workers through the cache,
+        # in per-minute buckets that outlive the minute they cover
+        minute = int(time.time() // 60)
+        self._increment_counter(f"metrics_requests_{minute}")
         if is_error:
-            self.error_count += 1
+            self._increment_counter(f"metrics_errors_{minute}")
+    
+    def _increment_counter(self, key: str):
+        """Atomically increment a cache counter, creating it if needed."""
+        cache.add(key, 0, REQUEST_COUNTER_TIMEOUT)
+        cache.incr(key)
+    
+    def _recent_request_counts(self) -> Tuple[int, int]:
+        """Get (requests, errors) across all workers for the current and previous minute."""
+        minute = int(time.time() // 60)
+        keys = [
+            f"metrics_{kind}_{bucket}"
+            for kind in ('requests', 'errors')
+            for bucket in (minute - 1, minute)
+        ]
+        counts = cache.get_many(keys)
+        requests = sum(counts.get(key, 0) for key in keys[:2])
+        errors = sum(counts.get(key, 0) for key in keys[2:])
+        return requests, errors
+    
+    def _cached_reading(self, name: str, ttl: float, read: Callable[[], Any]) -> Any:
+        """Return a cached system reading, refreshing it once it is older than ttl seconds."""
+        now = time.monotonic()
+        cached = self._reading_cache.get(name)
+        if cached is not None and now - cached[0] < ttl:
+            return cached[1]
         
-        # Keep only last 1000 response times
-        if len(self.response_times) > 1000:
-            self.response_times = self.response_times[-1000:]
+        value = read()
+        self._reading_cache[name] = (now, value)
+        return value
     
     def get_system_metrics(self) -> SystemMetrics:
         """Collect current system metrics."""
         try:
             # CPU and Memory
-            cpu_percent = psutil.cpu_percent(interval=1)
+            cpu_percent = _sample_cpu_percent()
             memory = psutil.virtual_memory()
-            disk = psutil.disk_usage('/')
+            disk = self._cached_reading('disk_usage', DISK_USAGE_TTL, lambda: psutil.disk_usage('/'))
             
-            # Network connections
-            connections = len(psutil.net_connections())
+            # Network connections (in-use TCP sockets)
+            connections = self._cached_reading('net_connections', NET_CONNECTIONS_TTL, _count_tcp_sockets)
             
             # Cache hit ratio (approximate)
             cache_hit_ratio = self._calculate_cache_hit_ratio()
@@ -103,53 +235,31 @@ class MetricsCollector:
     def get_application_metrics(self) -> ApplicationMetrics:
         """Collect current application metrics."""
         try:
-            # Get recent events for analysis
-            recent_events_1h = cosmos_service.get_recent_events(limit=10000)
-            recent_events_24h = cosmos_service.get_recent_events(limit=50000)
-            
-            # Count unique vehicles
-            vehicles_1h = set()
-            vehicles_24h = set()
-            events_1h = 0
-            events_24h = 0
-            
-            now = datetime.now(timezone.utc)
-            one_hour_ago = now.timestamp() - 3600
-            twenty_four_hours_ago = now.timestamp() - 86400
-            
-            for event in recent_events_24h:
-                event_time = datetime.fromisoformat(
-                    event['timestamp'].replace('Z', '+00:00')
-                ).timestamp()
-                
-                vehicles_24h.add(event['vehicle_id'])
-                events_24h += 1
-                
-                if event_time >= one_hour_ago:
-                    vehicles_1h.add(event['vehicle_id'])
-                    events_1h += 1
+            # Event and vehicle counts, aggregated by Cosmos DB
+            event_counts = self._get_event_counts()
             
             # Calculate response time and error rate
             avg_response_time = (
-                sum(self.response_times) / len(self.response_times)
+                self._response_time_sum / len(self.response_times)
                 if self.response_times else 0.0
             )
             
+            request_count, error_count = self._recent_request_counts()
             error_rate = (
-                (self.error_count / self.request_count * 100)
-                if self.request_count > 0 else 0.0
+                (error_count / request_count * 100)
+                if request_count > 0 else 0.0
             )
             
             # Get total zones
-            total_zones = len(h3_geofence_service.get_all_zones())
+            total_zones = len(h3_geofence_service.get_all_zones()) if h3_geofence_service else 0
             
             return ApplicationMetrics(
                 timestamp=datetime.now(timezone.utc).isoformat(),
-                total_vehicles=len(vehicles_24h),
-                active_vehicles_1h=len(vehicles_1h),
+                total_vehicles=event_counts['24h']['vehicles'],
+                active_vehicles_1h=event_counts['1h']['vehicles'],
                 total_zones=total_zones,
-                events_last_hour=events_1h,
-                events_last_24h=events_24h,
+                events_last_hour=event_counts['1h']['events'],
+                events_last_24h=event_counts['24h']['events'],
                 average_response_time_ms=avg_response_time,
                 error_rate_percent=error_rate
             )
@@ -167,6 +277,18 @@ class MetricsCollector:
                 error_rate_percent=0.0
             )
     
+    def _get_event_counts(self) -> Dict[str, Dict[str, int]]:
+        """Get 1h and 24h event/vehicle counts, cached briefly to share across collections."""
+        event_counts = cache.get('app_metrics_agg')
+        if event_counts is None:
+            now = datetime.now(timezone.utc)
+            event_counts = {
+                '1h': cosmos_service.get_event_counts_since(now - timedelta(hours=1)),
+                '24h': cosmos_service.get_event_counts_since(now - timedelta(hours=24)),
+            }
+            cache.set('app_metrics_agg', event_counts, EVENT_COUNTS_CACHE_TIMEOUT)
+        return event_counts
+    
     def _calculate_cache_hit_ratio(self) -> float:
         """Calculate approximate cache hit ratio."""
         try:
@@ -186,38 +308,117 @@ class MetricsCollector:
     def store_metrics(self):
         """Store current metrics in cache for monitoring."""
         try:
+            # Reuse this 5-minute bucket's snapshot if any worker already collected it
+            historical_data = cache.get(self._historical_key())
+            if historical_data is not None:
+                cache.set('system_metrics', historical_data['system'], 300)
+                cache.set('application_metrics', historical_data['application'], 300)
+                return
+            
             system_metrics = self.get_system_metrics()
             app_metrics = self.get_application_metrics()
-            
-            # Store in cache with 5-minute expiration
-            cache.set('system_metrics', asdict(system_metrics), 300)
-            cache.set('application_metrics', asdict(app_metrics), 300)
-            
-            # Store historical data (keep last 24 hours)
-            historical_key = f"metrics_history_{int(time.time() // 300)}"  # 5-minute buckets
-            historical_data = {
-                'system': asdict(system_metrics),
-                'application': asdict(app_metrics)
-            }
-            cache.set(historical_key, historical_data, 86400)  # 24 hours
-            
-            logger.info("Metrics stored successfully")
+            self.write_metrics(system_metrics, app_metrics)
             
         except Exception as e:
             logger.error(f"Error storing metrics: {e}")
+    
+    @staticmethod
+    def _historical_key() -> str:
+        """Cache key of the current 5-minute metrics history bucket."""
+        return f"metrics_history_{int(time.time() // 300)}"
+    
+    def write_metrics(self, system_metrics: SystemMetrics, app_metrics: ApplicationMetrics):
+        """Write a collected metrics snapshot to the cache."""
+        # Store in cache with 5-minute expiration
+        cache.set('system_metrics', asdict(system_metrics), 300)
+        cache.set('application_metrics', asdict(app_metrics), 300)
+        
+        # Store historical data (keep last 24 hours)
+        historical_data = {
+            'system': asdict(system_metrics),
+            'application': asdict(app_metrics)
+        }
+        cache.set(self._historical_key(), historical_data, 86400)  # 24 hours
+        
+        logger.info("Metrics stored successfully")
+
+
+class MetricsSampler:
+    """
+    Collects metrics on a fixed schedule in background threads.
+    
+    A sampler thread collects snapshots at absolute monotonic deadlines, so
+    collection time does not cause drift, and hands them to a writer thread
+    through a bounded queue so cache I/O never delays the next sample.
+    """
+    
+    def __init__(self, collector: MetricsCollector, interval: float):
+        self.collector = collector
+        self.interval = interval
+        self._snapshots = queue.Queue(maxsize=16)
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+    
+    def start(self):
+        """Start the sampler and writer threads if they are not running."""
+        if self._threads:
+            return
+        
+        for target, name in ((self._sample_loop, 'metrics-sampler'), (self._write_loop, 'metrics-writer')):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def stop(self):
+        """Signal both threads to exit."""
+        self._stop.set()
+    
+    def _sample_loop(self):
+        next_tick = time.monotonic()
+        
+        while not self._stop.is_set():
+            try:
+                snapshot = (self.collector.get_system_metrics(), self.collector.get_application_metrics())
+                self._snapshots.put_nowait(snapshot)
+            except queue.Full:
+                logger.warning("Metrics writer is falling behind; dropping snapshot")
+            except Exception as e:
+                logger.error(f"Error sampling metrics: {e}")
+            
+            # Skip ticks that were missed rather than sampling in a burst
+            next_tick += self.interval
+            now = time.monotonic()
+            if next_tick < now:
+                next_tick = now
+            self._stop.wait(next_tick - now)
+    
+    def _write_loop(self):
+        while not self._stop.is_set():
+            try:
+                system_metrics, app_metrics = self._snapshots.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            
+            try:
+                self.collector.write_metrics(system_metrics, app_metrics)
+            except Exception as e:
+                logger.error(f"Error storing metrics: {e}")
 
 
 class HealthChecker:
     """Performs comprehensive health checks."""
     
     def __init__(self):
+        self._check_results: Dict[str, Tuple[int, Dict[str, Any]]] = {}
         self.checks = {
             'database': self._check_database,
             'cache': self._check_cache,
-            'h3_service': self._check_h3_service,
             'disk_space': self._check_disk_space,
             'memory': self._check_memory,
         }
+        # An optional service that isn't deployed shouldn't mark the system unhealthy
+        if h3_geofence_service is not None:
+            self.checks['h3_service'] = self._check_h3_service
     
     def run_all_checks(self) -> Dict[str, Any]:
         """Run all health checks and return results."""
@@ -227,14 +428,27 @@ class HealthChecker:
             'checks': {}
         }
         
-        for check_name, check_func in self.checks.items():
+        futures = {
+            check_name: _health_check_pool.submit(check_func)
+            for check_name, check_func in self.checks.items()
+        }
+        deadline = time.monotonic() + HEALTH_CHECK_TIMEOUT
+        
+        for check_name, future in futures.items():
             try:
-                check_result = check_func()
+                check_result = future.result(timeout=max(0.0, deadline - time.monotonic()))
                 results['checks'][check_name] = check_result
                 
                 if not check_result['healthy']:
                     results['overall_status'] = 'unhealthy'
                     
+            except FutureTimeoutError:
+                results['checks'][check_name] = {
+                    'healthy': False,
+                    'message': f'Check timed out after {HEALTH_CHECK_TIMEOUT:.0f}s',
+                    'details': {}
+                }
+                results['overall_status'] = 'unhealthy'
             except Exception as e:
                 results['checks'][check_name] = {
                     'healthy': False,
@@ -245,11 +459,12 @@ class HealthChecker:
         
         return results
     
+    @_cached_check(HEALTH_CHECK_TTL)
     def _check_database(self) -> Dict[str, Any]:
         """Check Cosmos DB connectivity."""
         try:
-            # Try to fetch a small amount of data
-            cosmos_service.get_recent_events(limit=1)
+            # Read container metadata; cheaper than a cross-partition query
+            cosmos_service.ping()
             
             return {
                 'healthy': True,
@@ -267,6 +482,7 @@ class HealthChecker:
                 'details': {}
             }
     
+    @_cached_check(HEALTH_CHECK_TTL)
     def _check_cache(self) -> Dict[str, Any]:
         """Check Redis cache connectivity."""
         try:
@@ -298,8 +514,16 @@ class HealthChecker:
                 'details': {}
             }
     
+    @_cached_check(HEALTH_CHECK_TTL)
     def _check_h3_service(self) -> Dict[str, Any]:
         """Check H3 geofence service."""
+        if h3_geofence_service is None:
+            return {
+                'healthy': False,
+                'message': 'H3 service not available',
+                'details': {}
+            }
+        
         try:
             zones = h3_geofence_service.get_all_zones()
             
@@ -329,6 +553,7 @@ class HealthChecker:
                 'details': {}
             }
     
+    @_cached_check(RESOURCE_CHECK_TTL)
     def _check_disk_space(self) -> Dict[str, Any]:
         """Check available disk space."""
         try:
@@ -362,6 +587,7 @@ class HealthChecker:
                 'details': {}
             }
     
+    @_cached_check(RESOURCE_CHECK_TTL)
     def _check_memory(self) -> Dict[str, Any]:
         """Check memory usage."""
         try:
@@ -398,6 +624,7 @@ class HealthChecker:
 # Global instances
 metrics_collector = MetricsCollector()
 health_checker = HealthChecker()
+_metrics_sampler = None
 
 
 def collect_and_store_metrics():
@@ -405,6 +632,15 @@ def collect_and_store_metrics():
     metrics_collector.store_metrics()
 
 
+def start_metrics_sampler(interval: float) -> MetricsSampler:
+    """Start background metrics collection every interval seconds (once per process)."""
+    global _metrics_sampler
+    if _metrics_sampler is None:
+        _metrics_sampler = MetricsSampler(metrics_collector, interval)
+        _metrics_sampler.start()
+    return _metrics_sampler
+
+
 def get_health_status() -> Dict[str, Any]:
     """Get current health status."""
     return health_checker.run_all_checks()
@@ -5,35 +5,133 @@ Provides interface for storing and retrieving taxi simulation data.
 
 import logging
 import json
-from typing import Dict, List, Optional, Any
-from datetime import datetime, timezone
-from azure.cosmos import CosmosClient, PartitionKey
-from azure.cosmos.exceptions import CosmosResourceNotFoundError, CosmosHttpResponseError
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Any, Tuple
+from datetime import datetime, timedelta, timezone
+from azure.cosmos import PartitionKey
+from azure.cosmos.exceptions import (
+    CosmosAccessConditionFailedError, CosmosResourceExistsError,
+    CosmosResourceNotFoundError, CosmosHttpResponseError
+)
 from django.conf import settings
 from django.core.cache import cache
+from geofence_app.cosmos_service import cosmos_service
 
 logger = logging.getLogger(__name__)
 
+# Maximum operations Cosmos DB accepts in one transactional batch
+BATCH_SIZE = 100
+
+# Event type of the per-taxi document mirroring its most recent location
+LATEST_LOCATION_EVENT_TYPE = 'taxi_latest_location'
+
+# Fields patched onto the latest-location document when a newer location arrives
+LATEST_LOCATION_FIELDS = ('latitude', 'longitude', 'timestamp', 'metadata', 'created_at', 'event_id')
+
+# Single-flight lock lifetime and how long other callers wait for its result (seconds)
+STATUS_LOCK_TIMEOUT = 5
+STATUS_LOCK_WAIT = 1.0
+STATUS_LOCK_POLL_INTERVAL = 0.05
+
+# Event list sizes that are cached; requested limits are rounded up to one of these
+CACHED_LIMIT_BUCKETS = (50, 100, 500, 1000)
+
+# Event type of the per-(taxi, state) document holding the last entry/exit for that state
+STATE_CURRENT_EVENT_TYPE = 'taxi_state_current'
+
+# Maximum items requested per page by event list queries
+EVENT_PAGE_SIZE = 100
+
+
+def _limit_bucket(limit: int) -> Optional[int]:
+    """Round limit up to the nearest cached bucket, or None if it exceeds them all."""
+    return next((bucket for bucket in CACHED_LIMIT_BUCKETS if bucket >= limit), None)
+
+
+def _take(query_iterable, count: int) -> List[Dict]:
+    """
+    Collect up to count items from a query, one page at a time.
+    
+    Stops requesting pages as soon as enough items have arrived, so memory
+    stays bounded by the page size rather than the whole result set.
+    """
+    items = []
+    for page in query_iterable.by_page():
+        for item in page:
+            items.append(item)
+            if len(items) >= count:
+                return items
+    return items
+
+
+# Query texts are built once; methods only supply the parameter values
+_Q_LATEST_LOC = (
+    "SELECT TOP 1 * FROM c WHERE c.taxi_id = @taxi_id "
+    "AND c.event_type = 'taxi_location' ORDER BY c.timestamp DESC"
+)
+_Q_CURRENT_STATES = (
+    "SELECT c.state_name, c.last_event_type FROM c "
+    "WHERE c.taxi_id = @taxi_id AND c.event_type = @event_type"
+)
+_Q_STATE_HISTORY = (
+    "SELECT c.state_name, c.event_type, c.timestamp FROM c "
+    "WHERE c.taxi_id = @taxi_id AND c.event_type IN ('state_entry', 'state_exit') "
+    "ORDER BY c.state_name, c.timestamp DESC"
+)
+_Q_ACTIVE_TAXIS = (
+    "SELECT c.taxi_id, c.latitude, c.longitude, c.timestamp, c.metadata FROM c "
+    "WHERE c.event_type = @event_type AND c.timestamp >= @cutoff_time "
+    "ORDER BY c.timestamp DESC"
+)
+_Q_ALL_LOCATIONS = (
+    "SELECT * FROM c WHERE c.event_type = 'taxi_location' ORDER BY c.timestamp DESC"
+)
+_Q_STATE_EVENTS = (
+    "SELECT TOP @limit * FROM c WHERE c.state_name = @state_name "
+    "AND c.event_type IN ('state_entry', 'state_exit') ORDER BY c.timestamp DESC"
+)
+_Q_TAXI_EVENTS_ALL = (
+    "SELECT TOP @limit * FROM c WHERE c.taxi_id = @taxi_id "
+    "AND c.event_type NOT IN (@latest_type, @state_current_type) "
+    "ORDER BY c.timestamp DESC"
+)
+_Q_TAXI_EVENTS_TYPED = (
+    "SELECT TOP @limit * FROM c WHERE c.taxi_id = @taxi_id "
+    "AND c.event_type NOT IN (@latest_type, @state_current_type) "
+    "AND c.event_type = @event_type ORDER BY c.timestamp DESC"
+)
+
+# Parameters shared by every get_taxi_events query
+_EXCLUDED_EVENT_TYPE_PARAMETERS = (
+    {"name": "@latest_type", "value": LATEST_LOCATION_EVENT_TYPE},
+    {"name": "@state_current_type", "value": STATE_CURRENT_EVENT_TYPE}
+)
+
 
 class TaxiCosmosService:
     """Service class for taxi-specific Azure Cosmos DB operations."""
     
     def __init__(self):
-        """Initialize Cosmos DB client and taxi container."""
-        self.client = CosmosClient(settings.COSMOS_ENDPOINT, settings.COSMOS_KEY)
+        """Initialize the taxi container on the shared Cosmos DB client."""
+        # CosmosClient is thread-safe; sharing it avoids a second connection
+        # pool and set of TLS sessions to the same account
+        self.client = cosmos_service.client
         self.database_name = settings.COSMOS_DATABASE_NAME
         self.container_name = "taxi"  # Use existing taxi container
         
+        # Runs independent reads concurrently (the sync client is thread-safe)
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='taxi-cosmos')
+        
         # Initialize database and container
         self._initialize_database()
         
     def _initialize_database(self):
-        """Initialize database and taxi container if they don't exist."""
+        """Initialize taxi container if it doesn't exist."""
         try:
-            # Create database if it doesn't exist
-            self.database = self.client.create_database_if_not_exists(
-                id=self.database_name
-            )
+            # cosmos_service has already created the database
+            self.database = self.client.get_database_client(self.database_name)
             
             # Create taxi container if it doesn't exist
             # Note: No offer_throughput for serverless Cosmos DB accounts
@@ -49,7 +147,8 @@ class TaxiCosmosService:
             raise
     
     def store_taxi_location(self, taxi_id: str, latitude: float, longitude: float, 
-                           timestamp: Optional[datetime] = None, metadata: Optional[Dict] = None) -> str:
+                           timestamp: Optional[datetime] = None, metadata: Optional[Dict] = None,
+                           event_id: Optional[str] = None) -> str:
         """
         Store a taxi location update in the taxi-data container.
         
@@ -59,15 +158,36 @@ class TaxiCosmosService:
             longitude: GPS longitude coordinate
             timestamp: Event timestamp (defaults to current time)
             metadata: Additional metadata for the location
+            event_id: Document ID to use (defaults to one derived from the timestamp)
             
         Returns:
             Document ID of the stored location
         """
+        document = self.build_location_document(taxi_id, latitude, longitude, timestamp, metadata, event_id)
+        
+        try:
+            self.container.upsert_item(document)
+            self._advance_latest_location(document)
+            logger.debug(f"Stored taxi location for {taxi_id}")
+            
+            # Invalidate cache for this taxi
+            cache.delete(f"taxi_status_{taxi_id}")
+            
+            return document['id']
+            
+        except CosmosHttpResponseError as e:
+            logger.error(f"Failed to store taxi location: {e}")
+            raise
+    
+    def build_location_document(self, taxi_id: str, latitude: float, longitude: float,
+                                timestamp: Optional[datetime] = None, metadata: Optional[Dict] = None,
+                                event_id: Optional[str] = None) -> Dict:
+        """Build the taxi-data document for a location update."""
         if timestamp is None:
             timestamp = datetime.now(timezone.utc)
             
-        document = {
-            'id': f"{taxi_id}_{int(timestamp.timestamp() * 1000)}",
+        return {
+            'id': event_id or f"{taxi_id}_{int(timestamp.timestamp() * 1000)}",
             'taxi_id': taxi_id,
             'latitude': latitude,
             'longitude': longitude,
@@ -76,18 +196,84 @@ class TaxiCosmosService:
             'metadata': metadata or {},
             'created_at': datetime.now(timezone.utc).isoformat()
         }
+    
+    def _latest_location_document(self, document: Dict) -> Dict:
+        """Build the latest-location document for a taxi from one of its location documents."""
+        return {
+            **document,
+            'id': f"{document['taxi_id']}_latest",
+            'event_type': LATEST_LOCATION_EVENT_TYPE,
+            'event_id': document['id']
+        }
+    
+    def _advance_latest_location(self, document: Dict):
+        """
+        Move a taxi's latest-location document forward to a location document.
         
+        The patch only applies while the stored timestamp is older, so late or
+        retried events never move a taxi's position backwards.
+        """
+        latest = self._latest_location_document(document)
         try:
-            result = self.container.create_item(body=document)
-            logger.debug(f"Stored taxi location for {taxi_id}")
-            
-            # Invalidate cache for this taxi
-            cache.delete(f"taxi_status_{taxi_id}")
+            self.container.patch_item(
+                item=latest['id'],
+                partition_key=latest['taxi_id'],
+                patch_operations=[{'op': 'set', 'path': f'/{field}', 'value': latest[field]}
+                                  for field in LATEST_LOCATION_FIELDS],
+                filter_predicate=f"FROM c WHERE c.timestamp < '{latest['timestamp']}'"
+            )
+        except CosmosAccessConditionFailedError:
+            # The stored location is as new or newer
+            pass
+        except CosmosResourceNotFoundError:
+            try:
+                self.container.create_item(latest)
+            except CosmosResourceExistsError:
+                # Created concurrently; compare against that document instead
+                self._advance_latest_location(document)
+    
+    def store_batch(self, documents: List[Dict]) -> int:
+        """
+        Store many taxi documents with one transactional batch per taxi.
+        
+        Documents are grouped by taxi_id (the partition key) and upserted in
+        batches of up to BATCH_SIZE operations, so a retried call does not
+        conflict with documents it already stored. Each taxi's latest-location
+        document then advances to its newest location in the batch.
+        
+        Args:
+            documents: Documents built by build_location_document or similar
             
-            return result['id']
+        Returns:
+            Number of documents stored
+        """
+        documents_by_taxi = defaultdict(list)
+        for document in documents:
+            documents_by_taxi[document['taxi_id']].append(document)
+        
+        stored = 0
+        try:
+            for taxi_id, taxi_documents in documents_by_taxi.items():
+                operations = [('upsert', (document,)) for document in taxi_documents]
+                
+                for start in range(0, len(operations), BATCH_SIZE):
+                    self.container.execute_item_batch(
+                        batch_operations=operations[start:start + BATCH_SIZE],
+                        partition_key=taxi_id
+                    )
+                stored += len(taxi_documents)
+                
+                locations = [document for document in taxi_documents if document['event_type'] == 'taxi_location']
+                if locations:
+                    self._advance_latest_location(max(locations, key=lambda document: document['timestamp']))
+                
+                # Invalidate cache for this taxi
+                cache.delete(f"taxi_status_{taxi_id}")
+            
+            return stored
             
         except CosmosHttpResponseError as e:
-            logger.error(f"Failed to store taxi location: {e}")
+            logger.error(f"Failed to store taxi batch: {e}")
             raise
     
     def store_taxi_state_change(self, taxi_id: str, state_name: str, event_type: str,
@@ -123,20 +309,93 @@ class TaxiCosmosService:
             'created_at': datetime.now(timezone.utc).isoformat()
         }
         
+        state_document = {
+            'id': f"{taxi_id}_state_{state_name}",
+            'taxi_id': taxi_id,
+            'state_name': state_name,
+            'event_type': STATE_CURRENT_EVENT_TYPE,
+            'last_event_type': event_type,
+            'timestamp': document['timestamp']
+        }
+        
         try:
-            result = self.container.create_item(body=document)
+            # Store the event and the taxi's current status for this state together
+            self.container.execute_item_batch(
+                batch_operations=[
+                    ('upsert', (document,)),
+                    ('upsert', (state_document,))
+                ],
+                partition_key=taxi_id
+            )
             logger.debug(f"Stored {event_type} event for taxi {taxi_id} in state {state_name}")
             
             # Invalidate related caches
             cache.delete(f"taxi_status_{taxi_id}")
-            cache.delete(f"state_events_{state_name}")
+            cache.delete_many([f"state_events_{state_name}_{bucket}" for bucket in CACHED_LIMIT_BUCKETS])
             
-            return result['id']
+            return document['id']
             
         except CosmosHttpResponseError as e:
             logger.error(f"Failed to store taxi state event: {e}")
             raise
     
+    def _get_latest_location(self, taxi_id: str) -> Optional[Dict]:
+        """
+        Get a taxi's most recent location document.
+        
+        Uses a point read of the taxi's latest-location document, falling back
+        to a query for taxis whose history predates that document.
+        """
+        try:
+            return self.container.read_item(item=f"{taxi_id}_latest", partition_key=taxi_id)
+        except CosmosResourceNotFoundError:
+            pass
+        
+        location_events = list(self.container.query_items(
+            query=_Q_LATEST_LOC,
+            parameters=[{"name": "@taxi_id", "value": taxi_id}],
+            max_item_count=1,
+            partition_key=taxi_id
+        ))
+        
+        return location_events[0] if location_events else None
+    
+    def _get_current_states(self, taxi_id: str) -> List[str]:
+        """
+        Get the states a taxi is currently in (entered but not exited).
+        
+        Reads one status document per state the taxi has visited, falling
+        back to replaying entry/exit events for taxis whose history predates
+        those documents.
+        """
+        state_documents = list(self.container.query_items(
+            query=_Q_CURRENT_STATES,
+            parameters=[
+                {"name": "@taxi_id", "value": taxi_id},
+                {"name": "@event_type", "value": STATE_CURRENT_EVENT_TYPE}
+            ],
+            partition_key=taxi_id
+        ))
+        
+        if state_documents:
+            return [document['state_name'] for document in state_documents
+                    if document['last_event_type'] == 'state_entry']
+        
+        state_events = list(self.container.query_items(
+            query=_Q_STATE_HISTORY,
+            parameters=[{"name": "@taxi_id", "value": taxi_id}],
+            partition_key=taxi_id
+        ))
+        
+        state_status = {}
+        for event in state_events:
+            state_name = event['state_name']
+            if state_name not in state_status:
+                state_status[state_name] = event['event_type']
+        
+        return [state_name for state_name, status in state_status.items() 
+                if status == 'state_entry']
+    
     def get_taxi_current_status(self, taxi_id: str) -> Optional[Dict]:
         """
         Get the current status of a taxi including its latest location and state.
@@ -153,52 +412,37 @@ class TaxiCosmosService:
         if cached_result is not None:
             return cached_result
         
+        # Single flight: only the lock holder queries Cosmos DB; other callers
+        # briefly poll for its result before falling back to querying themselves
+        lock_key = f"lock:{cache_key}"
+        if not cache.add(lock_key, 1, STATUS_LOCK_TIMEOUT):
+            deadline = time.monotonic() + STATUS_LOCK_WAIT
+            while time.monotonic() < deadline:
+                time.sleep(STATUS_LOCK_POLL_INTERVAL)
+                cached_result = cache.get(cache_key)
+                if cached_result is not None:
+                    return cached_result
+            lock_key = None
+        
         try:
-            # Get latest location event
-            location_query = """
-            SELECT TOP 1 * FROM c 
-            WHERE c.taxi_id = @taxi_id 
-            AND c.event_type = 'taxi_location'
-            ORDER BY c.timestamp DESC
-            """
-            
-            location_events = list(self.container.query_items(
-                query=location_query,
-                parameters=[{"name": "@taxi_id", "value": taxi_id}],
-                max_item_count=1,
-                partition_key=taxi_id
-            ))
+            return self._load_taxi_status(taxi_id, cache_key)
+        finally:
+            if lock_key is not None:
+                cache.delete(lock_key)
+    
+    def _load_taxi_status(self, taxi_id: str, cache_key: str) -> Optional[Dict]:
+        """Query a taxi's status from Cosmos DB and cache it."""
+        try:
+            # Get current state (states entered but not exited) concurrently
+            # with the latest location event
+            states_future = self._executor.submit(self._get_current_states, taxi_id)
+            latest_location = self._get_latest_location(taxi_id)
             
-            if not location_events:
+            if latest_location is None:
+                states_future.cancel()
                 return None
             
-            latest_location = location_events[0]
-            
-            # Get current state (states entered but not exited)
-            states_query = """
-            SELECT c.state_name, c.event_type, c.timestamp FROM c 
-            WHERE c.taxi_id = @taxi_id 
-            AND c.event_type IN ('state_entry', 'state_exit')
-            ORDER BY c.state_name, c.timestamp DESC
-            """
-            
-            state_events = list(self.container.query_items(
-                query=states_query,
-                parameters=[{"name": "@taxi_id", "value": taxi_id}],
-                partition_key=taxi_id
-            ))
-            
-            # Determine current state
-            current_states = []
-            state_status = {}
-            
-            for event in state_events:
-                state_name = event['state_name']
-                if state_name not in state_status:
-                    state_status[state_name] = event['event_type']
-            
-            current_states = [state_name for state_name, status in state_status.items() 
-                           if status == 'state_entry']
+            current_states = states_future.result()
             
             status = {
                 'taxi_id': taxi_id,
@@ -221,46 +465,102 @@ class TaxiCosmosService:
             logger.error(f"Failed to get taxi status: {e}")
             raise
     
+    def _query_active_taxis(self, hours: int, page_size: Optional[int] = None,
+                            event_type: str = LATEST_LOCATION_EVENT_TYPE):
+        """Build the query iterable over taxis active in the last N hours."""
+        # Stored timestamps are UTC ISO 8601 strings in isoformat(), so the
+        # cutoff must use the same format to compare correctly as a string
+        cutoff_iso = (datetime.now(timezone.utc) - timedelta(hours=hours)).isoformat()
+        
+        # One latest-location document per taxi, so no client-side grouping
+        return self.container.query_items(
+            query=_Q_ACTIVE_TAXIS,
+            parameters=[
+                {"name": "@event_type", "value": event_type},
+                {"name": "@cutoff_time", "value": cutoff_iso}
+            ],
+            max_item_count=page_size,
+            enable_cross_partition_query=True
+        )
+    
     def get_all_active_taxis(self, hours: int = 1) -> List[Dict]:
         """Get all taxis that have been active in the last N hours."""
         try:
-            # Calculate cutoff time
-            cutoff_time = datetime.now(timezone.utc).replace(microsecond=0)
-            cutoff_time = cutoff_time.replace(hour=cutoff_time.hour - hours)
-            cutoff_iso = cutoff_time.isoformat() + 'Z'
-            
-            # Query for recent taxi locations
-            query = """
-                SELECT DISTINCT c.taxi_id, c.latitude, c.longitude, c.timestamp, c.metadata
-                FROM c 
-                WHERE c.timestamp >= @cutoff_time 
-                AND c.event_type = 'taxi_location'
-                ORDER BY c.timestamp DESC
-            """
-            
-            items = list(self.container.query_items(
-                query=query,
-                parameters=[{"name": "@cutoff_time", "value": cutoff_iso}],
-                enable_cross_partition_query=True
-            ))
-            
-            # Group by taxi_id and get the most recent location for each
-            taxi_locations = {}
-            for item in items:
-                taxi_id = item['taxi_id']
-                if taxi_id not in taxi_locations:
-                    taxi_locations[taxi_id] = item
-                else:
-                    # Keep the most recent timestamp
-                    if item['timestamp'] > taxi_locations[taxi_id]['timestamp']:
-                        taxi_locations[taxi_id] = item
-            
-            return list(taxi_locations.values())
+            taxis = list(self._query_active_taxis(hours))
+            if not taxis:
+                taxis = self._legacy_active_taxis(hours)
+            return taxis
             
         except Exception as e:
             logger.error(f"Error getting active taxis: {e}")
             return []
     
+    def get_active_taxis_page(self, hours: int = 1, page_size: int = 500,
+                              continuation_token: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Get one page of the taxis that have been active in the last N hours.
+        
+        Args:
+            hours: Activity window in hours
+            page_size: Maximum number of taxis per page
+            continuation_token: Token returned with the previous page, if any
+            
+        Returns:
+            Tuple of (taxis on this page, token for the next page or None)
+        """
+        try:
+            pages = self._query_active_taxis(hours, page_size).by_page(continuation_token)
+            page = list(next(pages, []))
+            if not page and continuation_token is None:
+                return self._legacy_active_taxis(hours), None
+            return page, pages.continuation_token
+            
+        except CosmosHttpResponseError as e:
+            logger.error(f"Error getting active taxis page: {e}")
+            raise
+    
+    def _legacy_active_taxis(self, hours: int) -> List[Dict]:
+        """
+        Get active taxis from their location events.
+        
+        Fallback for taxis last seen before latest-location documents were
+        written; run backfill_latest_locations to create theirs.
+        """
+        # Events are newest first, so the first one seen per taxi is its latest
+        taxi_locations = {}
+        for item in self._query_active_taxis(hours, event_type='taxi_location'):
+            taxi_locations.setdefault(item['taxi_id'], item)
+        
+        return list(taxi_locations.values())
+    
+    def backfill_latest_locations(self) -> int:
+        """
+        Create or advance every taxi's latest-location document from its location events.
+        
+        Returns:
+            Number of taxis whose latest location was written
+        """
+        try:
+            events = self.container.query_items(
+                query=_Q_ALL_LOCATIONS,
+                max_item_count=-1,
+                enable_cross_partition_query=True
+            )
+            
+            # Events are newest first, so the first one seen per taxi is its latest
+            latest = {}
+            for event in events:
+                latest.setdefault(event['taxi_id'], event)
+            
+            for event in latest.values():
+                self._advance_latest_location(event)
+            
+            return len(latest)
+            
+        except CosmosHttpResponseError as e:
+            logger.error(f"Failed to backfill latest taxi locations: {e}")
+            raise
+    
     def get_taxi_events(self, taxi_id: str, limit: int = 100, 
                        event_type: Optional[str] = None) -> List[Dict]:
         """
@@ -274,33 +574,39 @@ class TaxiCosmosService:
         Returns:
             List of event documents
         """
-        cache_key = f"taxi_events_{taxi_id}_{event_type}_{limit}"
-        cached_result = cache.get(cache_key)
+        # Cache per limit bucket so arbitrary limits share entries
+        bucket = _limit_bucket(limit)
+        cache_key = f"taxi_events_{taxi_id}_{event_type}_{bucket}"
         
-        if cached_result is not None:
-            return cached_result
+        if bucket is not None:
+            cached_result = cache.get(cache_key)
+            if cached_result is not None:
+                return cached_result[:limit]
         
         try:
-            query = "SELECT * FROM c WHERE c.taxi_id = @taxi_id"
-            parameters = [{"name": "@taxi_id", "value": taxi_id}]
+            query = _Q_TAXI_EVENTS_TYPED if event_type else _Q_TAXI_EVENTS_ALL
+            fetch_count = bucket or limit
+            parameters = [
+                {"name": "@limit", "value": fetch_count},
+                {"name": "@taxi_id", "value": taxi_id},
+                *_EXCLUDED_EVENT_TYPE_PARAMETERS
+            ]
             
             if event_type:
-                query += " AND c.event_type = @event_type"
                 parameters.append({"name": "@event_type", "value": event_type})
             
-            query += " ORDER BY c.timestamp DESC"
-            
-            items = list(self.container.query_items(
+            items = _take(self.container.query_items(
                 query=query,
                 parameters=parameters,
-                max_item_count=limit,
-                partition_key=taxi_id
-            ))
+                partition_key=taxi_id,
+                max_item_count=min(fetch_count, EVENT_PAGE_SIZE)
+            ), fetch_count)
             
             # Cache for 5 minutes
-            cache.set(cache_key, items, 300)
+            if bucket is not None:
+                cache.set(cache_key, items, 300)
             
-            return items
+            return items[:limit]
             
         except CosmosHttpResponseError as e:
             logger.error(f"Failed to retrieve taxi events: {e}")
@@ -317,31 +623,32 @@ class TaxiCosmosService:
         Returns:
             List of event documents
         """
-        cache_key = f"state_events_{state_name}_{limit}"
-        cached_result = cache.get(cache_key)
+        # Cache per limit bucket so arbitrary limits share entries
+        bucket = _limit_bucket(limit)
+        cache_key = f"state_events_{state_name}_{bucket}"
         
-        if cached_result is not None:
-            return cached_result
+        if bucket is not None:
+            cached_result = cache.get(cache_key)
+            if cached_result is not None:
+                return cached_result[:limit]
         
         try:
-            query = """
-            SELECT * FROM c 
-            WHERE c.state_name = @state_name 
-            AND c.event_type IN ('state_entry', 'state_exit')
-            ORDER BY c.timestamp DESC
-            """
-            
-            items = list(self.container.query_items(
-                query=query,
-                parameters=[{"name": "@state_name", "value": state_name}],
-                max_item_count=limit,
+            fetch_count = bucket or limit
+            items = _take(self.container.query_items(
+                query=_Q_STATE_EVENTS,
+                parameters=[
+                    {"name": "@limit", "value": fetch_count},
+                    {"name": "@state_name", "value": state_name}
+                ],
+                max_item_count=min(fetch_count, EVENT_PAGE_SIZE),
                 enable_cross_partition_query=True
-            ))
+            ), fetch_count)
             
             # Cache for 10 minutes
-            cache.set(cache_key, items, 600)
+            if bucket is not None:
+                cache.set(cache_key, items, 600)
             
-            return items
+            return items[:limit]
             
         except CosmosHttpResponseError as e:
             logger.error(f"Failed to retrieve state events: {e}")
@@ -4,25 +4,152 @@ Simulates 20 taxis moving through NYC using real taxi trip data
 with geofence zone detection and real-time tracking.
 """
 
-import csv
-import json
 import time
-import random
 import threading
+import heapq
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
+from enum import IntEnum
 import math
+import numpy as np
+import orjson
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
 import requests
+from requests.adapters import HTTPAdapter
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Numba is optional: it compiles the distance kernel when installed
+try:
+    from numba import float32, float64, njit, prange, vectorize
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    logger.info("Numba not available, using NumPy distance calculations")
+
+EARTH_RADIUS_KM = 6371.0
+
+# Coordinates are stored in single precision: about 0.5 m resolution across
+# NYC, with half the memory traffic of float64
+COORDINATE_DTYPE = np.float32
+
+# Length of one degree of latitude (or of longitude at the equator)
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+
+# Maximum location events per bulk request (the API's MAX_BULK_EVENTS)
+BULK_BATCH_SIZE = 1000
+
+# Idle taxis don't move, so their location is only re-sent this often (seconds)
+IDLE_REPORT_INTERVAL = 10.0
+
+# Bulk requests sent concurrently when a fleet spans several batches
+SENDER_POOL_SIZE = 32
+
+# Taxis closer than this to their destination snap onto it (50 meters)
+ARRIVAL_DISTANCE_KM = 0.05
+
+# Floor for distances used as divisors
+MIN_DISTANCE_KM = 1e-9
+
+# Trip CSV columns, the TripTable column each one feeds, and its Arrow type.
+# Integer columns are read as floats so missing values can be dropped first,
+# and datetimes as strings so malformed values can be dropped rather than
+# failing the whole read.
+TRIP_CSV_COLUMNS = {
+    'VendorID': ('vendor_id', pa.float64()),
+    'tpep_pickup_datetime': ('pickup_datetime', pa.string()),
+    'tpep_dropoff_datetime': ('dropoff_datetime', pa.string()),
+    'passenger_count': ('passenger_count', pa.float64()),
+    'trip_distance': ('trip_distance', pa.float64()),
+    'pickup_longitude': ('pickup_longitude', pa.float32()),
+    'pickup_latitude': ('pickup_latitude', pa.float32()),
+    'dropoff_longitude': ('dropoff_longitude', pa.float32()),
+    'dropoff_latitude': ('dropoff_latitude', pa.float32()),
+    'fare_amount': ('fare_amount', pa.float64()),
+    'total_amount': ('total_amount', pa.float64()),
+}
+TRIP_CSV_INTEGER_COLUMNS = ('vendor_id', 'passenger_count')
+TRIP_CSV_DATETIME_COLUMNS = ('tpep_pickup_datetime', 'tpep_dropoff_datetime')
+TRIP_CSV_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class TaxiStatus(IntEnum):
+    """Taxi status codes stored in the fleet's int8 status column."""
+    IDLE = 0
+    PICKUP = 1
+    DROPOFF = 2
+
+
+# Status names reported by the API and views, indexed by status code
+STATUS_NAMES = tuple(status.name.lower() for status in TaxiStatus)
+
+
+def _haversine_km_py(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Calculate distance between two points using Haversine formula (in km)."""
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    delta_lat = lat2_rad - lat1_rad
+    delta_lng = math.radians(lng2 - lng1)
+    
+    a = (math.sin(delta_lat / 2) ** 2 +
+         math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lng / 2) ** 2)
+    
+    return 2 * EARTH_RADIUS_KM * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+if NUMBA_AVAILABLE:
+    _haversine_km = njit(fastmath=True, cache=True)(_haversine_km_py)
+    _haversine_km_ufunc = vectorize(
+        [float32(float32, float32, float32, float32),
+         float64(float64, float64, float64, float64)], fastmath=True
+    )(_haversine_km_py)
+else:
+    _haversine_km = _haversine_km_py
+    _haversine_km_ufunc = None
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _move_kernel(slots, lat, lng, dest_lat, dest_lng, cos_lat, speed,
+                     last_update_ts, now, arrived):
+        """Move the taxis in slots in place, flagging those that arrived."""
+        for k in prange(slots.shape[0]):
+            i = slots[k]
+            delta_lat = dest_lat[i] - lat[i]
+            delta_lng = dest_lng[i] - lng[i]
+            distance_to_destination = KM_PER_DEGREE * math.sqrt(
+                delta_lat * delta_lat + (delta_lng * cos_lat[i]) ** 2
+            )
+            distance_to_move = speed[i] * ((now - last_update_ts[i]) / 3600.0)
+            
+            progress = min(distance_to_move / max(distance_to_destination, MIN_DISTANCE_KM), 1.0)
+            if distance_to_destination < ARRIVAL_DISTANCE_KM or progress >= 1.0:
+                lat[i] = dest_lat[i]
+                lng[i] = dest_lng[i]
+                arrived[k] = True
+            else:
+                lat[i] += delta_lat * progress
+                lng[i] += delta_lng * progress
+            last_update_ts[i] = now
+else:
+    _move_kernel = None
+
+
 @dataclass
 class TripData:
     """Represents a single taxi trip from the CSV data."""
+    # Declared by hand because dataclass(slots=True) needs Python 3.10
+    __slots__ = ('vendor_id', 'pickup_datetime', 'dropoff_datetime', 'passenger_count',
+                 'trip_distance', 'pickup_longitude', 'pickup_latitude', 'dropoff_longitude',
+                 'dropoff_latitude', 'fare_amount', 'total_amount')
+    
     vendor_id: int
     pickup_datetime: datetime
     dropoff_datetime: datetime
@@ -35,28 +162,180 @@ class TripData:
     fare_amount: float
     total_amount: float
 
-@dataclass
+
+class TripTable:
+    """
+    Trip records stored as NumPy columns.
+    
+    Supports len() and indexing like a list of trips; a TripData is only
+    built for the row being accessed.
+    """
+    
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        self.vendor_id = columns['vendor_id']
+        self.pickup_datetime = columns['pickup_datetime']
+        self.dropoff_datetime = columns['dropoff_datetime']
+        self.passenger_count = columns['passenger_count']
+        self.trip_distance = columns['trip_distance']
+        self.pickup_longitude = columns['pickup_longitude']
+        self.pickup_latitude = columns['pickup_latitude']
+        self.dropoff_longitude = columns['dropoff_longitude']
+        self.dropoff_latitude = columns['dropoff_latitude']
+        self.fare_amount = columns['fare_amount']
+        self.total_amount = columns['total_amount']
+    
+    def __len__(self) -> int:
+        return len(self.pickup_latitude)
+    
+    def __getitem__(self, index: int) -> TripData:
+        return TripData(
+            vendor_id=self.vendor_id[index].item(),
+            pickup_datetime=self.pickup_datetime[index].item(),
+            dropoff_datetime=self.dropoff_datetime[index].item(),
+            passenger_count=self.passenger_count[index].item(),
+            trip_distance=self.trip_distance[index].item(),
+            pickup_longitude=self.pickup_longitude[index].item(),
+            pickup_latitude=self.pickup_latitude[index].item(),
+            dropoff_longitude=self.dropoff_longitude[index].item(),
+            dropoff_latitude=self.dropoff_latitude[index].item(),
+            fare_amount=self.fare_amount[index].item(),
+            total_amount=self.total_amount[index].item()
+        )
+    
+    @classmethod
+    def empty(cls) -> 'TripTable':
+        """Create a table with no trips."""
+        columns = {
+            name: np.empty(0, dtype=COORDINATE_DTYPE)
+            for name in ('pickup_longitude', 'pickup_latitude', 'dropoff_longitude', 'dropoff_latitude')
+        }
+        columns.update({
+            name: np.empty(0, dtype=np.float64)
+            for name in ('trip_distance', 'fare_amount', 'total_amount')
+        })
+        columns.update({
+            'vendor_id': np.empty(0, dtype=np.int32),
+            'passenger_count': np.empty(0, dtype=np.int32),
+            'pickup_datetime': np.empty(0, dtype='datetime64[us]'),
+            'dropoff_datetime': np.empty(0, dtype='datetime64[us]'),
+        })
+        return cls(columns)
+
+class FleetArrays:
+    """
+    Fleet state stored as parallel NumPy columns, one slot per taxi.
+    
+    Per-tick movement reads and writes whole columns at once instead of
+    visiting a separate Python object for every taxi.
+    """
+    
+    def __init__(self, taxi_ids: List[str], trip_data: TripTable):
+        size = len(taxi_ids)
+        
+        self.taxi_ids = taxi_ids
+        self.trip_data = trip_data
+        
+        self.lat = np.zeros(size, dtype=COORDINATE_DTYPE)
+        self.lng = np.zeros(size, dtype=COORDINATE_DTYPE)
+        self.dest_lat = np.zeros(size, dtype=COORDINATE_DTYPE)
+        self.dest_lng = np.zeros(size, dtype=COORDINATE_DTYPE)
+        self.cos_lat = np.ones(size, dtype=COORDINATE_DTYPE)  # cosine of the current leg's mean latitude
+        self.speed = np.zeros(size, dtype=np.float64)
+        self.trip_progress = np.zeros(size, dtype=np.float64)  # 0.0 to 1.0
+        self.last_update_ts = np.zeros(size, dtype=np.float64)  # time.monotonic() seconds
+        self.last_report_ts = np.full(size, -np.inf)  # when the API last received the location
+        self.status_code = np.full(size, TaxiStatus.IDLE, dtype=np.int8)
+        self.trip_idx = np.full(size, -1, dtype=np.int32)  # -1 when no trip is assigned
+        self.current_zones: List[List[str]] = [[] for _ in taxi_ids]
+
+
+def _column_property(column: str, doc: str) -> property:
+    """Expose one slot of a FleetArrays column as a scalar attribute."""
+    def fget(self):
+        return getattr(self.fleet, column)[self.slot].item()
+    
+    def fset(self, value):
+        getattr(self.fleet, column)[self.slot] = value
+    
+    return property(fget, fset, doc=doc)
+
+
 class TaxiState:
-    """Represents the current state of a taxi."""
-    taxi_id: str
-    current_lat: float
-    current_lng: float
-    destination_lat: float
-    destination_lng: float
-    speed_kmh: float
-    status: str  # 'idle', 'pickup', 'dropoff', 'moving'
-    current_trip: Optional[TripData]
-    trip_progress: float  # 0.0 to 1.0
-    last_update: datetime
-    current_zones: List[str]
+    """Represents the current state of a taxi as a view of its fleet slot."""
+    
+    __slots__ = ('fleet', 'slot', 'taxi_id')
+    
+    def __init__(self, fleet: FleetArrays, slot: int):
+        self.fleet = fleet
+        self.slot = slot
+        self.taxi_id = fleet.taxi_ids[slot]
+    
+    current_lat = _column_property('lat', "Current latitude")
+    current_lng = _column_property('lng', "Current longitude")
+    destination_lat = _column_property('dest_lat', "Destination latitude")
+    destination_lng = _column_property('dest_lng', "Destination longitude")
+    cos_lat = _column_property('cos_lat', "Cosine of the current leg's mean latitude")
+    speed_kmh = _column_property('speed', "Cruising speed in km/h")
+    trip_progress = _column_property('trip_progress', "Trip progress from 0.0 to 1.0")
+    trip_idx = _column_property('trip_idx', "Index of the current trip, or -1")
+    
+    @property
+    def status_code(self) -> TaxiStatus:
+        """Status as a TaxiStatus code."""
+        return TaxiStatus(self.fleet.status_code[self.slot])
+    
+    @status_code.setter
+    def status_code(self, value: TaxiStatus) -> None:
+        self.fleet.status_code[self.slot] = value
+    
+    @property
+    def status(self) -> str:
+        """Status name: 'idle', 'pickup' or 'dropoff'."""
+        return STATUS_NAMES[self.fleet.status_code[self.slot]]
+    
+    @property
+    def current_trip(self) -> Optional[TripData]:
+        """The trip being served, if any."""
+        trip_idx = self.trip_idx
+        return self.fleet.trip_data[trip_idx] if trip_idx >= 0 else None
+    
+    @property
+    def last_update(self) -> datetime:
+        """Time of the taxi's last position update."""
+        seconds_ago = time.monotonic() - self.fleet.last_update_ts[self.slot]
+        return datetime.now() - timedelta(seconds=seconds_ago)
+    
+    @property
+    def current_zones(self) -> List[str]:
+        """Zones the API last reported the taxi in."""
+        return self.fleet.current_zones[self.slot]
+    
+    @current_zones.setter
+    def current_zones(self, value: List[str]) -> None:
+        self.fleet.current_zones[self.slot] = value
 
 class NYCTaxiSimulator:
     """Main taxi simulation class."""
     
-    def __init__(self, csv_file_path: str, api_base_url: str = "http://localhost:8000/api/v1"):
+    def __init__(self, csv_file_path: str, api_base_url: str = "http://localhost:8000/api/v1",
+                 seed: Optional[int] = None):
         self.csv_file_path = csv_file_path
         self.api_base_url = api_base_url
-        self.trip_data: List[TripData] = []
+        
+        # Seeding makes starting positions, speeds and pauses reproducible
+        self._rng = np.random.default_rng(seed)
+        self.trip_data = TripTable.empty()
+        self._unassigned_trips = np.zeros(0, dtype=bool)
+        self.fleet: Optional[FleetArrays] = None
+        
+        # Zone circles for local entry/exit previews, loaded by load_zone_centers()
+        self._zone_ids: List[str] = []
+        self._zone_centers: Optional[np.ndarray] = None  # (zones, 2) of lat, lng
+        self._zone_radii: Optional[np.ndarray] = None  # km
+        self._inside_zones: Optional[np.ndarray] = None  # (taxis, zones) bool
+        # Heap of (time.monotonic() deadline, fleet slot) for idle taxis
+        # waiting for their next trip
+        self._idle_wakeups: List[Tuple[float, int]] = []
         self.taxis: Dict[str, TaxiState] = {}
         self.simulation_running = False
         self.trip_index = 0
@@ -72,53 +351,84 @@ class NYCTaxiSimulator:
         self.speed_variation = 0.3  # ±30% speed variation
         self.base_speed_kmh = 25.0  # average NYC taxi speed
         
+        # Keep-alive session so ticks reuse pooled connections to the API
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        self._session.headers['Content-Type'] = 'application/json'
+        self._sender_pool = ThreadPoolExecutor(
+            max_workers=SENDER_POOL_SIZE, thread_name_prefix='taxi-sender'
+        )
+        
     def load_trip_data(self, max_records: int = 1000) -> None:
         """Load trip data from CSV file."""
         logger.info(f"Loading trip data from {self.csv_file_path}")
         
         try:
-            with open(self.csv_file_path, 'r', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                count = 0
-                
-                for row in reader:
-                    if count >= max_records:
+            # Stream record batches until enough rows survive validation.
+            # Arrow parses and filters the columns natively, and the
+            # surviving float and timestamp columns are handed to NumPy
+            # without copying
+            convert_options = pacsv.ConvertOptions(
+                column_types={name: arrow_type for name, (_, arrow_type) in TRIP_CSV_COLUMNS.items()},
+                include_columns=list(TRIP_CSV_COLUMNS)
+            )
+            columns = {name: [] for name, _ in TRIP_CSV_COLUMNS.values()}
+            valid_count = 0
+            skipped_count = 0
+            
+            with pacsv.open_csv(self.csv_file_path, convert_options=convert_options) as reader:
+                for batch in reader:
+                    for csv_name in TRIP_CSV_DATETIME_COLUMNS:
+                        index = batch.schema.get_field_index(csv_name)
+                        batch = batch.set_column(index, csv_name, pc.strptime(
+                            batch.column(index), format=TRIP_CSV_DATETIME_FORMAT,
+                            unit='us', error_is_null=True
+                        ))
+                    
+                    parsed = pc.is_valid(batch.column(0))
+                    for column in batch.columns[1:]:
+                        parsed = pc.and_(parsed, pc.is_valid(column))
+                    skipped_count += batch.num_rows - pc.sum(parsed).as_py()
+                    
+                    # Skip unparsable rows and coordinates outside NYC
+                    valid = parsed
+                    for column_name, bounds in (('pickup_latitude', 'lat'), ('pickup_longitude', 'lng'),
+                                                ('dropoff_latitude', 'lat'), ('dropoff_longitude', 'lng')):
+                        column = batch.column(column_name)
+                        valid = pc.and_(valid, pc.and_(
+                            pc.greater_equal(column, self.nyc_bounds[f'min_{bounds}']),
+                            pc.less_equal(column, self.nyc_bounds[f'max_{bounds}'])
+                        ))
+                    valid = pc.fill_null(valid, False)
+                    
+                    trips = batch.filter(valid)
+                    for csv_name, (name, _) in TRIP_CSV_COLUMNS.items():
+                        columns[name].append(trips.column(csv_name).to_numpy(zero_copy_only=True))
+                    valid_count += trips.num_rows
+                    
+                    if valid_count >= max_records:
                         break
-                        
-                    try:
-                        # Parse and validate coordinates
-                        pickup_lng = float(row['pickup_longitude'])
-                        pickup_lat = float(row['pickup_latitude'])
-                        dropoff_lng = float(row['dropoff_longitude'])
-                        dropoff_lat = float(row['dropoff_latitude'])
-                        
-                        # Skip invalid coordinates
-                        if not self._is_valid_nyc_coordinate(pickup_lat, pickup_lng):
-                            continue
-                        if not self._is_valid_nyc_coordinate(dropoff_lat, dropoff_lng):
-                            continue
-                            
-                        trip = TripData(
-                            vendor_id=int(row['VendorID']),
-                            pickup_datetime=datetime.strptime(row['tpep_pickup_datetime'], '%Y-%m-%d %H:%M:%S'),
-                            dropoff_datetime=datetime.strptime(row['tpep_dropoff_datetime'], '%Y-%m-%d %H:%M:%S'),
-                            passenger_count=int(row['passenger_count']),
-                            trip_distance=float(row['trip_distance']),
-                            pickup_longitude=pickup_lng,
-                            pickup_latitude=pickup_lat,
-                            dropoff_longitude=dropoff_lng,
-                            dropoff_latitude=dropoff_lat,
-                            fare_amount=float(row['fare_amount']),
-                            total_amount=float(row['total_amount'])
-                        )
-                        
-                        self.trip_data.append(trip)
-                        count += 1
-                        
-                    except (ValueError, KeyError) as e:
-                        logger.warning(f"Skipping invalid row: {e}")
-                        continue
-                        
+            
+            if skipped_count:
+                logger.warning(f"Skipped {skipped_count} invalid rows")
+            
+            if not valid_count:
+                self.trip_data = TripTable.empty()
+                self._unassigned_trips = np.zeros(0, dtype=bool)
+                logger.info("Loaded 0 valid trips")
+                return
+            
+            trip_columns = {
+                name: np.concatenate(chunks)[:max_records] for name, chunks in columns.items()
+            }
+            for name in TRIP_CSV_INTEGER_COLUMNS:
+                trip_columns[name] = trip_columns[name].astype(np.int32)
+            
+            self.trip_data = TripTable(trip_columns)
+            self._unassigned_trips = np.ones(len(self.trip_data), dtype=bool)
+            
             logger.info(f"Loaded {len(self.trip_data)} valid trips")
             
         except FileNotFoundError:
@@ -128,36 +438,33 @@ class NYCTaxiSimulator:
             logger.error(f"Error loading trip data: {e}")
             raise
     
-    def _is_valid_nyc_coordinate(self, lat: float, lng: float) -> bool:
-        """Check if coordinates are within NYC bounds."""
-        return (self.nyc_bounds['min_lat'] <= lat <= self.nyc_bounds['max_lat'] and
-                self.nyc_bounds['min_lng'] <= lng <= self.nyc_bounds['max_lng'])
-    
     def initialize_taxis(self, num_taxis: int = 20) -> None:
         """Initialize taxi fleet with random starting positions."""
         logger.info(f"Initializing {num_taxis} taxis")
         
-        for i in range(num_taxis):
-            taxi_id = f"taxi_{i+1:03d}"
-            
-            # Start at a random pickup location from the data
-            random_trip = random.choice(self.trip_data)
-            
-            taxi = TaxiState(
-                taxi_id=taxi_id,
-                current_lat=random_trip.pickup_latitude,
-                current_lng=random_trip.pickup_longitude,
-                destination_lat=random_trip.pickup_latitude,
-                destination_lng=random_trip.pickup_longitude,
-                speed_kmh=self.base_speed_kmh * (1 + random.uniform(-self.speed_variation, self.speed_variation)),
-                status='idle',
-                current_trip=None,
-                trip_progress=0.0,
-                last_update=datetime.now(),
-                current_zones=[]
-            )
-            
-            self.taxis[taxi_id] = taxi
+        taxi_ids = [f"taxi_{i+1:03d}" for i in range(num_taxis)]
+        fleet = FleetArrays(taxi_ids, self.trip_data)
+        
+        # Start at random pickup locations from the data
+        start_trips = self._rng.choice(len(self.trip_data), size=num_taxis)
+        speed_variations = self._rng.uniform(
+            -self.speed_variation, self.speed_variation, size=num_taxis
+        )
+        
+        fleet.lat[:] = self.trip_data.pickup_latitude[start_trips]
+        fleet.lng[:] = self.trip_data.pickup_longitude[start_trips]
+        fleet.speed[:] = self.base_speed_kmh * (1 + speed_variations)
+        fleet.dest_lat[:] = fleet.lat
+        fleet.dest_lng[:] = fleet.lng
+        fleet.cos_lat[:] = np.cos(np.radians(fleet.lat))
+        fleet.last_update_ts[:] = time.monotonic()
+        
+        self.fleet = fleet
+        self.taxis = {taxi_id: TaxiState(fleet, slot) for slot, taxi_id in enumerate(taxi_ids)}
+        
+        # Every taxi starts idle and is dispatched on the first tick
+        now = time.monotonic()
+        self._idle_wakeups = [(now, slot) for slot in range(num_taxis)]
             
         logger.info(f"Initialized {len(self.taxis)} taxis")
     
@@ -166,137 +473,314 @@ class NYCTaxiSimulator:
         if not self.trip_data:
             return
             
-        # Get next trip in rotation
-        trip = self.trip_data[self.trip_index % len(self.trip_data)]
+        # Dispatch the unassigned trip with the nearest pickup, or the next
+        # trip in rotation once every trip has been handed out
+        trip_idx = self._nearest_unassigned_trip(taxi)
+        if trip_idx is None:
+            trip_idx = self.trip_index % len(self.trip_data)
+        trip = self.trip_data[trip_idx]
         self.trip_index += 1
         
-        taxi.current_trip = trip
-        taxi.destination_lat = trip.pickup_latitude
-        taxi.destination_lng = trip.pickup_longitude
-        taxi.status = 'pickup'
+        taxi.trip_idx = trip_idx
+        self._set_destination(taxi, trip.pickup_latitude, trip.pickup_longitude)
+        taxi.status_code = TaxiStatus.PICKUP
         taxi.trip_progress = 0.0
         
         logger.info(f"{taxi.taxi_id} assigned trip: pickup at ({trip.pickup_latitude:.4f}, {trip.pickup_longitude:.4f})")
     
-    def calculate_distance(self, lat1: float, lng1: float, lat2: float, lng2: float) -> float:
-        """Calculate distance between two points using Haversine formula (in km)."""
-        R = 6371  # Earth's radius in kilometers
+    def _nearest_unassigned_trip(self, taxi: TaxiState) -> Optional[int]:
+        """
+        Find and claim the unassigned trip whose pickup is nearest to a taxi.
+        
+        A vectorized scan over the pickup columns; at the simulator's trip
+        counts this beats maintaining a spatial index.
+        
+        Returns:
+            Index of the trip in trip_data, or None if every trip is assigned
+        """
+        unassigned = self._unassigned_trips
+        if not unassigned.any():
+            return None
+        
+        # Squared equirectangular distance; the scale factor doesn't affect the ordering
+        delta_lat = self.trip_data.pickup_latitude - taxi.current_lat
+        delta_lng = (self.trip_data.pickup_longitude - taxi.current_lng) * taxi.cos_lat
+        squared_distance = np.where(unassigned, delta_lat * delta_lat + delta_lng * delta_lng, np.inf)
         
-        lat1_rad = math.radians(lat1)
-        lat2_rad = math.radians(lat2)
-        delta_lat = math.radians(lat2 - lat1)
-        delta_lng = math.radians(lng2 - lng1)
+        trip_idx = int(np.argmin(squared_distance))
+        unassigned[trip_idx] = False
+        return trip_idx
+    
+    def load_zone_centers(self) -> int:
+        """
+        Load zone centers and radii from the geofence API for local previews.
+        
+        Returns:
+            Number of zones loaded
+        """
+        response = self._session.get(f"{self.api_base_url}/zones/", timeout=5)
+        response.raise_for_status()
+        zones = orjson.loads(response.content).get('zones', [])
+        
+        self._zone_ids = [zone['id'] for zone in zones]
+        self._zone_centers = np.array(
+            [[zone['center']['latitude'], zone['center']['longitude']] for zone in zones],
+            dtype=np.float64
+        ).reshape(-1, 2)
+        self._zone_radii = np.array([zone['radius_km'] for zone in zones], dtype=np.float64)
+        self._inside_zones = None
+        
+        logger.info(f"Loaded {len(zones)} zones for local previews")
+        return len(zones)
+    
+    def preview_zone_transitions(self) -> List[Dict]:
+        """
+        Detect zone entries and exits locally from every taxi-to-zone distance.
+        
+        Broadcasts the fleet's positions against the zone centers so one
+        Haversine call yields the whole (taxis, zones) distance matrix, then
+        diffs membership against the previous call.
+        
+        Returns:
+            List of {'vehicle_id', 'zone_id', 'event_type'} transitions
+        """
+        fleet = self.fleet
+        if fleet is None or self._zone_centers is None:
+            return []
+        
+        distances = self._haversine_vec(
+            fleet.lat[:, None], fleet.lng[:, None],
+            self._zone_centers[None, :, 0], self._zone_centers[None, :, 1]
+        )
+        inside = distances <= self._zone_radii[None, :]
         
-        a = (math.sin(delta_lat / 2) ** 2 + 
-             math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lng / 2) ** 2)
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+        previous = self._inside_zones
+        self._inside_zones = inside
+        if previous is None or previous.shape != inside.shape:
+            return []
         
-        return R * c
+        transitions = []
+        for event_type, changed in (('zone_entry', inside & ~previous),
+                                    ('zone_exit', previous & ~inside)):
+            for slot, zone in zip(*np.nonzero(changed)):
+                transitions.append({
+                    'vehicle_id': fleet.taxi_ids[slot],
+                    'zone_id': self._zone_ids[zone],
+                    'event_type': event_type
+                })
+        return transitions
+    
+    @staticmethod
+    def _haversine_vec(lat1: np.ndarray, lng1: np.ndarray,
+                       lat2: np.ndarray, lng2: np.ndarray) -> np.ndarray:
+        """Calculate element-wise Haversine distances between coordinate arrays (in km)."""
+        if _haversine_km_ufunc is not None:
+            return _haversine_km_ufunc(lat1, lng1, lat2, lng2)
+        
+        lat1_rad = np.radians(lat1)
+        lat2_rad = np.radians(lat2)
+        delta_lat = lat2_rad - lat1_rad
+        delta_lng = np.radians(lng2 - lng1)
+        
+        a = (np.sin(delta_lat / 2) ** 2 +
+             np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(delta_lng / 2) ** 2)
+        
+        return 2 * EARTH_RADIUS_KM * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    
+    @staticmethod
+    def _set_destination(taxi: TaxiState, lat: float, lng: float) -> None:
+        """Point a taxi at a new destination and cache the leg's latitude cosine."""
+        taxi.destination_lat = lat
+        taxi.destination_lng = lng
+        taxi.cos_lat = math.cos(math.radians((taxi.current_lat + lat) / 2))
+    
+    def calculate_distance(self, lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+        """Calculate distance between two points using Haversine formula (in km)."""
+        return _haversine_km(lat1, lng1, lat2, lng2)
     
     def move_taxi_towards_destination(self, taxi: TaxiState) -> None:
         """Move taxi towards its destination."""
-        distance_to_destination = self.calculate_distance(
-            taxi.current_lat, taxi.current_lng,
-            taxi.destination_lat, taxi.destination_lng
+        self._move_all(np.array([taxi.slot]))
+    
+    def _move_all(self, slots: np.ndarray) -> None:
+        """
+        Move the taxis in the given fleet slots towards their destinations.
+        
+        Per-tick moves are short, so distances use the equirectangular
+        approximation with each taxi's cached latitude cosine. Uses the
+        parallel Numba kernel when available, otherwise column-wise NumPy.
+        """
+        fleet = self.fleet
+        now = time.monotonic()
+        
+        if _move_kernel is not None:
+            arrived = np.zeros(slots.shape[0], dtype=np.bool_)
+            _move_kernel(slots, fleet.lat, fleet.lng, fleet.dest_lat, fleet.dest_lng,
+                         fleet.cos_lat, fleet.speed, fleet.last_update_ts, now, arrived)
+        else:
+            arrived = self._move_numpy(slots, now)
+        
+        for slot in slots[arrived].tolist():
+            self._handle_destination_reached(self.taxis[fleet.taxi_ids[slot]])
+    
+    def _move_numpy(self, slots: np.ndarray, now: float) -> np.ndarray:
+        """Move the taxis in slots with NumPy and return a mask of those that arrived."""
+        fleet = self.fleet
+        
+        current_lat = fleet.lat[slots]
+        current_lng = fleet.lng[slots]
+        destination_lat = fleet.dest_lat[slots]
+        destination_lng = fleet.dest_lng[slots]
+        
+        distance_to_destination = KM_PER_DEGREE * np.hypot(
+            destination_lat - current_lat,
+            (destination_lng - current_lng) * fleet.cos_lat[slots]
         )
+        distance_to_move = fleet.speed[slots] * ((now - fleet.last_update_ts[slots]) / 3600)  # km
         
-        # If very close to destination, snap to it
-        if distance_to_destination < 0.05:  # 50 meters
-            taxi.current_lat = taxi.destination_lat
-            taxi.current_lng = taxi.destination_lng
-            self._handle_destination_reached(taxi)
-            return
+        # Fraction of the remaining leg covered this update, without per-taxi
+        # branches; very close taxis snap to the destination
+        progress = np.clip(distance_to_move / np.maximum(distance_to_destination, MIN_DISTANCE_KM), 0.0, 1.0)
+        progress[distance_to_destination < ARRIVAL_DISTANCE_KM] = 1.0
+        arrived = progress >= 1.0
         
-        # Calculate movement
-        time_delta = (datetime.now() - taxi.last_update).total_seconds()
-        distance_to_move = (taxi.speed_kmh / 3600) * time_delta  # km
+        new_lat = current_lat + (destination_lat - current_lat) * progress
+        new_lng = current_lng + (destination_lng - current_lng) * progress
+        np.copyto(new_lat, destination_lat, where=arrived)
+        np.copyto(new_lng, destination_lng, where=arrived)
         
-        if distance_to_move >= distance_to_destination:
-            # Will reach destination this update
-            taxi.current_lat = taxi.destination_lat
-            taxi.current_lng = taxi.destination_lng
-            self._handle_destination_reached(taxi)
-        else:
-            # Move towards destination
-            progress = distance_to_move / distance_to_destination
-            
-            lat_diff = taxi.destination_lat - taxi.current_lat
-            lng_diff = taxi.destination_lng - taxi.current_lng
-            
-            taxi.current_lat += lat_diff * progress
-            taxi.current_lng += lng_diff * progress
+        fleet.lat[slots] = new_lat
+        fleet.lng[slots] = new_lng
+        fleet.last_update_ts[slots] = now
         
-        taxi.last_update = datetime.now()
+        return arrived
     
     def _handle_destination_reached(self, taxi: TaxiState) -> None:
         """Handle when taxi reaches its destination."""
-        if taxi.status == 'pickup':
+        status_code = taxi.status_code
+        if status_code == TaxiStatus.PICKUP:
             # Reached pickup location, now go to dropoff
-            taxi.destination_lat = taxi.current_trip.dropoff_latitude
-            taxi.destination_lng = taxi.current_trip.dropoff_longitude
-            taxi.status = 'dropoff'
+            self._set_destination(taxi, taxi.current_trip.dropoff_latitude,
+                                  taxi.current_trip.dropoff_longitude)
+            taxi.status_code = TaxiStatus.DROPOFF
             logger.info(f"{taxi.taxi_id} picked up passenger, heading to dropoff")
             
-        elif taxi.status == 'dropoff':
+        elif status_code == TaxiStatus.DROPOFF:
             # Completed trip
             logger.info(f"{taxi.taxi_id} completed trip")
-            taxi.status = 'idle'
-            taxi.current_trip = None
+            taxi.status_code = TaxiStatus.IDLE
+            taxi.trip_idx = -1
             taxi.trip_progress = 0.0
             
             # Wait a bit before next trip
-            threading.Timer(random.uniform(1, 5), lambda: self.assign_next_trip(taxi)).start()
+            heapq.heappush(self._idle_wakeups, (time.monotonic() + self._rng.uniform(1, 5), taxi.slot))
     
     def send_location_update(self, taxi: TaxiState) -> None:
         """Send location update to the geofence API."""
-        try:
+        self.send_location_updates([taxi])
+    
+    def send_location_updates(self, taxis: List[TaxiState]) -> None:
+        """
+        Send location updates for several taxis to the geofence API.
+        
+        Taxis are posted to the bulk endpoint in batches of up to
+        BULK_BATCH_SIZE, and each taxi's current zones and zone events are
+        taken from the API's result for it. Payloads are built on the calling
+        thread; when there are several batches they are posted concurrently.
+        """
+        fleet = self.fleet
+        timestamp = datetime.now().isoformat()
+        
+        bodies = []
+        batch_sizes = []
+        for start in range(0, len(taxis), BULK_BATCH_SIZE):
+            slots = [taxi.slot for taxi in taxis[start:start + BULK_BATCH_SIZE]]
             payload = {
-                "vehicle_id": taxi.taxi_id,
-                "latitude": taxi.current_lat,
-                "longitude": taxi.current_lng,
-                "timestamp": datetime.now().isoformat(),
-                "metadata": {
-                    "status": taxi.status,
-                    "speed_kmh": taxi.speed_kmh,
-                    "trip_progress": taxi.trip_progress
-                }
+                "events": [
+                    {
+                        "vehicle_id": fleet.taxi_ids[slot],
+                        "latitude": lat,
+                        "longitude": lng,
+                        "timestamp": timestamp,
+                        "metadata": {
+                            "status": STATUS_NAMES[status_code],
+                            "speed_kmh": speed_kmh,
+                            "trip_progress": trip_progress
+                        }
+                    }
+                    for slot, lat, lng, status_code, speed_kmh, trip_progress in zip(
+                        slots,
+                        fleet.lat[slots].tolist(),
+                        fleet.lng[slots].tolist(),
+                        fleet.status_code[slots].tolist(),
+                        fleet.speed[slots].tolist(),
+                        fleet.trip_progress[slots].tolist()
+                    )
+                ]
             }
-            
-            response = requests.post(
-                f"{self.api_base_url}/events/location/",
-                json=payload,
+            bodies.append(orjson.dumps(payload))
+            batch_sizes.append(len(slots))
+        
+        if len(bodies) == 1:
+            self._post_batch(bodies[0], batch_sizes[0])
+        else:
+            list(self._sender_pool.map(self._post_batch, bodies, batch_sizes))
+    
+    def _post_batch(self, body: bytes, batch_size: int) -> None:
+        """Post one bulk location payload and apply the zones and zone events it reports."""
+        try:
+            response = self._session.post(
+                f"{self.api_base_url}/events/location/bulk/",
+                data=body,
                 timeout=5
             )
             
-            if response.status_code == 200:
-                result = response.json()
-                
-                # Update taxi's current zones
-                taxi.current_zones = result.get('current_zones', [])
-                
-                # Log zone changes
-                if result.get('zone_events'):
-                    for event in result['zone_events']:
-                        logger.info(f"{taxi.taxi_id} {event['type']}: {event['zone_name']}")
-                        
+            if response.ok:
+                for result in orjson.loads(response.content).get('events', []):
+                    taxi = self.taxis.get(result['vehicle_id'])
+                    if taxi is not None:
+                        self._update_zones(taxi, result)
             else:
-                logger.warning(f"API error for {taxi.taxi_id}: {response.status_code}")
+                logger.warning(f"Bulk API error for {batch_size} taxis: {response.status_code}")
                 
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Failed to send location for {taxi.taxi_id}: {e}")
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
+            logger.error(f"Failed to send locations for {batch_size} taxis: {e}")
+    
+    def _update_zones(self, taxi: TaxiState, result: Dict) -> None:
+        """Update a taxi's current zones from its bulk API result and log its zone events."""
+        taxi.current_zones = [zone['name'] for zone in result.get('current_zones', [])]
+        
+        # Transitions are detected by the API against the vehicle's stored zones
+        for event in result.get('zone_events', []):
+            logger.info(f"{taxi.taxi_id} {event['event_type']}: {event['zone_id']}")
     
     def update_simulation(self) -> None:
         """Update all taxis in the simulation."""
-        for taxi in self.taxis.values():
-            if taxi.status == 'idle':
-                # Assign new trip if idle
-                self.assign_next_trip(taxi)
-            elif taxi.status in ['pickup', 'dropoff']:
-                # Move towards destination
-                self.move_taxi_towards_destination(taxi)
-                
-            # Send location update to API
-            self.send_location_update(taxi)
+        fleet = self.fleet
+        moving_slots = np.flatnonzero(fleet.status_code != TaxiStatus.IDLE)
+        
+        # Assign new trips to idle taxis whose pause is over
+        now = time.monotonic()
+        while self._idle_wakeups and self._idle_wakeups[0][0] <= now:
+            _, slot = heapq.heappop(self._idle_wakeups)
+            self.assign_next_trip(self.taxis[fleet.taxi_ids[slot]])
+        
+        # Move every travelling taxi towards its destination at once; idle
+        # taxis are left out of the distance computation entirely
+        if moving_slots.size:
+            self._move_all(moving_slots)
+        
+        for transition in self.preview_zone_transitions():
+            logger.debug(f"{transition['vehicle_id']} {transition['event_type']} "
+                         f"(local preview): {transition['zone_id']}")
+        
+        # Report every taxi that moved this tick; idle taxis are throttled
+        report = now - fleet.last_report_ts >= IDLE_REPORT_INTERVAL
+        report[moving_slots] = True
+        report_slots = np.flatnonzero(report)
+        if report_slots.size:
+            fleet.last_report_ts[report_slots] = now
+            self.send_location_updates([self.taxis[fleet.taxi_ids[slot]] for slot in report_slots.tolist()])
     
     def get_simulation_status(self) -> Dict:
         """Get current simulation status."""
@@ -307,12 +791,18 @@ class NYCTaxiSimulator:
             'taxis': {}
         }
         
-        for taxi_id, taxi in self.taxis.items():
+        fleet = self.fleet
+        if fleet is None:
+            return status
+        
+        for taxi_id, status_code, lat, lng, current_zones, speed_kmh in zip(
+                fleet.taxi_ids, fleet.status_code.tolist(), fleet.lat.tolist(),
+                fleet.lng.tolist(), fleet.current_zones, fleet.speed.tolist()):
             status['taxis'][taxi_id] = {
-                'status': taxi.status,
-                'location': [taxi.current_lat, taxi.current_lng],
-                'current_zones': taxi.current_zones,
-                'speed_kmh': taxi.speed_kmh
+                'status': STATUS_NAMES[status_code],
+                'location': [lat, lng],
+                'current_zones': current_zones,
+                'speed_kmh': speed_kmh
             }
         
         return status
@@ -357,6 +847,19 @@ def initialize_simulator(csv_file_path: str) -> NYCTaxiSimulator:
     taxi_simulator.load_trip_data(max_records=1000)
     taxi_simulator.initialize_taxis(num_taxis=20)
     
+    # Zone previews are optional; the simulation runs without them if the API is unreachable
+    try:
+        taxi_simulator.load_zone_centers()
+    except (requests.exceptions.RequestException, orjson.JSONDecodeError, KeyError) as e:
+        logger.warning(f"Could not load zones, local zone previews disabled: {e}")
+    
+    # Compile (or load cached) Numba kernels before the first tick
+    taxi_simulator.calculate_distance(40.7589, -73.9851, 40.7484, -73.9857)
+    taxi_simulator._haversine_vec(
+        np.zeros(1), np.zeros(1), np.zeros(1), np.zeros(1)
+    )
+    taxi_simulator._move_all(np.zeros(0, dtype=np.intp))
+    
     return taxi_simulator
 
 if __name__ == "__main__":
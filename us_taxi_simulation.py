@@ -5,13 +5,15 @@ with ArcGIS-based geofencing and real-time tracking.
 """
 
 import json
+import queue
 import time
-import random
 import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Optional, Tuple
-from dataclasses import dataclass, asdict
+from typing import List, Dict, Optional, Set, Tuple
+from dataclasses import dataclass, field, fields, asdict
 import math
+import numpy as np
 import requests
 import logging
 from arcgis_geofence_service import arcgis_geofence_service
@@ -29,7 +31,95 @@ except ImportError:
     COSMOS_AVAILABLE = False
     logger.warning("Cosmos DB service not available for trace events")
 
+# Numba is optional: it compiles the bulk distance kernel when installed
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    logger.info("Numba not available, using NumPy distance calculations")
+
+EARTH_RADIUS_KM = 6371.0
+
+# Per-taxi coordinates are stored in single precision: better than a metre
+# across the US, with half the memory traffic of float64
+COORDINATE_DTYPE = np.float32
+
+# Point pairs closer than this (|dlat| + |dlng|, degrees) use the
+# equirectangular approximation instead of the full Haversine formula
+EQUIRECTANGULAR_MAX_DEGREES = 5.0
+
+# Exact zone lookups are cached per grid cell of 1/ZONE_CELLS_PER_DEGREE
+# degrees (about 1 km), so a taxi dwelling in a cell isn't reclassified every
+# tick; only a taxi within half a cell of a state border can be misattributed
+ZONE_CELLS_PER_DEGREE = 100
+ZONE_CACHE_SIZE = 4096
+
+# How search_taxis_by_zone matches the query against zone names
+ZONE_MATCH_MODES = ('exact', 'prefix', 'substring')
+
+# Trace events are queued and written to Cosmos DB in bulk by a background
+# thread: up to TRACE_BATCH_SIZE events, or whatever arrived within
+# TRACE_FLUSH_INTERVAL seconds. The oldest events are dropped once
+# TRACE_QUEUE_SIZE are waiting.
+TRACE_QUEUE_SIZE = 10000
+TRACE_BATCH_SIZE = 100
+TRACE_FLUSH_INTERVAL = 1.0
+
+# Seconds between simulation ticks
+TICK_INTERVAL = 2.0
+
+# Taxi speeds are drawn uniformly from this range (10x real speeds for a
+# faster simulation), SPEED_POOL_SIZE draws at a time
+MIN_SPEED_KMH = 600
+MAX_SPEED_KMH = 1200
+SPEED_POOL_SIZE = 4096
+
+
+def _haversine_vec_numpy(lat1, lng1, cos_lat1, lat2, lng2, cos_lat2):
+    """
+    Haversine distance in km between two arrays of points.
+    
+    Coordinates are in radians and the latitude cosines are passed in, so
+    callers can precompute them for points that don't move.
+    """
+    a = (np.sin((lat2 - lat1) / 2) ** 2 +
+         cos_lat1 * cos_lat2 * np.sin((lng2 - lng1) / 2) ** 2)
+    # asin(sqrt(a)) == atan2(sqrt(a), sqrt(1 - a)); the clip guards rounding past 1
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(np.sqrt(a), 1.0))
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _haversine_vec(lat1, lng1, cos_lat1, lat2, lng2, cos_lat2):
+        """Compiled _haversine_vec_numpy, one pass over all points."""
+        distances = np.empty(lat1.shape[0])
+        for i in prange(lat1.shape[0]):
+            a = (math.sin((lat2[i] - lat1[i]) / 2) ** 2 +
+                 cos_lat1[i] * cos_lat2[i] * math.sin((lng2[i] - lng1[i]) / 2) ** 2)
+            distances[i] = 2 * EARTH_RADIUS_KM * math.asin(min(math.sqrt(a), 1.0))
+        return distances
+else:
+    _haversine_vec = _haversine_vec_numpy
+
 
+def _with_slots(cls):
+    """
+    Rebuild a dataclass with __slots__ for its fields.
+    
+    Equivalent to dataclass(slots=True), which needs Python 3.10. Field
+    defaults live on the generated __init__, so the class attributes holding
+    them can be dropped in favour of slot descriptors.
+    """
+    namespace = dict(cls.__dict__)
+    field_names = tuple(f.name for f in fields(cls))
+    for name in field_names + ('__dict__', '__weakref__'):
+        namespace.pop(name, None)
+    namespace['__slots__'] = field_names
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+@_with_slots
 @dataclass
 class RoutePoint:
     """Represents a pickup or dropoff point."""
@@ -40,41 +130,151 @@ class RoutePoint:
     distance_km: float = 0.0
 
 
+@_with_slots
 @dataclass
 class TaxiRoute:
     """Represents a complete taxi route with pickup and dropoff."""
     pickup: RoutePoint
     dropoff: RoutePoint
     distance_km: float
+    cos_mean_lat: float = field(init=False, repr=False)
+    delta_lat: float = field(init=False, repr=False)
+    delta_lng: float = field(init=False, repr=False)
+    progress_per_kmh_second: float = field(init=False, repr=False)
+    status_template: Dict = field(init=False, repr=False)
+    
+    def __post_init__(self):
+        # Scale for longitude differences in the equirectangular approximation
+        self.cos_mean_lat = math.cos(math.radians((self.pickup.latitude + self.dropoff.latitude) / 2))
+        # Pickup-to-dropoff offset for interpolating positions
+        self.delta_lat = self.dropoff.latitude - self.pickup.latitude
+        self.delta_lng = self.dropoff.longitude - self.pickup.longitude
+        # Route progress per second at 1 km/h
+        self.progress_per_kmh_second = 1.0 / (self.distance_km * 3600) if self.distance_km > 0 else 0.0
+        # Route-invariant parts of a taxi status, shared by every status for this route
+        self.status_template = {
+            'destination': {
+                'latitude': self.dropoff.latitude,
+                'longitude': self.dropoff.longitude
+            },
+            'current_route': {
+                'pickup': {
+                    'state': self.pickup.state_name,
+                    'coordinates': [self.pickup.latitude, self.pickup.longitude]
+                },
+                'dropoff': {
+                    'state': self.dropoff.state_name,
+                    'coordinates': [self.dropoff.latitude, self.dropoff.longitude]
+                },
+                'distance_km': self.distance_km
+            }
+        }
+
+
+def _column_property(column: str, doc: str) -> property:
+    """Expose one taxi's entry of a simulation column as a read-only attribute."""
+    def fget(self):
+        value = getattr(self.simulation, column)[self.slot]
+        return value.item() if isinstance(value, np.generic) else value
+    
+    return property(fget, doc=doc)
+
+
+# LRU of zone grid cell -> zone name, most recently used last
+_zone_cell_cache: 'OrderedDict[Tuple[int, int], Optional[str]]' = OrderedDict()
+
+
+def zone_cells(longitudes: np.ndarray, latitudes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Zone grid cell indices (longitude, latitude) of each point."""
+    return (np.rint(np.asarray(longitudes) * ZONE_CELLS_PER_DEGREE).astype(np.int64),
+            np.rint(np.asarray(latitudes) * ZONE_CELLS_PER_DEGREE).astype(np.int64))
+
+
+def classify_points_cached(longitudes: np.ndarray, latitudes: np.ndarray) -> np.ndarray:
+    """Classify many points by the grid cell each falls in (see classify_cells_cached)."""
+    return classify_cells_cached(*zone_cells(longitudes, latitudes))
+
+
+def classify_cells_cached(lng_cells: np.ndarray, lat_cells: np.ndarray) -> np.ndarray:
+    """
+    Classify zone grid cells.
+    
+    Cells seen before are answered from the cache; the remaining cells are
+    classified at their centers in one classify_points call, which matches
+    them against the state boundaries when ArcGIS is available.
+    
+    Args:
+        lng_cells: Array of cell longitude indices, as from zone_cells
+        lat_cells: Array of cell latitude indices, as from zone_cells
+    
+    Returns:
+        Object array of zone names (None outside every zone)
+    """
+    cells = list(zip(lng_cells.tolist(), lat_cells.tolist()))
+    
+    missing = list(dict.fromkeys(cell for cell in cells if cell not in _zone_cell_cache))
+    if missing:
+        centers = np.array(missing, dtype=np.float64) / ZONE_CELLS_PER_DEGREE
+        zones = arcgis_geofence_service.classify_points(centers[:, 0], centers[:, 1])
+        _zone_cell_cache.update(zip(missing, zones))
+    
+    result = np.empty(len(cells), dtype=object)
+    for index, cell in enumerate(cells):
+        _zone_cell_cache.move_to_end(cell)
+        result[index] = _zone_cell_cache[cell]
+    
+    while len(_zone_cell_cache) > ZONE_CACHE_SIZE:
+        _zone_cell_cache.popitem(last=False)
+    
+    return result
 
 
-@dataclass
 class TaxiState:
-    """Represents the current state of a taxi."""
-    taxi_id: str
-    current_lat: float
-    current_lng: float
-    destination_lat: float
-    destination_lng: float
-    speed_kmh: float
-    status: str  # 'idle', 'pickup', 'enroute', 'dropoff'
-    current_route: Optional[TaxiRoute]
-    route_progress: float  # 0.0 to 1.0
-    last_update: datetime
-    current_zone: Optional[str] = None
-    previous_zone: Optional[str] = None
-    route_index: int = 0
+    """Read-only view of one taxi's slot in the simulation's per-taxi arrays."""
+    
+    __slots__ = ('simulation', 'slot', 'taxi_id')
+    
+    def __init__(self, simulation: 'USTaxiSimulation', slot: int):
+        self.simulation = simulation
+        self.slot = slot
+        self.taxi_id = simulation.taxi_ids[slot]
+    
+    current_lat = _column_property('_lat', "Current latitude")
+    current_lng = _column_property('_lng', "Current longitude")
+    destination_lat = _column_property('_dest_lat', "Dropoff latitude of the current route")
+    destination_lng = _column_property('_dest_lng', "Dropoff longitude of the current route")
+    speed_kmh = _column_property('_speed_kmh', "Speed in km/h")
+    status = _column_property('_status', "'idle', 'pickup', 'enroute' or 'dropoff'")
+    route_progress = _column_property('_progress', "Route progress from 0.0 to 1.0")
+    current_zone = _column_property('_current_zone', "State the taxi is in, if any")
+    previous_zone = _column_property('_previous_zone', "State the taxi was in before")
+    route_index = _column_property('_route_index', "Index of the current route")
+    
+    @property
+    def current_route(self) -> TaxiRoute:
+        """Route being driven."""
+        return self.simulation._route_table[self.simulation._route_row[self.slot]]
+    
+    @property
+    def last_update(self) -> datetime:
+        """Time of the last simulation tick."""
+        return self.simulation._last_update_time()
 
 
 class USTaxiSimulation:
     """Simulates 5 taxis moving through US states with provided routes."""
     
-    def __init__(self, api_base_url: str = "http://localhost:8000"):
+    def __init__(self, api_base_url: str = "http://localhost:8000", seed: Optional[int] = None):
         """Initialize the US taxi simulation."""
         self.api_base_url = api_base_url
+        self._rng = np.random.default_rng(seed)
+        self._speed_pool = np.empty(0)
+        self._speed_pool_index = 0
         self.taxis: Dict[str, TaxiState] = {}
         self.running = False
         self.simulation_thread = None
+        self.trace_writer_thread = None
+        self._trace_queue: 'queue.Queue[Dict]' = queue.Queue(maxsize=TRACE_QUEUE_SIZE)
         
         # Define the 5 taxi routes as provided
         self.taxi_routes = {
@@ -220,207 +420,319 @@ class USTaxiSimulation:
     
     def _initialize_taxis(self):
         """Initialize all taxis with their starting positions."""
-        for taxi_id, routes in self.taxi_routes.items():
-            if routes:
-                first_route = routes[0]
-                taxi = TaxiState(
-                    taxi_id=taxi_id,
-                    current_lat=first_route.pickup.latitude,
-                    current_lng=first_route.pickup.longitude,
-                    destination_lat=first_route.dropoff.latitude,
-                    destination_lng=first_route.dropoff.longitude,
-                    speed_kmh=random.uniform(600, 1200),  # 10x speed: 600-1200 km/h for faster simulation
-                    status='pickup',
-                    current_route=first_route,
-                    route_progress=0.0,
-                    last_update=datetime.now(),
-                    route_index=0
-                )
-                
-                # Classify initial zone
-                taxi.current_zone = arcgis_geofence_service.classify_point_realtime(
-                    taxi.current_lng, taxi.current_lat
-                )
-                
-                self.taxis[taxi_id] = taxi
-                logger.info(f"Initialized {taxi_id} at {first_route.pickup.state_name}")
+        # Slots index every per-taxi array; taxi_ids lists the fleet in slot order
+        self.taxi_ids = [taxi_id for taxi_id, routes in self.taxi_routes.items() if routes]
+        self._slot_by_id: Dict[str, int] = {taxi_id: slot for slot, taxi_id in enumerate(self.taxi_ids)}
+        num_taxis = len(self.taxi_ids)
+        
+        # The route tables never change, so flatten them into one table of
+        # NumPy columns: a taxi's routes are rows _route_start[slot] onwards,
+        # and route changes become gathers from the table
+        self._route_table: List[TaxiRoute] = [
+            route for taxi_id in self.taxi_ids for route in self.taxi_routes[taxi_id]
+        ]
+        self._route_count = np.array([len(self.taxi_routes[taxi_id]) for taxi_id in self.taxi_ids], dtype=np.intp)
+        self._route_start = np.concatenate(([0], np.cumsum(self._route_count)[:-1])).astype(np.intp)
+        self._table_pickup_lat = np.array([route.pickup.latitude for route in self._route_table])
+        self._table_pickup_lng = np.array([route.pickup.longitude for route in self._route_table])
+        self._table_dest_lat = np.array([route.dropoff.latitude for route in self._route_table])
+        self._table_dest_lng = np.array([route.dropoff.longitude for route in self._route_table])
+        self._table_delta_lat = np.array([route.delta_lat for route in self._route_table])
+        self._table_delta_lng = np.array([route.delta_lng for route in self._route_table])
+        self._table_progress_per_kmh_second = np.array([route.progress_per_kmh_second for route in self._route_table])
+        # Dropoffs only change between routes, so keep their radians and cosines
+        self._table_dest_lat_rad = np.radians(self._table_dest_lat)
+        self._table_dest_lng_rad = np.radians(self._table_dest_lng)
+        self._table_dest_cos_lat = np.cos(self._table_dest_lat_rad)
+        
+        # Per-taxi state lives in parallel arrays so a tick is a few vector ops;
+        # _set_routes fills in each taxi's first route below. Coordinates are
+        # single precision, progress stays double so small increments accumulate
+        self._route_index = np.zeros(num_taxis, dtype=np.intp)
+        self._route_row = self._route_start.copy()
+        self._lat = np.zeros(num_taxis, dtype=COORDINATE_DTYPE)
+        self._lng = np.zeros(num_taxis, dtype=COORDINATE_DTYPE)
+        self._pickup_lat = np.zeros(num_taxis, dtype=COORDINATE_DTYPE)
+        self._pickup_lng = np.zeros(num_taxis, dtype=COORDINATE_DTYPE)
+        self._delta_lat = np.zeros(num_taxis, dtype=COORDINATE_DTYPE)
+        self._delta_lng = np.zeros(num_taxis, dtype=COORDINATE_DTYPE)
+        self._dest_lat = np.zeros(num_taxis, dtype=COORDINATE_DTYPE)
+        self._dest_lng = np.zeros(num_taxis, dtype=COORDINATE_DTYPE)
+        self._dest_lat_rad = np.zeros(num_taxis)
+        self._dest_lng_rad = np.zeros(num_taxis)
+        self._dest_cos_lat = np.zeros(num_taxis)
+        self._speed_kmh = np.zeros(num_taxis)
+        self._progress_per_second = np.zeros(num_taxis)
+        self._progress = np.zeros(num_taxis)
+        self._status = ['pickup'] * num_taxis
+        self._set_routes(np.arange(num_taxis))
+        self._previous_zone = np.full(num_taxis, None, dtype=object)
+        self._last_update_ts = time.monotonic()
+        
+        # Classify initial zones
+        self._lng_cell, self._lat_cell = zone_cells(self._lng, self._lat)
+        self._current_zone = classify_cells_cached(self._lng_cell, self._lat_cell)
+        
+        # Lower-cased zone name -> slots of the taxis currently in it
+        self._zone_index: Dict[str, Set[int]] = {}
+        self._zone_index_lock = threading.Lock()
+        for slot, zone in enumerate(self._current_zone.tolist()):
+            self._index_zone_change(slot, None, zone)
+        
+        for slot, taxi_id in enumerate(self.taxi_ids):
+            self.taxis[taxi_id] = TaxiState(self, slot)
+            logger.info(f"Initialized {taxi_id} at {self._route_table[self._route_row[slot]].pickup.state_name}")
     
-    def _calculate_distance(self, lat1: float, lng1: float, lat2: float, lng2: float) -> float:
-        """Calculate distance between two points using Haversine formula."""
-        R = 6371  # Earth's radius in kilometers
+    def _calculate_distance(self, lat1: float, lng1: float, lat2: float, lng2: float,
+                            cos_mean_lat: Optional[float] = None) -> float:
+        """
+        Calculate distance between two points in km.
         
-        lat1_rad = math.radians(lat1)
-        lat2_rad = math.radians(lat2)
+        Nearby points use the equirectangular approximation, which needs one
+        cosine and one square root; others use the Haversine formula.
+        
+        Args:
+            lat1, lng1: First point in degrees
+            lat2, lng2: Second point in degrees
+            cos_mean_lat: Cached cosine of the pair's mean latitude, e.g. a
+                TaxiRoute's cos_mean_lat; computed when not given
+        
+        Returns:
+            Distance in kilometers
+        """
         delta_lat = math.radians(lat2 - lat1)
         delta_lng = math.radians(lng2 - lng1)
         
+        if abs(lat2 - lat1) + abs(lng2 - lng1) < EQUIRECTANGULAR_MAX_DEGREES:
+            if cos_mean_lat is None:
+                cos_mean_lat = math.cos(math.radians((lat1 + lat2) / 2))
+            return EARTH_RADIUS_KM * math.sqrt(delta_lat ** 2 + (cos_mean_lat * delta_lng) ** 2)
+        
+        lat1_rad = math.radians(lat1)
+        lat2_rad = math.radians(lat2)
+        
         a = (math.sin(delta_lat / 2) ** 2 + 
              math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lng / 2) ** 2)
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+        c = 2 * math.asin(min(math.sqrt(a), 1.0))
         
-        return R * c
+        return EARTH_RADIUS_KM * c
+    
+    def _distances_to_dropoff(self) -> np.ndarray:
+        """Haversine distance in km from every taxi to its current dropoff."""
+        # Distances are computed in double precision from the stored coordinates
+        lat_rad = np.radians(self._lat, dtype=np.float64)
+        return _haversine_vec(
+            lat_rad, np.radians(self._lng, dtype=np.float64), np.cos(lat_rad),
+            self._dest_lat_rad, self._dest_lng_rad, self._dest_cos_lat
+        )
     
-    def _interpolate_position(self, start_lat: float, start_lng: float, 
-                            end_lat: float, end_lng: float, progress: float) -> Tuple[float, float]:
-        """Interpolate position between start and end points based on progress."""
-        lat = start_lat + (end_lat - start_lat) * progress
-        lng = start_lng + (end_lng - start_lng) * progress
-        return lat, lng
+    def _tick_all(self, time_delta_seconds: float):
+        """Advance every taxi and check the fleet for zone transitions in one pass."""
+        self._advance_taxis(time_delta_seconds)
+        
+        # Only taxis that crossed into another grid cell can have changed zone
+        lng_cells, lat_cells = zone_cells(self._lng, self._lat)
+        moved = np.flatnonzero((lng_cells != self._lng_cell) | (lat_cells != self._lat_cell))
+        if moved.size:
+            self._lng_cell[moved] = lng_cells[moved]
+            self._lat_cell[moved] = lat_cells[moved]
+            self._check_zone_transitions(moved)
     
-    def _update_taxi_position(self, taxi: TaxiState, time_delta_seconds: float):
-        """Update taxi position based on speed and time."""
-        if not taxi.current_route:
-            return
+    def _advance_taxis(self, time_delta_seconds: float):
+        """Advance every taxi along its route by the elapsed time."""
+        # Progress rates and route offsets are precomputed per route, so this
+        # is one multiply-add per taxi for progress and one per coordinate
+        self._progress += self._progress_per_second * time_delta_seconds
+        np.minimum(self._progress, 1.0, out=self._progress)
         
-        # Calculate how far the taxi should move
-        distance_per_second = taxi.speed_kmh / 3600  # km/s
-        distance_to_move = distance_per_second * time_delta_seconds
-        
-        # Calculate total route distance
-        total_distance = taxi.current_route.distance_km
-        
-        # Update progress
-        progress_increment = distance_to_move / total_distance if total_distance > 0 else 0
-        taxi.route_progress = min(1.0, taxi.route_progress + progress_increment)
-        
-        # Update position based on progress
-        if taxi.status == 'pickup':
-            # Moving from pickup to dropoff
-            start_lat = taxi.current_route.pickup.latitude
-            start_lng = taxi.current_route.pickup.longitude
-            end_lat = taxi.current_route.dropoff.latitude
-            end_lng = taxi.current_route.dropoff.longitude
-        else:
-            # At pickup or dropoff location
-            start_lat = taxi.current_lat
-            start_lng = taxi.current_lng
-            end_lat = taxi.destination_lat
-            end_lng = taxi.destination_lng
-        
-        taxi.current_lat, taxi.current_lng = self._interpolate_position(
-            start_lat, start_lng, end_lat, end_lng, taxi.route_progress
-        )
+        # Interpolate between pickup and dropoff
+        np.multiply(self._delta_lat, self._progress, out=self._lat)
+        self._lat += self._pickup_lat
+        np.multiply(self._delta_lng, self._progress, out=self._lng)
+        self._lng += self._pickup_lng
         
-        # Check if route is completed
-        if taxi.route_progress >= 1.0:
-            self._complete_current_route(taxi)
-    
-    def _complete_current_route(self, taxi: TaxiState):
-        """Complete the current route and move to the next one."""
-        taxi.route_progress = 0.0
-        taxi.route_index += 1
-        
-        # Get routes for this taxi
-        routes = self.taxi_routes.get(taxi.taxi_id, [])
-        
-        if taxi.route_index < len(routes):
-            # Move to next route
-            next_route = routes[taxi.route_index]
-            taxi.current_route = next_route
-            taxi.current_lat = next_route.pickup.latitude
-            taxi.current_lng = next_route.pickup.longitude
-            taxi.destination_lat = next_route.dropoff.latitude
-            taxi.destination_lng = next_route.dropoff.longitude
-            taxi.status = 'pickup'
-            taxi.speed_kmh = random.uniform(600, 1200)  # 10x speed for faster simulation
-            logger.info(f"{taxi.taxi_id} starting route {taxi.route_index + 1}: {next_route.pickup.state_name} -> {next_route.dropoff.state_name}")
-        else:
-            # All routes completed, restart from beginning
-            taxi.route_index = 0
-            first_route = routes[0]
-            taxi.current_route = first_route
-            taxi.current_lat = first_route.pickup.latitude
-            taxi.current_lng = first_route.pickup.longitude
-            taxi.destination_lat = first_route.dropoff.latitude
-            taxi.destination_lng = first_route.dropoff.longitude
-            taxi.status = 'pickup'
-            taxi.speed_kmh = random.uniform(600, 1200)  # 10x speed
-            logger.info(f"{taxi.taxi_id} completed all routes, restarting from {first_route.pickup.state_name}")
-    
-    def _check_zone_transitions(self, taxi: TaxiState):
-        """Check for zone entry/exit events."""
-        # Get current zone
-        current_zone = arcgis_geofence_service.classify_point_realtime(
-            taxi.current_lng, taxi.current_lat
-        )
+        completed = np.flatnonzero(self._progress >= 1.0)
+        if completed.size:
+            self._complete_routes(completed)
+    
+    def _set_routes(self, slots: np.ndarray):
+        """Place taxis at the pickup of their current route row, headed for its dropoff."""
+        rows = self._route_row[slots]
+        self._pickup_lat[slots] = self._lat[slots] = self._table_pickup_lat[rows]
+        self._pickup_lng[slots] = self._lng[slots] = self._table_pickup_lng[rows]
+        self._dest_lat[slots] = self._table_dest_lat[rows]
+        self._dest_lng[slots] = self._table_dest_lng[rows]
+        self._delta_lat[slots] = self._table_delta_lat[rows]
+        self._delta_lng[slots] = self._table_delta_lng[rows]
+        self._dest_lat_rad[slots] = self._table_dest_lat_rad[rows]
+        self._dest_lng_rad[slots] = self._table_dest_lng_rad[rows]
+        self._dest_cos_lat[slots] = self._table_dest_cos_lat[rows]
+        self._progress[slots] = 0.0
+        self._speed_kmh[slots] = self._next_speeds(len(slots))
+        self._progress_per_second[slots] = self._speed_kmh[slots] * self._table_progress_per_kmh_second[rows]
+        for slot in slots.tolist():
+            self._status[slot] = 'pickup'
+    
+    def _next_speeds(self, count: int) -> np.ndarray:
+        """Take the next speeds from the pool, refilling it when drained."""
+        if self._speed_pool_index + count > len(self._speed_pool):
+            self._speed_pool = self._rng.uniform(MIN_SPEED_KMH, MAX_SPEED_KMH, max(count, SPEED_POOL_SIZE))
+            self._speed_pool_index = 0
+        speeds = self._speed_pool[self._speed_pool_index:self._speed_pool_index + count]
+        self._speed_pool_index += count
+        return speeds
+    
+    def _complete_routes(self, slots: np.ndarray):
+        """Complete the current route of each taxi in slots and move to the next one."""
+        route_index = self._route_index[slots] + 1
+        # All routes completed, restart from beginning
+        restarted = route_index >= self._route_count[slots]
+        route_index[restarted] = 0
+        self._route_index[slots] = route_index
+        self._route_row[slots] = self._route_start[slots] + route_index
+        self._set_routes(slots)
         
-        # Check for zone transition
-        if current_zone != taxi.current_zone:
+        for slot, index, restart in zip(slots.tolist(), route_index.tolist(), restarted.tolist()):
+            route = self._route_table[self._route_row[slot]]
+            if restart:
+                logger.info(f"{self.taxi_ids[slot]} completed all routes, restarting from {route.pickup.state_name}")
+            else:
+                logger.info(f"{self.taxi_ids[slot]} starting route {index + 1}: {route.pickup.state_name} -> {route.dropoff.state_name}")
+    
+    def _check_zone_transitions(self, slots: np.ndarray):
+        """Check the taxis in slots for zone entry/exit events."""
+        # Get their current zones in one lookup
+        current_zones = np.empty(len(self.taxi_ids), dtype=object)
+        current_zones[slots] = classify_cells_cached(self._lng_cell[slots], self._lat_cell[slots])
+        changed = slots[current_zones[slots] != self._current_zone[slots]]
+        if not changed.size:
+            return
+        
+        # Events from one tick share a timestamp
+        timestamp = datetime.now(timezone.utc).isoformat()
+        
+        for slot in changed.tolist():
             # Zone transition detected
-            if taxi.current_zone:
-                logger.info(f"🚖 {taxi.taxi_id} EXITED {taxi.current_zone}")
-                self._send_zone_event(taxi, 'zone_exit', taxi.current_zone)
+            taxi_id = self.taxi_ids[slot]
+            previous_zone = self._current_zone[slot]
+            current_zone = current_zones[slot]
+            
+            if previous_zone:
+                logger.info(f"🚖 {taxi_id} EXITED {previous_zone}")
+                self._send_zone_event(slot, 'zone_exit', previous_zone)
                 # Store trace event in Cosmos DB
-                self._store_trace_event(taxi, 'exit', taxi.current_zone)
+                self._store_trace_event(slot, 'exit', previous_zone, timestamp)
             
             if current_zone:
-                logger.info(f"🚖 {taxi.taxi_id} ENTERED {current_zone}")
-                self._send_zone_event(taxi, 'zone_entry', current_zone)
+                logger.info(f"🚖 {taxi_id} ENTERED {current_zone}")
+                self._send_zone_event(slot, 'zone_entry', current_zone)
                 # Store trace event in Cosmos DB
-                self._store_trace_event(taxi, 'entry', current_zone)
-            
-            taxi.previous_zone = taxi.current_zone
-            taxi.current_zone = current_zone
+                self._store_trace_event(slot, 'entry', current_zone, timestamp)
+        
+            self._index_zone_change(slot, previous_zone, current_zone)
+        
+        self._previous_zone[changed] = self._current_zone[changed]
+        self._current_zone[changed] = current_zones[changed]
     
-    def _store_trace_event(self, taxi: TaxiState, event_type: str, zone_name: str):
-        """Store trace event in Cosmos DB."""
+    def _index_zone_change(self, slot: int, previous_zone: Optional[str], current_zone: Optional[str]):
+        """Move a taxi between zones in the zone index."""
+        with self._zone_index_lock:
+            if previous_zone:
+                taxis = self._zone_index.get(previous_zone.lower())
+                if taxis is not None:
+                    taxis.discard(slot)
+                    if not taxis:
+                        del self._zone_index[previous_zone.lower()]
+            if current_zone:
+                self._zone_index.setdefault(current_zone.lower(), set()).add(slot)
+    
+    def _store_trace_event(self, slot: int, event_type: str, zone_name: str, timestamp: str):
+        """Queue a trace event, stamped with an ISO timestamp, for the background Cosmos DB writer."""
         if not COSMOS_AVAILABLE:
             return
         
-        try:
-            cosmos_service.store_trace_event(
-                vehicle_id=taxi.taxi_id,
-                zone_name=zone_name,
-                event_type=event_type,
-                latitude=taxi.current_lat,
-                longitude=taxi.current_lng,
-                timestamp=datetime.now(timezone.utc).isoformat()
-            )
-            logger.debug(f"Trace event stored: {taxi.taxi_id} {event_type} {zone_name}")
-        except Exception as e:
-            logger.error(f"Error storing trace event in Cosmos DB: {e}")
-    
-    def _send_zone_event(self, taxi: TaxiState, event_type: str, zone_name: str):
+        event = {
+            'vehicle_id': self.taxi_ids[slot],
+            'zone_name': zone_name,
+            'event_type': event_type,
+            'latitude': float(self._lat[slot]),
+            'longitude': float(self._lng[slot]),
+            'timestamp': timestamp
+        }
+        
+        while True:
+            try:
+                self._trace_queue.put_nowait(event)
+                return
+            except queue.Full:
+                # Writer is behind: drop the oldest event to make room
+                try:
+                    self._trace_queue.get_nowait()
+                    logger.warning("Trace event queue full, dropped oldest event")
+                except queue.Empty:
+                    pass
+    
+    def _next_trace_batch(self) -> List[Dict]:
+        """Wait up to TRACE_FLUSH_INTERVAL for a batch of queued trace events."""
+        batch = []
+        deadline = time.monotonic() + TRACE_FLUSH_INTERVAL
+        while len(batch) < TRACE_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._trace_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+    
+    def _trace_writer_loop(self):
+        """Write queued trace events to Cosmos DB in bulk until stopped and drained."""
+        while self.running or not self._trace_queue.empty():
+            batch = self._next_trace_batch()
+            if not batch:
+                continue
+            
+            try:
+                stored = cosmos_service.store_trace_events_bulk(batch)
+                logger.debug(f"Trace events stored: {stored}")
+            except Exception as e:
+                logger.error(f"Error storing {len(batch)} trace events in Cosmos DB: {e}")
+    
+    def _send_zone_event(self, slot: int, event_type: str, zone_name: str):
         """Zone events are stored via _store_trace_event - this is just for logging."""
         # No HTTP call needed - trace events are stored directly in Cosmos DB
-        logger.debug(f"Zone event logged: {taxi.taxi_id} {event_type} {zone_name}")
-    
-    def _send_location_update(self, taxi: TaxiState):
-        """Location updates are tracked in-memory - no HTTP call to avoid deadlock."""
-        # The simulation status endpoint returns current taxi positions from memory
-        # No need to make HTTP calls to ourselves which causes timeouts
-        pass
+        logger.debug(f"Zone event logged: {self.taxi_ids[slot]} {event_type} {zone_name}")
     
     def _simulation_loop(self):
         """Main simulation loop."""
         logger.info("Starting US taxi simulation loop...")
         
+        # Ticks are scheduled against absolute deadlines so the time spent
+        # in a tick doesn't stretch the interval
+        next_tick_ts = time.monotonic()
+        
         while self.running:
             try:
-                current_time = datetime.now()
+                current_ts = time.monotonic()
+                time_delta = current_ts - self._last_update_ts
+                
+                # Move every taxi and check for zone transitions
+                self._tick_all(time_delta)
                 
-                for taxi in self.taxis.values():
-                    # Calculate time delta
-                    time_delta = (current_time - taxi.last_update).total_seconds()
-                    
-                    # Update taxi position
-                    self._update_taxi_position(taxi, time_delta)
-                    
-                    # Check for zone transitions
-                    self._check_zone_transitions(taxi)
-                    
-                    # Send location update
-                    self._send_location_update(taxi)
-                    
-                    # Update last update time
-                    taxi.last_update = current_time
+                # Location updates are served from memory by get_taxi_status,
+                # so there is nothing to send per taxi
+                self._last_update_ts = current_ts
                 
-                # Sleep for simulation interval (2 seconds)
-                time.sleep(2)
+                # Sleep until the next tick is due; a tick that overran its
+                # interval skips the missed deadlines rather than bursting
+                next_tick_ts = max(next_tick_ts + TICK_INTERVAL, time.monotonic())
+                time.sleep(max(0.0, next_tick_ts - time.monotonic()))
                 
             except Exception as e:
                 logger.error(f"Error in simulation loop: {e}")
                 time.sleep(5)  # Wait before retrying
+                next_tick_ts = time.monotonic()
     
     def start_simulation(self):
         """Start the taxi simulation."""
@@ -431,6 +743,9 @@ class USTaxiSimulation:
         self.running = True
         self.simulation_thread = threading.Thread(target=self._simulation_loop, daemon=True)
         self.simulation_thread.start()
+        if COSMOS_AVAILABLE:
+            self.trace_writer_thread = threading.Thread(target=self._trace_writer_loop, daemon=True)
+            self.trace_writer_thread.start()
         logger.info("US Taxi simulation started with 5 taxis")
     
     def stop_simulation(self):
@@ -442,55 +757,80 @@ class USTaxiSimulation:
         self.running = False
         if self.simulation_thread:
             self.simulation_thread.join(timeout=5)
+        if self.trace_writer_thread:
+            # The writer flushes what is still queued before exiting
+            self.trace_writer_thread.join(timeout=5)
         logger.info("US Taxi simulation stopped")
     
-    def get_taxi_status(self, taxi_id: str) -> Optional[Dict]:
-        """Get current status of a specific taxi."""
-        taxi = self.taxis.get(taxi_id)
-        if not taxi:
-            return None
-        
+    def _last_update_time(self) -> datetime:
+        """Wall-clock time of the last simulation tick."""
+        seconds_ago = time.monotonic() - self._last_update_ts
+        return datetime.now() - timedelta(seconds=seconds_ago)
+    
+    def _taxi_status(self, slot: int, last_update: str) -> Dict:
+        """Build the status dict for one taxi, reusing its route's static parts."""
+        template = self._route_table[self._route_row[slot]].status_template
         return {
-            'taxi_id': taxi.taxi_id,
+            'taxi_id': self.taxi_ids[slot],
             'current_position': {
-                'latitude': taxi.current_lat,
-                'longitude': taxi.current_lng
-            },
-            'destination': {
-                'latitude': taxi.destination_lat,
-                'longitude': taxi.destination_lng
+                'latitude': self._lat[slot].item(),
+                'longitude': self._lng[slot].item()
             },
-            'speed_kmh': taxi.speed_kmh,
-            'status': taxi.status,
-            'current_zone': taxi.current_zone,
-            'previous_zone': taxi.previous_zone,
-            'route_progress': taxi.route_progress,
-            'current_route': {
-                'pickup': {
-                    'state': taxi.current_route.pickup.state_name,
-                    'coordinates': [taxi.current_route.pickup.latitude, taxi.current_route.pickup.longitude]
-                },
-                'dropoff': {
-                    'state': taxi.current_route.dropoff.state_name,
-                    'coordinates': [taxi.current_route.dropoff.latitude, taxi.current_route.dropoff.longitude]
-                },
-                'distance_km': taxi.current_route.distance_km
-            } if taxi.current_route else None,
-            'route_index': taxi.route_index,
-            'last_update': taxi.last_update.isoformat()
+            'destination': template['destination'],
+            'speed_kmh': self._speed_kmh[slot].item(),
+            'status': self._status[slot],
+            'current_zone': self._current_zone[slot],
+            'previous_zone': self._previous_zone[slot],
+            'route_progress': self._progress[slot].item(),
+            'current_route': template['current_route'],
+            'route_index': self._route_index[slot].item(),
+            'last_update': last_update
         }
     
+    def get_taxi_status(self, taxi_id: str) -> Optional[Dict]:
+        """Get current status of a specific taxi."""
+        slot = self._slot_by_id.get(taxi_id)
+        if slot is None:
+            return None
+        
+        return self._taxi_status(slot, self._last_update_time().isoformat())
+    
     def get_all_taxis_status(self) -> Dict[str, Dict]:
         """Get status of all taxis."""
-        return {taxi_id: self.get_taxi_status(taxi_id) for taxi_id in self.taxis.keys()}
+        last_update = self._last_update_time().isoformat()
+        return {
+            taxi_id: self._taxi_status(slot, last_update)
+            for slot, taxi_id in enumerate(self.taxi_ids)
+        }
     
-    def search_taxis_by_zone(self, zone_name: str) -> List[Dict]:
-        """Search for taxis currently in a specific zone."""
-        taxis_in_zone = []
-        for taxi in self.taxis.values():
-            if taxi.current_zone and zone_name.lower() in taxi.current_zone.lower():
-                taxis_in_zone.append(self.get_taxi_status(taxi.taxi_id))
-        return taxis_in_zone
+    def search_taxis_by_zone(self, zone_name: str, match: str = 'substring') -> List[Dict]:
+        """
+        Search for taxis currently in a specific zone.
+        
+        Args:
+            zone_name: Zone name to look for, case-insensitive
+            match: 'exact' for an index lookup, or 'prefix' / 'substring' to
+                match the start of / anywhere in zone names
+            
+        Returns:
+            Status dicts of the matching taxis, in fleet order
+        """
+        if match not in ZONE_MATCH_MODES:
+            raise ValueError(f"match must be one of {', '.join(ZONE_MATCH_MODES)}")
+        
+        query = zone_name.lower()
+        with self._zone_index_lock:
+            if match == 'exact':
+                slots = set(self._zone_index.get(query, ()))
+            elif match == 'prefix':
+                slots = {slot for zone, taxis in self._zone_index.items()
+                         if zone.startswith(query) for slot in taxis}
+            else:
+                slots = {slot for zone, taxis in self._zone_index.items()
+                         if query in zone for slot in taxis}
+        
+        last_update = self._last_update_time().isoformat()
+        return [self._taxi_status(slot, last_update) for slot in sorted(slots)]
 
 
 # Global simulation instance
@@ -511,8 +851,9 @@ if __name__ == "__main__":
             # Print status every 10 seconds
             if i % 5 == 0:
                 print(f"\n--- Simulation Status (t={i*2}s) ---")
+                remaining_km = dict(zip(simulation.taxi_ids, simulation._distances_to_dropoff().tolist()))
                 for taxi_id, status in simulation.get_all_taxis_status().items():
-                    print(f"{taxi_id}: {status['current_zone']} -> {status['current_route']['dropoff']['state'] if status['current_route'] else 'N/A'} ({status['route_progress']:.1%})")
+                    print(f"{taxi_id}: {status['current_zone']} -> {status['current_route']['dropoff']['state'] if status['current_route'] else 'N/A'} ({status['route_progress']:.1%}, {remaining_km[taxi_id]:.0f} km left)")
     
     except KeyboardInterrupt:
         print("\nStopping simulation...")
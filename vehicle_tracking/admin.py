@@ -3,11 +3,26 @@ Django admin configuration for vehicle tracking.
 Provides admin interface for vehicle management and monitoring.
 """
 
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.http import Http404
+from django.shortcuts import render
 from django.utils.html import format_html
-from django.urls import reverse
+from django.urls import path, reverse
 from django.utils.safestring import mark_safe
+import heapq
 import json
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from django.conf import settings
+from django.core.cache import cache
+from datetime import datetime, timezone, timedelta
+
+from geofence_app.cosmos_service import cosmos_service
+from arcgis_geofence_service import arcgis_geofence_service
+
+# Runs Cosmos queries for vehicle_detail_view concurrently with the request thread
+_detail_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='vehicle-detail')
 
 # Since we're using Cosmos DB for data storage, we'll create custom admin views
 # that interface with our services rather than traditional Django models
@@ -21,7 +36,6 @@ class VehicleTrackingAdmin:
     
     def get_urls(self):
         """Define custom admin URLs."""
-        from django.urls import path
         return [
             path('vehicles/', self.vehicle_list_view, name='vehicle_list'),
             path('vehicles/<str:vehicle_id>/', self.vehicle_detail_view, name='vehicle_detail'),
@@ -30,37 +44,42 @@ class VehicleTrackingAdmin:
     
     def vehicle_list_view(self, request):
         """Display list of active vehicles."""
-        from django.shortcuts import render
-        from geofence_app.cosmos_service import cosmos_service
-        
         try:
-            # Get recent events to find active vehicles
-            recent_events = cosmos_service.get_recent_events(limit=1000, event_type='location_update')
-            
-            # Group by vehicle
-            vehicles = {}
-            for event in recent_events:
-                vehicle_id = event['vehicle_id']
-                if vehicle_id not in vehicles:
-                    vehicles[vehicle_id] = {
-                        'vehicle_id': vehicle_id,
-                        'last_update': event['timestamp'],
-                        'latitude': event.get('latitude'),
-                        'longitude': event.get('longitude'),
-                        'event_count': 0
-                    }
-                vehicles[vehicle_id]['event_count'] += 1
+            context = cache.get('vehicle_list_view')
+            if context is not None:
+                return render(request, 'admin/vehicle_tracking/vehicle_list.html', context)
+            
+            # Stream recent events page by page and group by vehicle; events
+            # are most recent first, so the first event seen for a vehicle is
+            # its latest
+            event_counts = Counter()
+            latest_events = {}
+            for page in cosmos_service.iter_recent_event_pages(limit=1000, event_type='location_update'):
+                event_counts.update(map(itemgetter('vehicle_id'), page))
+                for event in page:
+                    latest_events.setdefault(event['vehicle_id'], event)
+            
+            vehicles = {
+                vehicle_id: {
+                    'vehicle_id': vehicle_id,
+                    'last_update': event['timestamp'],
+                    'latitude': event.get('latitude'),
+                    'longitude': event.get('longitude'),
+                    'event_count': event_counts[vehicle_id]
+                }
+                for vehicle_id, event in latest_events.items()
+            }
             
             context = {
                 'title': 'Vehicle Tracking',
                 'vehicles': list(vehicles.values()),
                 'total_vehicles': len(vehicles)
             }
+            cache.set('vehicle_list_view', context, settings.VEHICLE_VIEW_CACHE_TIMEOUT)
             
             return render(request, 'admin/vehicle_tracking/vehicle_list.html', context)
             
         except Exception as e:
-            from django.contrib import messages
             messages.error(request, f'Error loading vehicles: {str(e)}')
             return render(request, 'admin/vehicle_tracking/vehicle_list.html', {
                 'title': 'Vehicle Tracking',
@@ -70,32 +89,28 @@ class VehicleTrackingAdmin:
     
     def vehicle_detail_view(self, request, vehicle_id):
         """Display detailed view of a specific vehicle."""
-        from django.shortcuts import render
-        from geofence_app.cosmos_service import cosmos_service
-        from geofence_app.h3_geofence_service import h3_geofence_service
-        
         try:
-            # Get vehicle status
+            # Fetch vehicle events in the background while the status is read;
+            # the two Cosmos queries are independent
+            events_future = _detail_pool.submit(cosmos_service.get_vehicle_events, vehicle_id, limit=50)
             status = cosmos_service.get_vehicle_current_status(vehicle_id)
             
             if not status:
-                from django.http import Http404
+                events_future.cancel()
                 raise Http404(f"Vehicle {vehicle_id} not found")
             
-            # Get vehicle events
-            events = cosmos_service.get_vehicle_events(vehicle_id, limit=50)
+            events = events_future.result()
             
             # Get zone details
-            zone_details = []
-            if status.get('current_zones'):
-                for zone_id in status['current_zones']:
-                    zone = h3_geofence_service.get_zone_by_id(zone_id)
-                    if zone:
-                        zone_details.append({
-                            'id': zone.id,
-                            'name': zone.name,
-                            'description': zone.description
-                        })
+            zones = arcgis_geofence_service.get_zones_by_ids(status.get('current_zones') or [])
+            zone_details = [
+                {
+                    'id': zone.id,
+                    'name': zone.name,
+                    'description': zone.description
+                }
+                for zone in zones.values()
+            ]
             
             context = {
                 'title': f'Vehicle {vehicle_id}',
@@ -109,79 +124,63 @@ class VehicleTrackingAdmin:
             return render(request, 'admin/vehicle_tracking/vehicle_detail.html', context)
             
         except Exception as e:
-            from django.contrib import messages
             messages.error(request, f'Error loading vehicle details: {str(e)}')
             return self.vehicle_list_view(request)
     
     def analytics_view(self, request):
         """Display vehicle analytics dashboard."""
-        from django.shortcuts import render
-        from geofence_app.cosmos_service import cosmos_service
-        
         try:
-            # Get recent events for analysis
-            recent_events = cosmos_service.get_recent_events(limit=5000)
-            
-            # Analyze data
-            vehicle_stats = {}
-            zone_stats = {}
-            hourly_stats = {}
-            
-            for event in recent_events:
-                vehicle_id = event['vehicle_id']
-                event_type = event['event_type']
-                
-                # Vehicle statistics
-                if vehicle_id not in vehicle_stats:
-                    vehicle_stats[vehicle_id] = {
-                        'total_events': 0,
-                        'location_updates': 0,
-                        'zone_events': 0
-                    }
-                
-                vehicle_stats[vehicle_id]['total_events'] += 1
-                
-                if event_type == 'location_update':
-                    vehicle_stats[vehicle_id]['location_updates'] += 1
-                elif event_type in ['zone_entry', 'zone_exit']:
-                    vehicle_stats[vehicle_id]['zone_events'] += 1
-                    
-                    # Zone statistics
-                    zone_id = event.get('zone_id')
-                    if zone_id:
-                        if zone_id not in zone_stats:
-                            zone_stats[zone_id] = {'entries': 0, 'exits': 0}
-                        
-                        if event_type == 'zone_entry':
-                            zone_stats[zone_id]['entries'] += 1
-                        else:
-                            zone_stats[zone_id]['exits'] += 1
-                
-                # Hourly statistics
-                try:
-                    from datetime import datetime
-                    timestamp = datetime.fromisoformat(event['timestamp'].replace('Z', '+00:00'))
-                    hour = timestamp.hour
-                    
-                    if hour not in hourly_stats:
-                        hourly_stats[hour] = 0
-                    hourly_stats[hour] += 1
-                except:
-                    pass
+            hours = int(request.GET.get('hours', 24))
+            
+            cache_key = f"vehicle_analytics_{hours}"
+            context = cache.get(cache_key)
+            if context is not None:
+                return render(request, 'admin/vehicle_tracking/analytics.html', context)
+            
+            since = datetime.now(timezone.utc) - timedelta(hours=hours)
+            
+            # Aggregate in a single projected query; only event types and
+            # group keys are transferred
+            aggregates = cosmos_service.aggregate_events(('vehicle_id', 'zone_id', 'hour'), since)
+            events_by_vehicle = aggregates['vehicle_id']
+            events_by_zone = aggregates['zone_id']
+            events_by_hour = aggregates['hour']
+            
+            vehicle_stats = {
+                vehicle_id: {
+                    'total_events': sum(counts.values()),
+                    'location_updates': counts.get('location_update', 0),
+                    'zone_events': counts.get('zone_entry', 0) + counts.get('zone_exit', 0)
+                }
+                for vehicle_id, counts in events_by_vehicle.items()
+            }
+            zone_stats = {
+                zone_id: {
+                    'entries': counts.get('zone_entry', 0),
+                    'exits': counts.get('zone_exit', 0)
+                }
+                for zone_id, counts in events_by_zone.items()
+                if 'zone_entry' in counts or 'zone_exit' in counts
+            }
+            hourly_stats = {
+                hour: sum(counts.values()) for hour, counts in events_by_hour.items()
+            }
             
             context = {
                 'title': 'Vehicle Analytics',
-                'vehicle_stats': dict(list(vehicle_stats.items())[:20]),  # Top 20 vehicles
+                'vehicle_stats': dict(heapq.nlargest(
+                    20, vehicle_stats.items(), key=lambda item: item[1]['total_events']
+                )),  # Top 20 vehicles
                 'zone_stats': zone_stats,
                 'hourly_stats': dict(sorted(hourly_stats.items())),
                 'total_vehicles': len(vehicle_stats),
-                'total_events': len(recent_events)
+                'total_events': sum(hourly_stats.values())
             }
+            cache.set(cache_key, context, settings.VEHICLE_VIEW_CACHE_TIMEOUT)
             
             return render(request, 'admin/vehicle_tracking/analytics.html', context)
             
         except Exception as e:
-            from django.contrib import messages
             messages.error(request, f'Error loading analytics: {str(e)}')
             return render(request, 'admin/vehicle_tracking/analytics.html', {
                 'title': 'Vehicle Analytics',
@@ -5,3 +5,8 @@ class VehicleTrackingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'vehicle_tracking'
     verbose_name = 'Vehicle Tracking'
+
+    def ready(self):
+        # Build the geofence service, and with it the in-memory zone catalogue
+        # behind get_zone_by_id, at startup rather than on the first request
+        from arcgis_geofence_service import arcgis_geofence_service  # noqa: F401
@@ -4,17 +4,35 @@ Handles vehicle-centric operations and analytics.
 """
 
 import logging
+from collections import Counter, defaultdict
 from datetime import datetime, timezone, timedelta
-from django.http import JsonResponse
+from functools import lru_cache
+from operator import itemgetter
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.views.decorators.gzip import gzip_page
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
 from geofence_app.cosmos_service import cosmos_service
+from geofence_app.json_utils import json_response
+from geofence_app.time_utils import parse_iso_timestamp
 from arcgis_geofence_service import arcgis_geofence_service
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=256)
+def _state_zones(state_name):
+    """Return the current_zones payload for a classified state; shared between vehicles."""
+    if not state_name:
+        return []
+    return [{'id': state_name.lower().replace(' ', '_'), 'name': state_name}]
+
+
+@gzip_page
 @api_view(['GET'])
 def get_vehicle_history(request, vehicle_id):
     """
@@ -28,37 +46,33 @@ def get_vehicle_history(request, vehicle_id):
         if limit > 500:
             limit = 500
         
-        # Get vehicle events
-        events = cosmos_service.get_vehicle_events(vehicle_id, limit=limit)
-        
-        # Filter by time if specified
+        # Get vehicle events, filtered by time server-side if specified. The
+        # cutoff is truncated to the minute so repeat requests share a cache entry.
+        cutoff_time = None
         if hours > 0:
-            cutoff_time = datetime.now(timezone.utc) - timedelta(hours=hours)
-            events = [
-                event for event in events 
-                if datetime.fromisoformat(event['timestamp'].replace('Z', '+00:00')) >= cutoff_time
-            ]
+            cutoff_time = (datetime.now(timezone.utc) - timedelta(hours=hours)).replace(second=0, microsecond=0)
         
-        # Separate location and zone events
-        location_events = [e for e in events if e['event_type'] == 'location_update']
-        zone_events = [e for e in events if e['event_type'] in ['zone_entry', 'zone_exit']]
+        events = cosmos_service.get_vehicle_events(vehicle_id, limit=limit, since=cutoff_time)
         
-        return JsonResponse({
+        # Count location and zone events
+        type_counts = Counter(map(itemgetter('event_type'), events))
+        
+        return json_response({
             'vehicle_id': vehicle_id,
             'total_events': len(events),
-            'location_events': len(location_events),
-            'zone_events': len(zone_events),
+            'location_events': type_counts['location_update'],
+            'zone_events': type_counts['zone_entry'] + type_counts['zone_exit'],
             'time_range_hours': hours,
             'events': events
         })
         
     except ValueError:
-        return JsonResponse({
+        return json_response({
             'error': 'Invalid query parameters'
         }, status=400)
     except Exception as e:
         logger.error(f"Error getting vehicle history: {e}")
-        return JsonResponse({
+        return json_response({
             'error': 'Internal server error'
         }, status=500)
 
@@ -73,47 +87,47 @@ def get_vehicle_analytics(request, vehicle_id):
         events = cosmos_service.get_vehicle_events(vehicle_id, limit=1000)
         
         if not events:
-            return JsonResponse({
+            return json_response({
                 'error': 'No data available for this vehicle'
             }, status=404)
         
-        # Analyze events
-        location_events = [e for e in events if e['event_type'] == 'location_update']
-        zone_events = [e for e in events if e['event_type'] in ['zone_entry', 'zone_exit']]
+        # Analyze events, bucketed by event type in a single pass
+        events_by_type = defaultdict(list)
+        for event in events:
+            events_by_type[event['event_type']].append(event)
+        
+        location_events = events_by_type['location_update']
+        zone_events = events_by_type['zone_entry'] + events_by_type['zone_exit']
         
         # Calculate zone visit statistics
-        zone_visits = {}
-        for event in zone_events:
-            zone_id = event.get('zone_id')
-            if zone_id:
-                if zone_id not in zone_visits:
-                    zone_visits[zone_id] = {'entries': 0, 'exits': 0}
-                
-                if event['event_type'] == 'zone_entry':
-                    zone_visits[zone_id]['entries'] += 1
-                elif event['event_type'] == 'zone_exit':
-                    zone_visits[zone_id]['exits'] += 1
+        visit_counts = Counter(
+            (event['zone_id'], event['event_type']) for event in zone_events if event.get('zone_id')
+        )
+        zone_visits = {
+            zone_id: {
+                'entries': visit_counts[(zone_id, 'zone_entry')],
+                'exits': visit_counts[(zone_id, 'zone_exit')]
+            }
+            for zone_id, _ in visit_counts
+        }
         
         # Get zone details
-        zone_details = {}
-        for zone_id in zone_visits.keys():
-            zone = arcgis_geofence_service.get_zone_by_id(zone_id)
-            if zone:
-                zone_details[zone_id] = {
-                    'name': zone.name,
-                    'description': zone.description
-                }
-        
-        # Calculate time ranges
-        if events:
-            first_event = min(events, key=lambda x: x['timestamp'])
-            last_event = max(events, key=lambda x: x['timestamp'])
-            
-            first_time = datetime.fromisoformat(first_event['timestamp'].replace('Z', '+00:00'))
-            last_time = datetime.fromisoformat(last_event['timestamp'].replace('Z', '+00:00'))
-            duration_hours = (last_time - first_time).total_seconds() / 3600
-        else:
-            duration_hours = 0
+        zones = arcgis_geofence_service.get_zones_by_ids(list(zone_visits))
+        zone_details = {
+            zone_id: {
+                'name': zone.name,
+                'description': zone.description
+            }
+            for zone_id, zone in zones.items()
+        }
+        
+        # Calculate time ranges; get_vehicle_events orders by timestamp DESC,
+        # so the oldest event is last and the newest first
+        first_event, last_event = events[-1], events[0]
+        
+        first_time = parse_iso_timestamp(first_event['timestamp'])
+        last_time = parse_iso_timestamp(last_event['timestamp'])
+        duration_hours = (last_time - first_time).total_seconds() / 3600
         
         analytics = {
             'vehicle_id': vehicle_id,
@@ -126,19 +140,20 @@ def get_vehicle_analytics(request, vehicle_id):
             },
             'zone_visits': zone_visits,
             'zone_details': zone_details,
-            'first_event': events[-1] if events else None,  # Events are ordered DESC
-            'last_event': events[0] if events else None
+            'first_event': first_event,
+            'last_event': last_event
         }
         
-        return JsonResponse(analytics)
+        return json_response(analytics)
         
     except Exception as e:
         logger.error(f"Error getting vehicle analytics: {e}")
-        return JsonResponse({
+        return json_response({
             'error': 'Internal server error'
         }, status=500)
 
 
+@gzip_page
 @api_view(['GET'])
 def list_active_vehicles(request):
     """
@@ -147,65 +162,85 @@ def list_active_vehicles(request):
     try:
         hours = int(request.GET.get('hours', 1))  # Last hour by default
         
-        # Get recent events
-        recent_events = cosmos_service.get_recent_events(limit=1000, event_type='location_update')
-        
-        # Filter by time
-        cutoff_time = datetime.now(timezone.utc) - timedelta(hours=hours)
-        active_events = [
-            event for event in recent_events
-            if datetime.fromisoformat(event['timestamp'].replace('Z', '+00:00')) >= cutoff_time
-        ]
-        
-        # Group by vehicle
-        vehicles = {}
-        for event in active_events:
-            vehicle_id = event['vehicle_id']
-            if vehicle_id not in vehicles:
-                vehicles[vehicle_id] = {
-                    'vehicle_id': vehicle_id,
-                    'last_update': event['timestamp'],
-                    'latitude': event['latitude'],
-                    'longitude': event['longitude'],
-                    'event_count': 0
-                }
-            
-            vehicles[vehicle_id]['event_count'] += 1
-            
-            # Keep the most recent location
-            if event['timestamp'] > vehicles[vehicle_id]['last_update']:
-                vehicles[vehicle_id].update({
-                    'last_update': event['timestamp'],
-                    'latitude': event['latitude'],
-                    'longitude': event['longitude']
-                })
-        
-        # Add current zone information
-        for vehicle_data in vehicles.values():
-            # Use point classification instead of get_zones_for_location
-            current_state = arcgis_geofence_service.classify_point_realtime(
-                vehicle_data['longitude'], vehicle_data['latitude']
+        cache_key = f"active_vehicles_{hours}"
+        cached_result = cache.get(cache_key)
+        
+        if cached_result is not None:
+            return json_response(cached_result)
+        
+        cutoff_iso = (datetime.now(timezone.utc) - timedelta(hours=hours)).isoformat()
+        
+        # Get recent events as columns and filter by time. Event timestamps
+        # are UTC ISO 8601 strings, which order chronologically as strings.
+        columns = cosmos_service.get_recent_events_columnar(
+            ('vehicle_id', 'timestamp', 'latitude', 'longitude'),
+            limit=1000, event_type='location_update'
+        )
+        active = np.asarray(columns['timestamp'], dtype=str) >= cutoff_iso
+        
+        # No recent activity: skip grouping and zone classification
+        if not active.any():
+            result = {
+                'active_vehicles': [],
+                'count': 0,
+                'time_range_hours': hours
+            }
+            cache.set(cache_key, result, settings.VEHICLE_VIEW_CACHE_TIMEOUT)
+            return json_response(result)
+        
+        vehicle_ids = columns['vehicle_id'][active]
+        timestamps = columns['timestamp'][active]
+        latitudes = columns['latitude'][active]
+        longitudes = columns['longitude'][active]
+        
+        # Group by vehicle: sort by vehicle, newest first within each vehicle,
+        # so the first row of each group is its most recent location
+        order = np.lexsort((timestamps, vehicle_ids))[::-1]
+        unique_ids, first_rows, event_counts = np.unique(
+            vehicle_ids[order], return_index=True, return_counts=True
+        )
+        latest_rows = order[first_rows]
+        latest_longitudes = longitudes[latest_rows]
+        latest_latitudes = latitudes[latest_rows]
+        
+        # Classify every vehicle's latest location against the state
+        # boundaries in one batch call (one lookup per distinct location)
+        current_states = arcgis_geofence_service.classify_points(latest_longitudes, latest_latitudes)
+        
+        vehicles = {
+            vehicle_id: {
+                'vehicle_id': vehicle_id,
+                'last_update': timestamp,
+                'latitude': latitude,
+                'longitude': longitude,
+                'event_count': event_count,
+                'current_zones': _state_zones(current_state)
+            }
+            for vehicle_id, timestamp, latitude, longitude, event_count, current_state in zip(
+                unique_ids.tolist(), timestamps[latest_rows].tolist(),
+                latest_latitudes.tolist(), latest_longitudes.tolist(),
+                event_counts.tolist(), current_states
             )
-            if current_state:
-                vehicle_data['current_zones'] = [{'id': current_state.lower().replace(' ', '_'), 'name': current_state}]
-            else:
-                vehicle_data['current_zones'] = []
+        }
         
         vehicles_list = list(vehicles.values())
         vehicles_list.sort(key=lambda x: x['last_update'], reverse=True)
         
-        return JsonResponse({
+        result = {
             'active_vehicles': vehicles_list,
             'count': len(vehicles_list),
             'time_range_hours': hours
-        })
+        }
+        cache.set(cache_key, result, settings.VEHICLE_VIEW_CACHE_TIMEOUT)
+        
+        return json_response(result)
         
     except ValueError:
-        return JsonResponse({
+        return json_response({
             'error': 'Invalid hours parameter'
         }, status=400)
     except Exception as e:
         logger.error(f"Error listing active vehicles: {e}")
-        return JsonResponse({
+        return json_response({
             'error': 'Internal server error'
         }, status=500)
@@ -3,12 +3,42 @@ Django admin configuration for zone management.
 Provides admin interface for geofence zone management and analytics.
 """
 
-from django.contrib import admin
+import heapq
+import json
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from operator import itemgetter
+
+from django.contrib import admin, messages
+from django.core.cache import cache
+from django.http import Http404
+from django.shortcuts import redirect, render
+from django.urls import path, reverse
 from django.utils.html import format_html
-from django.urls import reverse
 from django.utils.safestring import mark_safe
-from django.shortcuts import render
-import json
+
+from geofence_app.cosmos_service import cosmos_service
+from geofence_app.serializers import first_error
+from .analytics import (
+    ZONE_AGGREGATE_EVENTS_LIMIT, compute_zone_aggregates, cutoff_time, estimate_current_vehicles,
+    partition_events, zone_aggregates_cache_key
+)
+from .serializers import CreateZoneSerializer
+
+logger = logging.getLogger(__name__)
+
+# The H3 zone service is optional; without it the zone admin views report
+# an error instead of preventing this module from loading
+try:
+    from geofence_app.h3_geofence_service import h3_geofence_service
+except ImportError:
+    h3_geofence_service = None
+    logger.warning("H3 geofence service not available, zone admin views will report an error")
+
+# Thread pool for the per-zone Cosmos DB reads of zone_list_view
+_zone_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix='zone-admin-io')
 
 
 class ZoneManagementAdmin:
@@ -19,7 +49,6 @@ class ZoneManagementAdmin:
     
     def get_urls(self):
         """Define custom admin URLs."""
-        from django.urls import path
         return [
             path('zones/', self.zone_list_view, name='zone_list'),
             path('zones/<str:zone_id>/', self.zone_detail_view, name='zone_detail'),
@@ -27,51 +56,51 @@ class ZoneManagementAdmin:
             path('create-zone/', self.create_zone_view, name='create_zone'),
         ]
     
+    def _zone_with_activity(self, zone):
+        """Build the zone list entry for one zone, with its recent activity and statistics."""
+        try:
+            # Get recent events for this zone
+            recent_events = cosmos_service.get_zone_events(zone.id, limit=100)
+            
+            # Calculate basic stats
+            entries = sum(1 for e in recent_events if e['event_type'] == 'zone_entry')
+            exits = len(recent_events) - entries
+            unique_vehicles = len({e['vehicle_id'] for e in recent_events})
+            
+            # Get zone statistics
+            stats = h3_geofence_service.get_zone_statistics(zone.id)
+            
+            return {
+                'zone': zone,
+                'stats': stats,
+                'recent_activity': {
+                    'entries': entries,
+                    'exits': exits,
+                    'unique_vehicles': unique_vehicles,
+                    'total_events': len(recent_events)
+                }
+            }
+        except Exception as e:
+            # If there's an error getting stats for this zone, still include it
+            return {
+                'zone': zone,
+                'stats': {'error': str(e)},
+                'recent_activity': {
+                    'entries': 0,
+                    'exits': 0,
+                    'unique_vehicles': 0,
+                    'total_events': 0
+                }
+            }
+    
     def zone_list_view(self, request):
         """Display list of all geofence zones."""
-        from geofence_app.h3_geofence_service import h3_geofence_service
-        from geofence_app.cosmos_service import cosmos_service
-        
         try:
             zones = h3_geofence_service.get_all_zones()
             
-            # Enhance zones with recent activity data
-            enhanced_zones = []
-            for zone in zones:
-                try:
-                    # Get recent events for this zone
-                    recent_events = cosmos_service.get_zone_events(zone.id, limit=100)
-                    
-                    # Calculate basic stats
-                    entries = len([e for e in recent_events if e['event_type'] == 'zone_entry'])
-                    exits = len([e for e in recent_events if e['event_type'] == 'zone_exit'])
-                    unique_vehicles = len(set(e['vehicle_id'] for e in recent_events))
-                    
-                    # Get zone statistics
-                    stats = h3_geofence_service.get_zone_statistics(zone.id)
-                    
-                    enhanced_zones.append({
-                        'zone': zone,
-                        'stats': stats,
-                        'recent_activity': {
-                            'entries': entries,
-                            'exits': exits,
-                            'unique_vehicles': unique_vehicles,
-                            'total_events': len(recent_events)
-                        }
-                    })
-                except Exception as e:
-                    # If there's an error getting stats for this zone, still include it
-                    enhanced_zones.append({
-                        'zone': zone,
-                        'stats': {'error': str(e)},
-                        'recent_activity': {
-                            'entries': 0,
-                            'exits': 0,
-                            'unique_vehicles': 0,
-                            'total_events': 0
-                        }
-                    })
+            # Enhance zones with recent activity data, fetching every zone's
+            # events and statistics concurrently
+            enhanced_zones = list(_zone_pool.map(self._zone_with_activity, zones))
             
             context = {
                 'title': 'Geofence Zones',
@@ -82,7 +111,6 @@ class ZoneManagementAdmin:
             return render(request, 'admin/zone_management/zone_list.html', context)
             
         except Exception as e:
-            from django.contrib import messages
             messages.error(request, f'Error loading zones: {str(e)}')
             return render(request, 'admin/zone_management/zone_list.html', {
                 'title': 'Geofence Zones',
@@ -92,15 +120,11 @@ class ZoneManagementAdmin:
     
     def zone_detail_view(self, request, zone_id):
         """Display detailed view of a specific zone."""
-        from geofence_app.h3_geofence_service import h3_geofence_service
-        from geofence_app.cosmos_service import cosmos_service
-        
         try:
             # Get zone information
             zone = h3_geofence_service.get_zone_by_id(zone_id)
             
             if not zone:
-                from django.http import Http404
                 raise Http404(f"Zone {zone_id} not found")
             
             # Get zone statistics
@@ -110,29 +134,18 @@ class ZoneManagementAdmin:
             recent_events = cosmos_service.get_zone_events(zone_id, limit=50)
             
             # Analyze events
-            entries = [e for e in recent_events if e['event_type'] == 'zone_entry']
-            exits = [e for e in recent_events if e['event_type'] == 'zone_exit']
+            entries, exits = partition_events(recent_events)
             
             # Current occupancy estimate
-            current_vehicles = set()
-            for event in sorted(recent_events, key=lambda x: x['timestamp']):
-                vehicle_id = event['vehicle_id']
-                if event['event_type'] == 'zone_entry':
-                    current_vehicles.add(vehicle_id)
-                elif event['event_type'] == 'zone_exit':
-                    current_vehicles.discard(vehicle_id)
+            current_vehicles = estimate_current_vehicles(recent_events, entries, exits)
             
             # Vehicle activity
-            vehicle_activity = {}
-            for event in recent_events:
-                vehicle_id = event['vehicle_id']
-                if vehicle_id not in vehicle_activity:
-                    vehicle_activity[vehicle_id] = {'entries': 0, 'exits': 0}
-                
-                if event['event_type'] == 'zone_entry':
-                    vehicle_activity[vehicle_id]['entries'] += 1
-                elif event['event_type'] == 'zone_exit':
-                    vehicle_activity[vehicle_id]['exits'] += 1
+            entry_counts = Counter(e['vehicle_id'] for e in entries)
+            exit_counts = Counter(e['vehicle_id'] for e in exits)
+            vehicle_activity = {
+                vehicle_id: {'entries': entry_counts[vehicle_id], 'exits': exit_counts[vehicle_id]}
+                for vehicle_id in dict.fromkeys(e['vehicle_id'] for e in recent_events)
+            }
             
             context = {
                 'title': f'Zone: {zone.name}',
@@ -145,119 +158,59 @@ class ZoneManagementAdmin:
                     'unique_vehicles': len(vehicle_activity)
                 },
                 'current_vehicles': list(current_vehicles),
-                'vehicle_activity': dict(list(vehicle_activity.items())[:10]),  # Top 10
+                'vehicle_activity': dict(islice(vehicle_activity.items(), 10)),  # Top 10
                 'recent_events': recent_events[:20]  # Last 20 events
             }
             
             return render(request, 'admin/zone_management/zone_detail.html', context)
             
         except Exception as e:
-            from django.contrib import messages
             messages.error(request, f'Error loading zone details: {str(e)}')
             return self.zone_list_view(request)
     
     def zone_analytics_view(self, request, zone_id):
         """Display analytics for a specific zone."""
-        from geofence_app.h3_geofence_service import h3_geofence_service
-        from geofence_app.cosmos_service import cosmos_service
-        from datetime import datetime, timezone, timedelta
-        
         try:
             # Get zone information
             zone = h3_geofence_service.get_zone_by_id(zone_id)
             
             if not zone:
-                from django.http import Http404
                 raise Http404(f"Zone {zone_id} not found")
             
             # Get time range from query params
             hours = int(request.GET.get('hours', 24))
             
-            # Get zone events
-            zone_events = cosmos_service.get_zone_events(zone_id, limit=2000)
-            
-            # Filter by time if specified
-            if hours > 0:
-                cutoff_time = datetime.now(timezone.utc) - timedelta(hours=hours)
-                zone_events = [
-                    event for event in zone_events
-                    if datetime.fromisoformat(event['timestamp'].replace('Z', '+00:00')) >= cutoff_time
-                ]
-            
-            # Analyze events
-            entries = [e for e in zone_events if e['event_type'] == 'zone_entry']
-            exits = [e for e in zone_events if e['event_type'] == 'zone_exit']
-            
-            # Hourly distribution
-            hourly_stats = {}
-            for event in zone_events:
-                try:
-                    timestamp = datetime.fromisoformat(event['timestamp'].replace('Z', '+00:00'))
-                    hour = timestamp.hour
-                    
-                    if hour not in hourly_stats:
-                        hourly_stats[hour] = {'entries': 0, 'exits': 0}
-                    
-                    if event['event_type'] == 'zone_entry':
-                        hourly_stats[hour]['entries'] += 1
-                    elif event['event_type'] == 'zone_exit':
-                        hourly_stats[hour]['exits'] += 1
-                except:
-                    pass
-            
-            # Daily distribution (if looking at more than 24 hours)
-            daily_stats = {}
-            if hours > 24:
-                for event in zone_events:
-                    try:
-                        timestamp = datetime.fromisoformat(event['timestamp'].replace('Z', '+00:00'))
-                        date = timestamp.date().isoformat()
-                        
-                        if date not in daily_stats:
-                            daily_stats[date] = {'entries': 0, 'exits': 0}
-                        
-                        if event['event_type'] == 'zone_entry':
-                            daily_stats[date]['entries'] += 1
-                        elif event['event_type'] == 'zone_exit':
-                            daily_stats[date]['exits'] += 1
-                    except:
-                        pass
-            
-            # Vehicle frequency
-            vehicle_frequency = {}
-            for event in zone_events:
-                vehicle_id = event['vehicle_id']
-                if vehicle_id not in vehicle_frequency:
-                    vehicle_frequency[vehicle_id] = 0
-                vehicle_frequency[vehicle_id] += 1
+            # Serve aggregates precomputed by recompute_zone_aggregates, falling
+            # back to live computation for time ranges it does not cover
+            aggregates = cache.get(zone_aggregates_cache_key(zone_id, hours))
+            if aggregates is None:
+                zone_events = cosmos_service.get_zone_events(
+                    zone_id, limit=ZONE_AGGREGATE_EVENTS_LIMIT, since=cutoff_time(hours)
+                )
+                aggregates = compute_zone_aggregates(zone_events, include_daily=hours > 24)
             
-            # Sort by frequency
-            top_vehicles = sorted(
-                vehicle_frequency.items(), 
-                key=lambda x: x[1], 
-                reverse=True
-            )[:10]
+            # Ten most frequent vehicles, without sorting the full frequency table
+            top_vehicles = heapq.nlargest(10, aggregates['vehicle_frequency'].items(), key=itemgetter(1))
             
             context = {
                 'title': f'Analytics: {zone.name}',
                 'zone': zone,
                 'time_range_hours': hours,
                 'summary': {
-                    'total_events': len(zone_events),
-                    'total_entries': len(entries),
-                    'total_exits': len(exits),
-                    'unique_vehicles': len(vehicle_frequency)
+                    'total_events': aggregates['total_events'],
+                    'total_entries': aggregates['total_entries'],
+                    'total_exits': aggregates['total_exits'],
+                    'unique_vehicles': len(aggregates['vehicle_frequency'])
                 },
-                'hourly_stats': dict(sorted(hourly_stats.items())),
-                'daily_stats': dict(sorted(daily_stats.items())) if daily_stats else {},
+                'hourly_stats': aggregates['hourly_stats'],
+                'daily_stats': aggregates['daily_stats'],
                 'top_vehicles': top_vehicles,
-                'recent_events': zone_events[:50]
+                'recent_events': aggregates['recent_events']
             }
             
             return render(request, 'admin/zone_management/zone_analytics.html', context)
             
         except Exception as e:
-            from django.contrib import messages
             messages.error(request, f'Error loading zone analytics: {str(e)}')
             return self.zone_detail_view(request, zone_id)
     
@@ -265,48 +218,31 @@ class ZoneManagementAdmin:
         """Create a new geofence zone."""
         if request.method == 'POST':
             try:
-                from geofence_app.h3_geofence_service import h3_geofence_service
-                
-                # Get form data
-                zone_id = request.POST.get('zone_id')
-                name = request.POST.get('name')
-                description = request.POST.get('description')
-                center_lat = float(request.POST.get('center_lat'))
-                center_lng = float(request.POST.get('center_lng'))
-                radius_km = float(request.POST.get('radius_km'))
-                
-                # Validate inputs
-                if not all([zone_id, name, description]):
-                    raise ValueError("All fields are required")
-                
-                if not (-90 <= center_lat <= 90):
-                    raise ValueError("Invalid latitude")
-                
-                if not (-180 <= center_lng <= 180):
-                    raise ValueError("Invalid longitude")
+                # Validate form data
+                serializer = CreateZoneSerializer(data=request.POST)
+                if not serializer.is_valid():
+                    raise ValueError(first_error(serializer.errors))
                 
-                if radius_km <= 0 or radius_km > 50:
-                    raise ValueError("Radius must be between 0 and 50 km")
+                data = serializer.validated_data
+                zone_id = data['zone_id']
+                name = data['name']
                 
                 # Create the zone
                 zone = h3_geofence_service.create_zone(
                     id=zone_id,
                     name=name,
-                    description=description,
-                    center_lat=center_lat,
-                    center_lng=center_lng,
-                    radius_km=radius_km
+                    description=data['description'],
+                    center_lat=data['center_lat'],
+                    center_lng=data['center_lng'],
+                    radius_km=data['radius_km']
                 )
                 
-                from django.contrib import messages
                 messages.success(request, f'Zone "{name}" created successfully!')
                 
                 # Redirect to zone detail
-                from django.shortcuts import redirect
                 return redirect('admin:zone_detail', zone_id=zone_id)
                 
             except Exception as e:
-                from django.contrib import messages
                 messages.error(request, f'Error creating zone: {str(e)}')
         
         context = {
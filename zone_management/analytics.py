@@ -0,0 +1,179 @@
+"""
+Zone analytics aggregation shared by the API views, the admin views
+and the periodic recompute_zone_aggregates task.
+"""
+
+from collections import Counter
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from geofence_app.time_utils import to_datetime64
+
+# Most recent events fetched per zone when computing aggregates
+ZONE_AGGREGATE_EVENTS_LIMIT = 2000
+
+# Recent events kept alongside the aggregates for display
+RECENT_EVENTS_LIMIT = 50
+
+
+def cutoff_time(hours: int) -> Optional[datetime]:
+    """
+    Return the start of the last `hours` hours, or None when hours <= 0.
+    
+    Truncated to the minute so repeat requests share cached zone events.
+    """
+    if hours <= 0:
+        return None
+    return (datetime.now(timezone.utc) - timedelta(hours=hours)).replace(second=0, microsecond=0)
+
+
+def zone_aggregates_cache_key(zone_id: str, hours: int) -> str:
+    """Cache key under which precomputed aggregates for a zone and time range are stored."""
+    return f"zone_agg:{zone_id}:{hours}"
+
+
+def entry_exit_counts(keys: np.ndarray, is_entry: np.ndarray) -> Dict[Any, Dict[str, int]]:
+    """
+    Count zone entries and exits per key.
+    
+    Args:
+        keys: One group key per event, e.g. hour of day or date
+        is_entry: Boolean array, True for zone_entry events and False for zone_exit
+        
+    Returns:
+        Dictionary mapping each key, in ascending order, to its 'entries' and 'exits' counts
+    """
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    totals = np.bincount(inverse, minlength=len(unique_keys))
+    entries = np.bincount(inverse, weights=is_entry, minlength=len(unique_keys)).astype(np.int64)
+    
+    return {
+        key: {'entries': entry_count, 'exits': total - entry_count}
+        for key, entry_count, total in zip(unique_keys.tolist(), entries.tolist(), totals.tolist())
+    }
+
+
+def hourly_entry_exit_counts(entry_hours: np.ndarray, exit_hours: np.ndarray) -> Dict[int, Dict[str, int]]:
+    """
+    Count zone entries and exits per hour of day in fixed 24-slot histograms.
+    
+    Args:
+        entry_hours: Hour of day (0-23) of each entry event
+        exit_hours: Hour of day (0-23) of each exit event
+        
+    Returns:
+        Dictionary mapping each hour with activity, in ascending order, to its
+        'entries' and 'exits' counts
+    """
+    entries = np.bincount(entry_hours, minlength=24).tolist()
+    exits = np.bincount(exit_hours, minlength=24).tolist()
+    
+    return {
+        hour: {'entries': entry_count, 'exits': exit_count}
+        for hour, (entry_count, exit_count) in enumerate(zip(entries, exits))
+        if entry_count or exit_count
+    }
+
+
+def partition_events(zone_events: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Split zone events into entries and exits in a single pass.
+    
+    Args:
+        zone_events: Zone entry/exit events
+        
+    Returns:
+        Tuple of (entry events, exit events), each in the original order
+    """
+    entries, exits = [], []
+    for event in zone_events:
+        (entries if event['event_type'] == 'zone_entry' else exits).append(event)
+    return entries, exits
+
+
+def estimate_current_vehicles(zone_events: List[Dict], entries: List[Dict],
+                              exits: List[Dict]) -> Set[str]:
+    """
+    Estimate which vehicles are currently inside a zone.
+    
+    Args:
+        zone_events: Zone events, newest first
+        entries: Entry events of zone_events
+        exits: Exit events of zone_events
+        
+    Returns:
+        Set of vehicle IDs whose latest event is a zone entry
+    """
+    # Without exits every entered vehicle is still inside; without entries none is
+    if not entries:
+        return set()
+    if not exits:
+        return {event['vehicle_id'] for event in entries}
+    
+    # Events are newest first, so each vehicle's first occurrence is its
+    # latest event; the vehicle is inside when that event is an entry
+    vehicle_ids = np.array([event['vehicle_id'] for event in zone_events])
+    is_entry = np.array([event['event_type'] == 'zone_entry' for event in zone_events], dtype=bool)
+    unique_ids, latest = np.unique(vehicle_ids, return_index=True)
+    return set(unique_ids[is_entry[latest]].tolist())
+
+
+def compute_zone_aggregates(zone_events: List[Dict], include_daily: bool = True) -> Dict[str, Any]:
+    """
+    Aggregate a zone's entry/exit events.
+    
+    Args:
+        zone_events: Zone events as returned by get_zone_events, newest first
+        include_daily: Whether to compute the daily entry/exit histogram
+        
+    Returns:
+        Dictionary with event totals, hourly and daily entry/exit histograms,
+        per-vehicle activity and frequency, estimated current vehicles and
+        the most recent events
+    """
+    if not zone_events:
+        return {
+            'total_events': 0,
+            'total_entries': 0,
+            'total_exits': 0,
+            'hourly_stats': {},
+            'daily_stats': {},
+            'vehicle_activity': {},
+            'vehicle_frequency': {},
+            'current_vehicles': [],
+            'recent_events': []
+        }
+    
+    entries, exits = partition_events(zone_events)
+    
+    # Hourly and daily entry/exit histograms, vectorized over the entry
+    # timestamps followed by the exit timestamps
+    timestamps = to_datetime64([event['timestamp'] for event in entries] + [event['timestamp'] for event in exits])
+    is_entry = np.arange(len(timestamps)) < len(entries)
+    hours_of_day = timestamps.astype('datetime64[h]').astype(np.int64) % 24
+    hourly_stats = hourly_entry_exit_counts(hours_of_day[:len(entries)], hours_of_day[len(entries):])
+    daily_stats = {}
+    if include_daily:
+        daily_stats = entry_exit_counts(timestamps.astype('datetime64[D]').astype(str), is_entry)
+    
+    # Per-vehicle activity
+    entry_counts = Counter(event['vehicle_id'] for event in entries)
+    exit_counts = Counter(event['vehicle_id'] for event in exits)
+    vehicle_frequency = entry_counts + exit_counts
+    
+    return {
+        'total_events': len(zone_events),
+        'total_entries': len(entries),
+        'total_exits': len(exits),
+        'hourly_stats': hourly_stats,
+        'daily_stats': daily_stats,
+        'vehicle_activity': {
+            vehicle_id: {'entries': entry_counts[vehicle_id], 'exits': exit_counts[vehicle_id]}
+            for vehicle_id in vehicle_frequency
+        },
+        'vehicle_frequency': dict(vehicle_frequency),
+        'current_vehicles': list(estimate_current_vehicles(zone_events, entries, exits)),
+        'recent_events': zone_events[:RECENT_EVENTS_LIMIT]
+    }
@@ -0,0 +1,40 @@
+"""
+DRF serializers for zone management form payloads.
+"""
+
+from rest_framework import serializers
+
+REQUIRED_MESSAGE = 'All fields are required'
+
+
+class CreateZoneSerializer(serializers.Serializer):
+    """Validates the create-zone admin form."""
+    
+    zone_id = serializers.CharField(error_messages={'required': REQUIRED_MESSAGE, 'blank': REQUIRED_MESSAGE})
+    name = serializers.CharField(error_messages={'required': REQUIRED_MESSAGE, 'blank': REQUIRED_MESSAGE})
+    description = serializers.CharField(error_messages={'required': REQUIRED_MESSAGE, 'blank': REQUIRED_MESSAGE})
+    center_lat = serializers.FloatField(
+        min_value=-90,
+        max_value=90,
+        error_messages={
+            'min_value': 'Invalid latitude',
+            'max_value': 'Invalid latitude',
+        }
+    )
+    center_lng = serializers.FloatField(
+        min_value=-180,
+        max_value=180,
+        error_messages={
+            'min_value': 'Invalid longitude',
+            'max_value': 'Invalid longitude',
+        }
+    )
+    radius_km = serializers.FloatField(
+        max_value=50,
+        error_messages={'max_value': 'Radius must be between 0 and 50 km'}
+    )
+    
+    def validate_radius_km(self, value):
+        if value <= 0:
+            raise serializers.ValidationError('Radius must be between 0 and 50 km')
+        return value
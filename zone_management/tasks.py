@@ -0,0 +1,42 @@
+"""
+Celery tasks for zone management.
+Precomputes zone analytics aggregates so analytics views serve them from the cache.
+"""
+
+import logging
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+
+from geofence_app.cosmos_service import cosmos_service
+from arcgis_geofence_service import arcgis_geofence_service
+from .analytics import (
+    ZONE_AGGREGATE_EVENTS_LIMIT, compute_zone_aggregates, cutoff_time, zone_aggregates_cache_key
+)
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def recompute_zone_aggregates() -> None:
+    """Recompute analytics aggregates for every zone and each configured time range."""
+    zones = arcgis_geofence_service.get_all_zones()
+    
+    for zone in zones:
+        for hours in settings.ZONE_AGGREGATE_HOURS:
+            try:
+                zone_events = cosmos_service.get_zone_events(
+                    zone.id, limit=ZONE_AGGREGATE_EVENTS_LIMIT, since=cutoff_time(hours)
+                )
+            except Exception as e:
+                logger.error(f"Error recomputing aggregates for zone {zone.id}: {e}")
+                continue
+            
+            cache.set(
+                zone_aggregates_cache_key(zone.id, hours),
+                compute_zone_aggregates(zone_events, include_daily=hours > 24),
+                settings.ZONE_AGGREGATES_CACHE_TIMEOUT
+            )
+    
+    logger.info("Recomputed aggregates for %s zones", len(zones))
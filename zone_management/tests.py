@@ -1 +1,235 @@
-from django.test import TestCase
+"""
+Tests for zone analytics, serializers and views.
+"""
+
+from datetime import datetime, timedelta, timezone
+from django.test import TestCase, Client
+from django.urls import reverse
+from unittest.mock import patch, MagicMock
+
+import numpy as np
+
+from .analytics import (
+    compute_zone_aggregates, cutoff_time, estimate_current_vehicles, hourly_entry_exit_counts,
+    partition_events
+)
+from .serializers import CreateZoneSerializer
+
+
+def zone_event(vehicle_id, event_type, timestamp):
+    """Build a zone event document as returned by get_zone_events."""
+    return {
+        'vehicle_id': vehicle_id,
+        'zone_id': 'TX',
+        'event_type': event_type,
+        'timestamp': timestamp
+    }
+
+
+class ZoneAnalyticsTestCase(TestCase):
+    """Test cases for the zone analytics helpers."""
+    
+    def setUp(self):
+        """Events for three vehicles, newest first as get_zone_events returns them."""
+        self.zone_events = [
+            zone_event('taxi_1', 'zone_exit', '2024-01-02T15:30:00+00:00'),
+            zone_event('taxi_2', 'zone_entry', '2024-01-02T09:00:00+00:00'),
+            zone_event('taxi_3', 'zone_entry', '2024-01-01T23:45:00+00:00'),
+            zone_event('taxi_1', 'zone_entry', '2024-01-01T09:15:00+00:00'),
+            zone_event('taxi_3', 'zone_exit', '2024-01-01T08:00:00+00:00')
+        ]
+    
+    def test_cutoff_time_truncates_to_minute(self):
+        """The cutoff is `hours` before now, rounded down to the minute."""
+        before = datetime.now(timezone.utc)
+        cutoff = cutoff_time(2)
+        after = datetime.now(timezone.utc)
+        
+        self.assertEqual(cutoff.tzinfo, timezone.utc)
+        self.assertEqual((cutoff.second, cutoff.microsecond), (0, 0))
+        self.assertLessEqual(cutoff, after - timedelta(hours=2))
+        self.assertGreater(cutoff, before - timedelta(hours=2, minutes=1))
+    
+    def test_cutoff_time_none_for_non_positive_hours(self):
+        """A zero or negative range means no time filter."""
+        self.assertIsNone(cutoff_time(0))
+        self.assertIsNone(cutoff_time(-5))
+    
+    def test_hourly_entry_exit_counts(self):
+        """Only hours with activity are returned, in ascending order."""
+        hourly = hourly_entry_exit_counts(np.array([9, 9, 23]), np.array([0, 9]))
+        
+        self.assertEqual(list(hourly), [0, 9, 23])
+        self.assertEqual(hourly[0], {'entries': 0, 'exits': 1})
+        self.assertEqual(hourly[9], {'entries': 2, 'exits': 1})
+        self.assertEqual(hourly[23], {'entries': 1, 'exits': 0})
+    
+    def test_hourly_entry_exit_counts_empty(self):
+        """No events produce an empty histogram."""
+        empty = np.array([], dtype=np.int64)
+        self.assertEqual(hourly_entry_exit_counts(empty, empty), {})
+    
+    def test_partition_events(self):
+        """Entries and exits keep their original order."""
+        entries, exits = partition_events(self.zone_events)
+        
+        self.assertEqual([event['vehicle_id'] for event in entries], ['taxi_2', 'taxi_3', 'taxi_1'])
+        self.assertEqual([event['vehicle_id'] for event in exits], ['taxi_1', 'taxi_3'])
+    
+    def test_estimate_current_vehicles(self):
+        """A vehicle is inside when its latest event is an entry."""
+        entries, exits = partition_events(self.zone_events)
+        
+        self.assertEqual(
+            estimate_current_vehicles(self.zone_events, entries, exits),
+            {'taxi_2', 'taxi_3'}
+        )
+    
+    def test_estimate_current_vehicles_one_sided(self):
+        """Without exits every entered vehicle is inside; without entries none is."""
+        entries, exits = partition_events(self.zone_events)
+        
+        self.assertEqual(estimate_current_vehicles(entries, entries, []), {'taxi_1', 'taxi_2', 'taxi_3'})
+        self.assertEqual(estimate_current_vehicles(exits, [], exits), set())
+    
+    def test_compute_zone_aggregates(self):
+        """Totals, histograms and per-vehicle activity are aggregated from the events."""
+        aggregates = compute_zone_aggregates(self.zone_events)
+        
+        self.assertEqual(aggregates['total_events'], 5)
+        self.assertEqual(aggregates['total_entries'], 3)
+        self.assertEqual(aggregates['total_exits'], 2)
+        self.assertEqual(list(aggregates['hourly_stats']), [8, 9, 15, 23])
+        self.assertEqual(aggregates['hourly_stats'][9], {'entries': 2, 'exits': 0})
+        self.assertEqual(aggregates['daily_stats'], {
+            '2024-01-01': {'entries': 2, 'exits': 1},
+            '2024-01-02': {'entries': 1, 'exits': 1}
+        })
+        self.assertEqual(aggregates['vehicle_activity']['taxi_1'], {'entries': 1, 'exits': 1})
+        self.assertEqual(aggregates['vehicle_frequency']['taxi_3'], 2)
+        self.assertEqual(set(aggregates['current_vehicles']), {'taxi_2', 'taxi_3'})
+    
+    def test_compute_zone_aggregates_without_daily_stats(self):
+        """The daily histogram is skipped when not requested."""
+        aggregates = compute_zone_aggregates(self.zone_events, include_daily=False)
+        self.assertEqual(aggregates['daily_stats'], {})
+    
+    def test_compute_zone_aggregates_empty(self):
+        """No events produce zero totals."""
+        aggregates = compute_zone_aggregates([])
+        
+        self.assertEqual(aggregates['total_events'], 0)
+        self.assertEqual(aggregates['current_vehicles'], [])
+    
+    def test_compute_zone_aggregates_converts_non_utc_offsets(self):
+        """Timestamps stored with another offset are bucketed by their UTC hour."""
+        self.zone_events[0]['timestamp'] = '2024-01-02T15:30:00+05:00'
+        
+        aggregates = compute_zone_aggregates(self.zone_events)
+        
+        self.assertEqual(list(aggregates['hourly_stats']), [8, 9, 10, 23])
+        self.assertEqual(aggregates['hourly_stats'][10], {'entries': 0, 'exits': 1})
+
+
+class CreateZoneSerializerTestCase(TestCase):
+    """Test cases for the create-zone form serializer."""
+    
+    def setUp(self):
+        """Valid create-zone form data."""
+        self.data = {
+            'zone_id': 'airport',
+            'name': 'Airport',
+            'description': 'Airport pickup area',
+            'center_lat': '40.6413',
+            'center_lng': '-73.7781',
+            'radius_km': '2.5'
+        }
+    
+    def test_valid_data(self):
+        """Form values are converted to their field types."""
+        serializer = CreateZoneSerializer(data=self.data)
+        
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.validated_data['center_lat'], 40.6413)
+        self.assertEqual(serializer.validated_data['radius_km'], 2.5)
+    
+    def test_missing_field(self):
+        """Blank text fields report that all fields are required."""
+        serializer = CreateZoneSerializer(data={**self.data, 'name': ''})
+        
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors['name'][0], 'All fields are required')
+    
+    def test_invalid_coordinates(self):
+        """Out of range coordinates are rejected."""
+        serializer = CreateZoneSerializer(data={**self.data, 'center_lat': '91', 'center_lng': '-181'})
+        
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors['center_lat'][0], 'Invalid latitude')
+        self.assertEqual(serializer.errors['center_lng'][0], 'Invalid longitude')
+    
+    def test_invalid_radius(self):
+        """The radius must be positive and at most 50 km."""
+        for radius in ('0', '-1', '50.5'):
+            serializer = CreateZoneSerializer(data={**self.data, 'radius_km': radius})
+            
+            self.assertFalse(serializer.is_valid())
+            self.assertEqual(serializer.errors['radius_km'][0], 'Radius must be between 0 and 50 km')
+
+
+@patch('zone_management.views.cache')
+@patch('zone_management.views.cosmos_service')
+@patch('zone_management.views.arcgis_geofence_service')
+class ZoneAnalyticsViewTestCase(TestCase):
+    """Test cases for the zone analytics endpoint."""
+    
+    def setUp(self):
+        """Set up test client."""
+        self.client = Client()
+        self.url = reverse('zone_management:get_zone_analytics', args=['TX'])
+    
+    def _mock_services(self, mock_arcgis, mock_cosmos, mock_cache, zone_events):
+        zone = MagicMock()
+        zone.name = 'Texas'
+        zone.description = 'State of Texas'
+        mock_arcgis.get_zone_by_id.return_value = zone
+        mock_cosmos.get_zone_events.return_value = zone_events
+        mock_cosmos.get_latest_zone_event_ts.return_value = 1704200000
+        mock_cache.get.return_value = None
+    
+    def test_zone_analytics(self, mock_arcgis, mock_cosmos, mock_cache):
+        """Analytics are computed live when no aggregates are cached."""
+        self._mock_services(mock_arcgis, mock_cosmos, mock_cache, [
+            zone_event('taxi_1', 'zone_entry', '2024-01-02T15:30:00+00:00')
+        ])
+        
+        response = self.client.get(self.url, {'hours': 24})
+        
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['zone_name'], 'Texas')
+        self.assertEqual(data['summary']['total_entries'], 1)
+        self.assertEqual(data['current_vehicles'], ['taxi_1'])
+        self.assertIn('public', response['Cache-Control'])
+        self.assertTrue(response.has_header('ETag'))
+    
+    def test_zone_analytics_non_utc_offset(self, mock_arcgis, mock_cosmos, mock_cache):
+        """A stored event with a non-UTC offset is converted, not reported as a bad request."""
+        self._mock_services(mock_arcgis, mock_cosmos, mock_cache, [
+            zone_event('taxi_1', 'zone_entry', '2024-01-02T15:30:00+05:00')
+        ])
+        
+        response = self.client.get(self.url, {'hours': 24})
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.json()['hourly_distribution']), ['10'])
+    
+    def test_zone_analytics_not_found(self, mock_arcgis, mock_cosmos, mock_cache):
+        """Unknown zones return 404 without cache headers."""
+        self._mock_services(mock_arcgis, mock_cosmos, mock_cache, [])
+        mock_arcgis.get_zone_by_id.return_value = None
+        
+        response = self.client.get(self.url)
+        
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('Cache-Control'))
@@ -3,19 +3,70 @@ Zone management specific views.
 Handles zone analytics and management operations.
 """
 
+import hashlib
 import logging
-from datetime import datetime, timezone, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
 from django.http import JsonResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
 from geofence_app.cosmos_service import cosmos_service
+from geofence_app.json_utils import json_response
 from arcgis_geofence_service import arcgis_geofence_service
+from .analytics import (
+    ZONE_AGGREGATE_EVENTS_LIMIT, compute_zone_aggregates, cutoff_time, estimate_current_vehicles,
+    partition_events, zone_aggregates_cache_key
+)
 
 logger = logging.getLogger(__name__)
 
+# Thread pool for per-zone Cosmos DB reads issued by a single request
+_zone_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix='zone-io')
+
+
+def _zone_activity_etag(request, zone_id=None):
+    """
+    ETag for zone activity responses.
+    
+    Changes when the minute-truncated time window moves or a newer zone
+    event is written, so unchanged responses are answered with 304.
+    """
+    try:
+        hours = int(request.GET.get('hours', 24))
+        latest_ts = cosmos_service.get_latest_zone_event_ts(zone_id)
+    except Exception as e:
+        # Without an ETag the view runs and reports the error itself
+        logger.warning(f"Could not compute zone activity ETag: {e}")
+        return None
+    
+    key = f"{request.path}:{hours}:{cutoff_time(hours)}:{latest_ts}"
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+def _cache_successful(view_func):
+    """
+    Mark successful zone activity responses as publicly cacheable.
+    
+    Applies to 200 responses and their 304 revalidations only, so 404 and
+    500 responses are never stored by shared caches.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        response = view_func(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            patch_cache_control(response, max_age=settings.ZONE_VIEW_CACHE_TIMEOUT, public=True)
+        return response
+    return wrapper
+
 
 @api_view(['GET'])
+@_cache_successful
+@condition(etag_func=_zone_activity_etag)
 def get_zone_analytics(request, zone_id):
     """
     Get detailed analytics for a specific zone.
@@ -31,59 +82,14 @@ def get_zone_analytics(request, zone_id):
         # Get query parameters
         hours = int(request.GET.get('hours', 24))
         
-        # Get zone events
-        zone_events = cosmos_service.get_zone_events(zone_id, limit=1000)
-        
-        # Filter by time if specified
-        if hours > 0:
-            cutoff_time = datetime.now(timezone.utc) - timedelta(hours=hours)
-            zone_events = [
-                event for event in zone_events
-                if datetime.fromisoformat(event['timestamp'].replace('Z', '+00:00')) >= cutoff_time
-            ]
-        
-        # Analyze events
-        entries = [e for e in zone_events if e['event_type'] == 'zone_entry']
-        exits = [e for e in zone_events if e['event_type'] == 'zone_exit']
-        
-        # Vehicle activity
-        unique_vehicles = set()
-        vehicle_activity = {}
-        
-        for event in zone_events:
-            vehicle_id = event['vehicle_id']
-            unique_vehicles.add(vehicle_id)
-            
-            if vehicle_id not in vehicle_activity:
-                vehicle_activity[vehicle_id] = {'entries': 0, 'exits': 0}
-            
-            if event['event_type'] == 'zone_entry':
-                vehicle_activity[vehicle_id]['entries'] += 1
-            elif event['event_type'] == 'zone_exit':
-                vehicle_activity[vehicle_id]['exits'] += 1
-        
-        # Calculate hourly distribution
-        hourly_stats = {}
-        for event in zone_events:
-            timestamp = datetime.fromisoformat(event['timestamp'].replace('Z', '+00:00'))
-            hour = timestamp.hour
-            
-            if hour not in hourly_stats:
-                hourly_stats[hour] = {'entries': 0, 'exits': 0}
-            
-            if event['event_type'] == 'zone_entry':
-                hourly_stats[hour]['entries'] += 1
-            elif event['event_type'] == 'zone_exit':
-                hourly_stats[hour]['exits'] += 1
-        
-        # Current occupancy estimate
-        current_vehicles = set()
-        for event in sorted(zone_events, key=lambda x: x['timestamp']):
-            vehicle_id = event['vehicle_id']
-            if event['event_type'] == 'zone_entry':
-                current_vehicles.add(vehicle_id)
-            elif event['event_type'] == 'zone_exit':
-                current_vehicles.discard(vehicle_id)
+        # Serve aggregates precomputed by recompute_zone_aggregates, falling
+        # back to live computation for time ranges it does not cover
+        aggregates = cache.get(zone_aggregates_cache_key(zone_id, hours))
+        if aggregates is None:
+            zone_events = cosmos_service.get_zone_events(
+                zone_id, limit=ZONE_AGGREGATE_EVENTS_LIMIT, since=cutoff_time(hours)
+            )
+            aggregates = compute_zone_aggregates(zone_events, include_daily=hours > 24)
         
         analytics = {
             'zone_id': zone_id,
@@ -91,16 +97,16 @@ def get_zone_analytics(request, zone_id):
             'zone_description': zone.description,
             'time_range_hours': hours,
             'summary': {
-                'total_events': len(zone_events),
-                'total_entries': len(entries),
-                'total_exits': len(exits),
-                'unique_vehicles': len(unique_vehicles),
-                'estimated_current_occupancy': len(current_vehicles)
+                'total_events': aggregates['total_events'],
+                'total_entries': aggregates['total_entries'],
+                'total_exits': aggregates['total_exits'],
+                'unique_vehicles': len(aggregates['vehicle_activity']),
+                'estimated_current_occupancy': len(aggregates['current_vehicles'])
             },
-            'vehicle_activity': vehicle_activity,
-            'hourly_distribution': hourly_stats,
-            'current_vehicles': list(current_vehicles),
-            'recent_events': zone_events[:20]  # Last 20 events
+            'vehicle_activity': aggregates['vehicle_activity'],
+            'hourly_distribution': aggregates['hourly_stats'],
+            'current_vehicles': aggregates['current_vehicles'],
+            'recent_events': aggregates['recent_events'][:20]  # Last 20 events
         }
         
         return JsonResponse(analytics)
@@ -117,6 +123,8 @@ def get_zone_analytics(request, zone_id):
 
 
 @api_view(['GET'])
+@_cache_successful
+@condition(etag_func=_zone_activity_etag)
 def get_zones_summary(request):
     """
     Get summary statistics for all zones.
@@ -127,31 +135,18 @@ def get_zones_summary(request):
         zones = arcgis_geofence_service.get_all_zones()
         zones_summary = []
         
-        for zone in zones:
-            # Get recent events for this zone
-            zone_events = cosmos_service.get_zone_events(zone.id, limit=500)
-            
-            # Filter by time
-            if hours > 0:
-                cutoff_time = datetime.now(timezone.utc) - timedelta(hours=hours)
-                zone_events = [
-                    event for event in zone_events
-                    if datetime.fromisoformat(event['timestamp'].replace('Z', '+00:00')) >= cutoff_time
-                ]
-            
-            # Calculate basic stats
-            entries = len([e for e in zone_events if e['event_type'] == 'zone_entry'])
-            exits = len([e for e in zone_events if e['event_type'] == 'zone_exit'])
-            unique_vehicles = len(set(e['vehicle_id'] for e in zone_events))
-            
-            # Estimate current occupancy
-            current_vehicles = set()
-            for event in sorted(zone_events, key=lambda x: x['timestamp']):
-                vehicle_id = event['vehicle_id']
-                if event['event_type'] == 'zone_entry':
-                    current_vehicles.add(vehicle_id)
-                elif event['event_type'] == 'zone_exit':
-                    current_vehicles.discard(vehicle_id)
+        # Get recent events for every zone, filtered by time server-side, with
+        # the per-zone queries in flight concurrently
+        since = cutoff_time(hours)
+        events_by_zone = _zone_pool.map(
+            lambda zone: cosmos_service.get_zone_events(zone.id, limit=500, since=since), zones
+        )
+        
+        for zone, zone_events in zip(zones, events_by_zone):
+            # Calculate basic stats and estimate current occupancy
+            entries, exits = partition_events(zone_events)
+            current_vehicles = estimate_current_vehicles(zone_events, entries, exits)
+            unique_vehicles = len({event['vehicle_id'] for event in zone_events})
             
             # ArcGIS service doesn't have zone statistics method, so we'll use empty dict
             zone_stats = {}
@@ -168,8 +163,8 @@ def get_zones_summary(request):
                 'arcgis_statistics': zone_stats,
                 'activity_summary': {
                     'total_events': len(zone_events),
-                    'entries': entries,
-                    'exits': exits,
+                    'entries': len(entries),
+                    'exits': len(exits),
                     'unique_vehicles': unique_vehicles,
                     'estimated_current_occupancy': len(current_vehicles)
                 }
@@ -196,6 +191,8 @@ def get_zones_summary(request):
 
 
 @api_view(['GET'])
+@_cache_successful
+@condition(etag_func=_zone_activity_etag)
 def get_zone_heatmap_data(request, zone_id):
     """
     Get heatmap data for a zone showing activity patterns.
@@ -204,38 +201,30 @@ def get_zone_heatmap_data(request, zone_id):
         # Check if zone exists
         zone = arcgis_geofence_service.get_zone_by_id(zone_id)
         if not zone:
-            return JsonResponse({
+            return json_response({
                 'error': 'Zone not found'
             }, status=404)
         
         hours = int(request.GET.get('hours', 24))
         
-        # Get zone events
-        zone_events = cosmos_service.get_zone_events(zone_id, limit=2000)
-        
-        # Filter by time
-        if hours > 0:
-            cutoff_time = datetime.now(timezone.utc) - timedelta(hours=hours)
-            zone_events = [
-                event for event in zone_events
-                if datetime.fromisoformat(event['timestamp'].replace('Z', '+00:00')) >= cutoff_time
-            ]
+        # Get zone events, filtered by time server-side
+        zone_events = cosmos_service.get_zone_events(zone_id, limit=2000, since=cutoff_time(hours))
         
         # Create heatmap data points
-        heatmap_points = []
-        for event in zone_events:
-            if 'latitude' in event and 'longitude' in event:
-                intensity = 1.0 if event['event_type'] == 'zone_entry' else 0.5
-                heatmap_points.append({
-                    'lat': event['latitude'],
-                    'lng': event['longitude'],
-                    'intensity': intensity,
-                    'timestamp': event['timestamp'],
-                    'event_type': event['event_type'],
-                    'vehicle_id': event['vehicle_id']
-                })
-        
-        return JsonResponse({
+        heatmap_points = [
+            {
+                'lat': event['latitude'],
+                'lng': event['longitude'],
+                'intensity': 1.0 if event['event_type'] == 'zone_entry' else 0.5,
+                'timestamp': event['timestamp'],
+                'event_type': event['event_type'],
+                'vehicle_id': event['vehicle_id']
+            }
+            for event in zone_events
+            if 'latitude' in event and 'longitude' in event
+        ]
+        
+        return json_response({
             'zone_id': zone_id,
             'zone_name': zone.name,
             'heatmap_points': heatmap_points,
@@ -249,11 +238,11 @@ def get_zone_heatmap_data(request, zone_id):
         })
         
     except ValueError:
-        return JsonResponse({
+        return json_response({
             'error': 'Invalid query parameters'
         }, status=400)
     except Exception as e:
         logger.error(f"Error getting zone heatmap data: {e}")
-        return JsonResponse({
+        return json_response({
             'error': 'Internal server error'
         }, status=500)